@@ -0,0 +1,54 @@
+"""
+memory and outputs matched per second of the address filter vs a set of scriptPubKeys
+
+    $ python -m benchmarks.address_filter [addresses] [outputs]
+"""
+from __future__ import print_function, division
+
+import hashlib
+import sys
+import time
+
+from blocktrail import address_filter
+from blocktrail.address_filter import AddressFilter
+
+
+def script(i):
+    return "a914" + hashlib.sha256(str(i).encode()).hexdigest()[:40] + "87"
+
+
+def set_size(scripts):
+    return sys.getsizeof(scripts) + sum(sys.getsizeof(s) for s in scripts)
+
+
+def rate(fn, outputs, page=500):
+    start = time.time()
+    for i in range(0, len(outputs), page):
+        fn(outputs[i:i + page])
+
+    return len(outputs) / (time.time() - start)
+
+
+def main(addresses=1000000, outputs=200000):
+    owned = [script(i) for i in range(addresses)]
+    scanned = [script(-i - 1) for i in range(outputs)]
+
+    scripts = set(owned)
+    bloom = AddressFilter(addresses, error_rate=0.001)
+    bloom.add_many(owned)
+    del owned
+
+    print("%d addresses, %d outputs" % (addresses, outputs))
+    print("%-30s %10.1f MB" % ("set of scriptPubKeys", set_size(scripts) / 1e6))
+    print("%-30s %10.1f MB" % ("AddressFilter (0.1%)", len(bloom.bits) / 1e6))
+
+    print("%-30s %13s" % ("matching", "outputs/s"))
+    print("%-30s %13.0f" % ("set", rate(lambda page: [s in scripts for s in page], scanned)))
+    if address_filter.numpy is not None:
+        print("%-30s %13.0f" % ("AddressFilter.match (numpy)", rate(bloom.match, scanned)))
+    address_filter.numpy = None
+    print("%-30s %13.0f" % ("AddressFilter.match", rate(bloom.match, scanned)))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,35 @@
+"""
+wallet keys generated per second, one at a time (as create_new_wallet does) vs in a process pool (create_new_wallets)
+
+    $ python -m benchmarks.bulk_wallets [wallets] [processes]
+"""
+from __future__ import print_function, division
+
+import multiprocessing
+import sys
+import time
+
+from blocktrail.client import generate_wallet_keys, _generate_wallet_keys
+
+
+def main(wallets=200, processes=None):
+    processes = processes or multiprocessing.cpu_count()
+    args = [("password", 0, False)] * wallets
+
+    print("%d wallets, %d processes" % (wallets, processes))
+    print("%-30s %14s" % ("generating", "wallets/s"))
+
+    start = time.time()
+    for arg in args:
+        generate_wallet_keys(*arg)
+    print("%-30s %14.1f" % ("serial", wallets / (time.time() - start)))
+
+    pool = multiprocessing.Pool(processes)
+    start = time.time()
+    pool.map(_generate_wallet_keys, args)
+    print("%-30s %14.1f" % ("process pool", wallets / (time.time() - start)))
+    pool.terminate()
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
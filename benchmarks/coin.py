@@ -0,0 +1,69 @@
+"""
+compares the satoshi / BTC conversions with the previous float formatting based ones,
+ and the bulk variants on a list and a numpy array of output values
+
+    $ python -m benchmarks.coin [amounts]
+"""
+from __future__ import print_function, division
+
+import random
+import sys
+import time
+
+from blocktrail import coin
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def float_to_satoshi(btc):
+    return int("%.0f" % (btc * coin.COIN))
+
+
+def float_to_btc(satoshi):
+    return coin.COIN_FORMAT % (satoshi / float(coin.COIN))
+
+
+def rate(fn, values):
+    start = time.time()
+    fn(values)
+
+    return len(values) / (time.time() - start)
+
+
+def main(amounts=1000000):
+    satoshis = [random.randint(0, 5000000000) for _ in range(amounts)]
+    btcs = [satoshi / coin.COIN for satoshi in satoshis]
+
+    print("%d amounts" % amounts)
+    print("%-34s %14s" % ("conversion", "amounts/s"))
+    results = [
+        ("to_satoshi, float formatting", rate(lambda v: [float_to_satoshi(b) for b in v], btcs)),
+        ("to_satoshi", rate(lambda v: [coin.to_satoshi(b) for b in v], btcs)),
+        ("to_satoshi_many(list)", rate(coin.to_satoshi_many, btcs)),
+        ("to_btc, float formatting", rate(lambda v: [float_to_btc(s) for s in v], satoshis)),
+        ("to_btc", rate(lambda v: [coin.to_btc(s) for s in v], satoshis)),
+        ("sum_satoshi(list)", rate(coin.sum_satoshi, satoshis)),
+        ("sum of to_btc floats", rate(lambda v: sum(float(float_to_btc(s)) for s in v), satoshis)),
+    ]
+
+    if numpy is not None:
+        btc_array = numpy.array(btcs)
+        satoshi_array = numpy.array(satoshis, dtype=numpy.int64)
+        results += [
+            ("to_satoshi_many(ndarray)", rate(coin.to_satoshi_many, btc_array)),
+            ("sum_satoshi(ndarray)", rate(coin.sum_satoshi, satoshi_array)),
+        ]
+
+        assert coin.to_satoshi_many(btc_array).tolist() == satoshis
+
+    assert coin.to_satoshi_many(btcs) == satoshis
+
+    for name, per_second in results:
+        print("%-34s %14.0f" % (name, per_second))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
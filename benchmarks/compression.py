@@ -0,0 +1,117 @@
+"""
+reports bytes on the wire and streaming decode time per content-coding for a full page of block transactions,
+ and the size of a gzipped batch subscribe request body
+
+brotli and zstd are only included when the brotli / zstandard packages are installed
+
+    $ python -m benchmarks.compression [pages]
+"""
+from __future__ import print_function
+
+import json
+import os
+import binascii
+import sys
+import time
+import zlib
+
+from blocktrail import compression
+
+
+def random_hash():
+    return binascii.hexlify(os.urandom(32)).decode("ascii")
+
+
+def transactions_page(limit=200):
+    """
+    a page shaped like /block/<block>/transactions, hashes are random so they don't compress unrealistically well
+    """
+    return json.dumps({
+        'current_page': 1,
+        'per_page': limit,
+        'total': 1500,
+        'data': [{
+            'hash': random_hash(),
+            'block_height': 350000,
+            'block_hash': "0000000000000000" + random_hash()[16:],
+            'time': "2015-03-30T09:41:16+0000",
+            'confirmations': 12,
+            'is_coinbase': False,
+            'estimated_value': 1234567,
+            'total_input_value': 2234567,
+            'total_output_value': 2224567,
+            'total_fee': 10000,
+            'inputs': [{
+                'index': i,
+                'output_hash': random_hash(),
+                'output_index': 1,
+                'value': 1117283,
+                'address': "1dice8EMZmqKvrGE4Qc9bUFf9PX3xaYDp",
+                'type': "pubkeyhash",
+                'multisig': None,
+                'script_signature': random_hash() * 4,
+            } for i in range(2)],
+            'outputs': [{
+                'index': i,
+                'value': 1112283,
+                'address': "1dice8EMZmqKvrGE4Qc9bUFf9PX3xaYDp",
+                'type': "pubkeyhash",
+                'multisig': None,
+                'script': "OP_DUP OP_HASH160 " + random_hash()[:40] + " OP_EQUALVERIFY OP_CHECKSIG",
+                'script_hex': "76a914" + random_hash()[:40] + "88ac",
+                'spent_hash': None,
+                'spent_index': 0,
+            } for i in range(2)],
+        } for _ in range(limit)],
+    }).encode("utf-8")
+
+
+def compress(encoding, data):
+    if encoding == 'zstd':
+        return compression.zstandard.ZstdCompressor().compress(data)
+    elif encoding == 'br':
+        return compression.brotli.compress(data, quality=5)
+    elif encoding == 'deflate':
+        return zlib.compress(data)
+    elif encoding == 'gzip':
+        return compression.gzip_compress(data)
+
+    return data
+
+
+def stream_decode(encoding, data, chunk_size=16384):
+    decompressor = compression.decompressor(encoding)
+    out = [decompressor.decompress(data[i:i + chunk_size]) for i in range(0, len(data), chunk_size)]
+    out.append(decompressor.flush())
+
+    return b"".join(out)
+
+
+def main(pages=20):
+    page = transactions_page()
+
+    print("block_transactions page, %d txs" % 200)
+    print("%-10s %10s %8s %14s" % ("encoding", "bytes", "ratio", "decode ms/page"))
+    for encoding in ['identity'] + compression.available_encodings():
+        compressed = compress(encoding, page)
+
+        start = time.time()
+        for _ in range(pages):
+            assert stream_decode(encoding, compressed) == page
+        elapsed = (time.time() - start) / pages
+
+        print("%-10s %10d %8.2f %14.2f" % (encoding, len(compressed), len(page) / float(len(compressed)), elapsed * 1000))
+
+    batch = json.dumps([{
+        'event_type': 'address-transactions',
+        'address': "1dice8EMZmqKvrGE4Qc9bUFf9PX3xaYDp",
+        'confirmations': 6
+    } for _ in range(1000)]).encode("utf-8")
+    compressed = compression.gzip_compress(batch)
+
+    print()
+    print("batch subscribe body, 1000 addresses: %d bytes, %d gzipped (%.1fx)" % (len(batch), len(compressed), len(batch) / float(len(compressed))))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
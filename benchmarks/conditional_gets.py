@@ -0,0 +1,55 @@
+"""
+bytes downloaded when polling watched addresses with and without conditional GETs,
+ against a local stand-in where :changed percent of the addresses change between polls
+
+    $ python -m benchmarks.conditional_gets [addresses] [polls] [changed]
+"""
+from __future__ import print_function, division
+
+import json
+import random
+import sys
+
+from blocktrail import connection
+from tests.local_server import LocalServer
+
+
+def main(addresses=200, polls=10, changed=5):
+    versions = dict(("addr%d" % i, 0) for i in range(addresses))
+    counters = {'bytes': 0}
+
+    def route(address):
+        def handle(headers, body):
+            etag = '"%d"' % versions[address]
+            if headers.get('If-None-Match') == etag:
+                return 304, {'ETag': etag}, b""
+
+            content = json.dumps({'address': address, 'balance': versions[address],
+                                  'transactions': [{'hash': "%064x" % i, 'value': 1000} for i in range(20)]})
+            counters['bytes'] += len(content)
+            return 200, {'Content-Type': 'application/json', 'ETag': etag}, content
+
+        return handle
+
+    server = LocalServer(routes=dict(("/v1/BTC/address/%s" % address, route(address)) for address in versions)).start()
+
+    print("%d addresses, %d polls, %d%% changed per poll" % (addresses, polls, changed))
+    print("%-24s %14s" % ("polling", "KB downloaded"))
+    for conditional_gets in [False, True]:
+        random.seed(1)
+        counters['bytes'] = 0
+        client = connection.RestClient(server.url + "/v1/BTC", "MY_APIKEY", "MY_APISECRET", conditional_gets=conditional_gets)
+
+        for _ in range(polls):
+            for address in versions:
+                client.get("/address/%s" % address)
+            for address in random.sample(sorted(versions), addresses * changed // 100):
+                versions[address] += 1
+
+        print("%-24s %14.1f" % ("conditional" if conditional_gets else "unconditional", counters['bytes'] / 1024))
+
+    server.stop()
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
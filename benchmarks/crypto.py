@@ -0,0 +1,55 @@
+"""
+derivations and signatures per second with each available crypto backend,
+ each backend runs in its own process so a broken native library (eg python-bitcoinlib's OpenSSL bindings) can't take the others down
+
+    $ python -m benchmarks.crypto [derivations] [signatures]
+"""
+from __future__ import print_function, division
+
+import multiprocessing
+import sys
+import time
+
+from pycoin.key.BIP32Node import BIP32Node
+
+from blocktrail import crypto
+
+
+def rate(fn, count):
+    start = time.time()
+    for i in range(count):
+        fn(i)
+
+    return count / (time.time() - start)
+
+
+def measure(name, derivations, signatures, results):
+    backend = crypto.get_backend(name)
+    key = BIP32Node.from_master_secret(b"benchmark", netcode='XTN')
+    chain = backend.subkey_for_path(key, "0'/0")
+    public_chain = backend.subkey_for_path(key.public_copy(), "0/0")
+
+    results.put(("%s private subkey" % name, rate(lambda i: backend.subkey(chain, i).sec(), derivations)))
+    results.put(("%s public subkey" % name, rate(lambda i: backend.subkey(public_chain, i).sec(), derivations)))
+    results.put(("%s sign" % name, rate(lambda i: backend.sign(chain, (b"%032d" % i)[:32]), signatures)))
+
+
+def main(derivations=200, signatures=200):
+    print("%d derivations, %d signatures" % (derivations, signatures))
+    print("%-34s %14s" % ("operation", "per second"))
+
+    for name in crypto.available_backends():
+        results = multiprocessing.Queue()
+        process = multiprocessing.Process(target=measure, args=(name, derivations, signatures, results))
+        process.start()
+        process.join()
+
+        while not results.empty():
+            print("%-34s %14.1f" % results.get())
+
+        if process.exitcode != 0:
+            print("%-34s %14s" % ("%s (crashed)" % name, "-"))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,48 @@
+"""
+candidate payment plans sized per second, with the estimator vs building and serializing the unsigned transaction
+
+    $ python -m benchmarks.fees [plans]
+"""
+from __future__ import print_function, division
+
+import random
+import sys
+import time
+
+from bitcoin.core import lx, COutPoint, CMutableTxIn, CMutableTxOut, CMutableTransaction, CScript
+
+from blocktrail import fees
+
+
+def rate(fn, plans):
+    start = time.time()
+    for plan in plans:
+        fn(plan)
+
+    return len(plans) / (time.time() - start)
+
+
+def build_unsigned(plan):
+    inputs, outputs = plan
+    script_pub_key = CScript(b"\xa9\x14" + b"\x00" * 20 + b"\x87")
+    txins = [CMutableTxIn(COutPoint(lx("%064x" % i), 0)) for i in range(inputs)]
+    txouts = [CMutableTxOut(1000, script_pub_key) for _ in range(outputs)]
+
+    return len(CMutableTransaction(txins, txouts).serialize())
+
+
+def main(plans=20000):
+    candidates = [(random.randint(1, 20), random.randint(1, 10)) for _ in range(plans)]
+
+    print("%d plans" % plans)
+    print("%-34s %14s" % ("sizing", "plans/s"))
+    for name, per_second in [
+        ("build + serialize (unsigned)", rate(build_unsigned, candidates[:plans // 10])),
+        ("fees.transaction_size", rate(lambda plan: fees.transaction_size(*plan), candidates)),
+        ("fees.estimate_fee", rate(lambda plan: fees.estimate_fee(*plan), candidates)),
+    ]:
+        print("%-34s %14.0f" % (name, per_second))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
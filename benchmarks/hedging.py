@@ -0,0 +1,63 @@
+"""
+tail latency with and without hedged GETs against a local stand-in that answers 97% of the requests in 5-15ms
+ and stalls the other 3% for 500ms
+
+    $ python -m benchmarks.hedging [concurrency] [requests_per_thread]
+"""
+from __future__ import print_function
+
+import random
+import sys
+import threading
+import time
+
+from blocktrail import connection
+from tests.local_server import LocalServer, json_route
+
+ROUTES = {'/block': json_route({'hash': "00" * 32, 'height': 350000})}
+
+
+def delay():
+    return 0.5 if random.random() < 0.03 else random.uniform(0.005, 0.015)
+
+
+def run(client, concurrency, per_thread):
+    latencies = []
+    lock = threading.Lock()
+
+    def worker():
+        for i in range(per_thread):
+            start = time.time()
+            client.get("/block", params={'height': random.randint(0, 1000000)})
+            with lock:
+                latencies.append(time.time() - start)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    latencies.sort()
+    pct = lambda p: latencies[int(len(latencies) * p) - 1] * 1000
+
+    return pct(0.5), pct(0.95), pct(0.99), latencies[-1] * 1000
+
+
+def main(concurrency=10, per_thread=100):
+    server = LocalServer(routes=ROUTES, delay=delay).start()
+
+    print("%d threads x %d requests" % (concurrency, per_thread))
+    print("%-10s %8s %8s %8s %8s %8s %8s" % ("hedging", "requests", "hedged", "p50 ms", "p95 ms", "p99 ms", "max ms"))
+    for hedge in (False, True):
+        client = connection.RestClient(server.url, "MY_APIKEY", "MY_APISECRET", hedge=hedge)
+        hits = len(server.hits)
+        p50, p95, p99, slowest = run(client, concurrency, per_thread)
+        print("%-10s %8d %8d %8.1f %8.1f %8.1f %8.1f" % ("on" if hedge else "off", len(server.hits) - hits, client.hedged_requests,
+                                                        p50, p95, p99, slowest))
+
+    server.stop()
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
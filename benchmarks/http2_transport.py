@@ -0,0 +1,70 @@
+"""
+compares the HTTP/1.1 (requests) and HTTP/2 (h2) transports against local stand-in servers
+ that answer every request after a random delay, reports the amount of sockets opened and the latency percentiles
+
+requires `pip install h2`
+
+    $ python -m benchmarks.http2_transport [concurrency] [requests_per_thread]
+"""
+from __future__ import print_function
+
+import random
+import sys
+import threading
+import time
+
+from blocktrail import connection, transport
+from tests.local_server import LocalServer, LocalH2Server, json_route
+
+ROUTES = {'/block': json_route({'hash': "00" * 32, 'height': 350000})}
+
+
+def delay():
+    return random.uniform(0.005, 0.025)
+
+
+def run(client, concurrency, per_thread):
+    latencies = []
+    lock = threading.Lock()
+
+    def worker():
+        for i in range(per_thread):
+            start = time.time()
+            client.get("/block", params={'height': random.randint(0, 1000000)})
+            with lock:
+                latencies.append(time.time() - start)
+
+    start = time.time()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    latencies.sort()
+    pct = lambda p: latencies[int(len(latencies) * p) - 1] * 1000
+
+    return len(latencies) / (time.time() - start), pct(0.5), pct(0.95), pct(0.99)
+
+
+def main(concurrency=200, per_thread=10):
+    h1 = LocalServer(routes=ROUTES, delay=delay)
+    h1.request_queue_size = 512
+    h1.start()
+    h2 = LocalH2Server(routes=ROUTES, delay=delay).start()
+
+    backends = [
+        ("http/1.1", h1, transport.RequestsTransport(pool_maxsize=concurrency)),
+        ("http/2", h2, transport.HTTP2Transport(max_connections=2)),
+    ]
+
+    print("%d threads x %d requests" % (concurrency, per_thread))
+    print("%-10s %8s %10s %8s %8s %8s" % ("transport", "sockets", "req/s", "p50 ms", "p95 ms", "p99 ms"))
+    for name, server, t in backends:
+        client = connection.RestClient(server.url, "MY_APIKEY", "MY_APISECRET", transport=t)
+        rps, p50, p95, p99 = run(client, concurrency, per_thread)
+        print("%-10s %8d %10.0f %8.1f %8.1f %8.1f" % (name, server.sockets, rps, p50, p95, p99))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
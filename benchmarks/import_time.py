@@ -0,0 +1,49 @@
+"""
+measures cold start cost of the SDK, every scenario runs in a fresh interpreter
+
+    $ python -m benchmarks.import_time [runs]
+"""
+from __future__ import print_function
+
+import json
+import subprocess
+import sys
+
+SCENARIOS = [
+    ("import blocktrail", "import blocktrail"),
+    ("to_satoshi", "import blocktrail; blocktrail.to_satoshi(1.23456789)"),
+    ("APIClient", "import blocktrail; blocktrail.APIClient('KEY', 'SECRET')"),
+    ("Wallet", "import blocktrail; blocktrail.APIClient('KEY', 'SECRET'); blocktrail.Wallet"),
+]
+
+HEAVY_MODULES = ['requests', 'httpsig_cffi', 'httpsig', 'pycoin', 'bitcoin.wallet', 'mnemonic']
+
+MEASURE = """
+import json, sys, time
+start = time.time()
+%s
+elapsed = time.time() - start
+print(json.dumps([elapsed, len(sys.modules), [m for m in %r if m in sys.modules]]))
+"""
+
+
+def measure(code, runs):
+    results = []
+    for _ in range(runs):
+        out = subprocess.check_output([sys.executable, "-c", MEASURE % (code, HEAVY_MODULES)])
+        results.append(json.loads(out.decode("utf-8").strip().splitlines()[-1]))
+
+    results.sort(key=lambda r: r[0])
+
+    return results[len(results) // 2]
+
+
+def main(runs=9):
+    print("%-18s %10s %8s  %s" % ("scenario", "median ms", "modules", "heavy modules loaded"))
+    for name, code in SCENARIOS:
+        elapsed, modules, heavy = measure(code, runs)
+        print("%-18s %10.1f %8d  %s" % (name, elapsed * 1000, modules, ", ".join(heavy) or "-"))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
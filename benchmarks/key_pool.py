@@ -0,0 +1,53 @@
+"""
+data API requests per second with a single API key vs a KeyPool of :keys keys,
+ against a local stand-in where every key is rate limited to :rate requests per second
+
+    $ python -m benchmarks.key_pool [requests] [keys] [rate] [threads]
+"""
+from __future__ import print_function, division
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from blocktrail import connection
+from blocktrail.shared import SharedTokenBucket
+from tests.local_server import LocalServer, json_route
+
+
+def main(requests=200, keys=4, rate=50, threads=8):
+    tmp_dir = tempfile.mkdtemp()
+    server = LocalServer(routes={'/v1/BTC/block/latest': json_route({'height': 1000})}).start()
+
+    def fetch(client):
+        def worker():
+            for _ in range(requests // threads):
+                client.get("/block/latest")
+
+        start = time.time()
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+        return requests // threads * threads / (time.time() - start)
+
+    print("%d requests, %d threads, %d requests/s per key" % (requests, threads, rate))
+    print("%-24s %14s" % ("keys", "requests/s"))
+    for count in [1, keys]:
+        pool = connection.KeyPool([("KEY%d" % i, "SECRET%d" % i, SharedTokenBucket(os.path.join(tmp_dir, "%d-%d" % (count, i)), rate=rate))
+                                   for i in range(count)])
+        client = connection.RestClient(server.url + "/v1/BTC", "KEY0", "SECRET0", coalesce_gets=False, key_pool=pool)
+
+        print("%-24s %14.1f" % ("%d key%s" % (count, "s" if count > 1 else ""), fetch(client)))
+
+    server.stop()
+    shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
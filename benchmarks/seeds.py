@@ -0,0 +1,42 @@
+"""
+BIP39 seeds derived per second, with mnemonic's Mnemonic.to_seed vs crypto.mnemonic_to_seed (in one and in several threads)
+
+    $ python -m benchmarks.seeds [seeds] [threads]
+"""
+from __future__ import print_function, division
+
+import sys
+import time
+from multiprocessing.pool import ThreadPool
+
+from mnemonic.mnemonic import Mnemonic
+
+from blocktrail import crypto
+
+
+def rate(fn, mnemonics):
+    start = time.time()
+    fn(mnemonics)
+
+    return len(mnemonics) / (time.time() - start)
+
+
+def main(seeds=200, threads=4):
+    mnemonics = [Mnemonic(language='english').generate(strength=512) for _ in range(seeds)]
+    pool = ThreadPool(threads)
+
+    print("%d seeds" % seeds)
+    print("%-40s %12s" % ("derivation", "seeds/s"))
+    for name, per_second in [
+        ("Mnemonic.to_seed", rate(lambda ms: [Mnemonic.to_seed(m, "password") for m in ms], mnemonics[:max(1, seeds // 10)])),
+        ("crypto.mnemonic_to_seed", rate(lambda ms: [crypto.mnemonic_to_seed(m, "password") for m in ms], mnemonics)),
+        ("crypto.mnemonic_to_seed, %d threads" % threads,
+         rate(lambda ms: pool.map(lambda m: crypto.mnemonic_to_seed(m, "password"), ms), mnemonics)),
+    ]:
+        print("%-40s %12.1f" % (name, per_second))
+
+    pool.terminate()
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
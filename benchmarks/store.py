@@ -0,0 +1,71 @@
+"""
+lookups per second from the local store, by txid, by block and by address,
+ and through APIClient.transaction (a store hit doesn't make any request, the stand-in server would answer 404)
+
+    $ python -m benchmarks.store [transactions]
+"""
+from __future__ import print_function, division
+
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from blocktrail.client import APIClient
+from blocktrail.store import SQLiteStore
+from tests.local_server import LocalServer
+
+
+def make_tx(i):
+    return {
+        'hash': "%064x" % i,
+        'block_hash': "%064x" % (i // 1000),
+        'block_height': i // 1000,
+        'confirmations': 100,
+        'inputs': [{'index': 0, 'address': "1Address%d" % (i % 5000), 'value': 100000}],
+        'outputs': [{'index': n, 'address': "1Address%d" % ((i + n) % 5000), 'value': 40000} for n in range(2)],
+    }
+
+
+def rate(fn, keys):
+    start = time.time()
+    for key in keys:
+        fn(key)
+
+    return len(keys) / (time.time() - start)
+
+
+def main(transactions=100000, lookups=20000):
+    tmp_dir = tempfile.mkdtemp()
+    server = LocalServer(routes={}).start()
+    try:
+        store = SQLiteStore(os.path.join(tmp_dir, "chain.db"))
+
+        start = time.time()
+        for offset in range(0, transactions, 1000):
+            store.put_transactions([make_tx(i) for i in range(offset, min(offset + 1000, transactions))])
+        print("%d transactions stored in %.2fs" % (transactions, time.time() - start))
+
+        txids = ["%064x" % random.randrange(transactions) for _ in range(lookups)]
+        blocks = [random.randrange(transactions // 1000) for _ in range(lookups // 100)]
+        addresses = ["1Address%d" % random.randrange(5000) for _ in range(lookups // 10)]
+        client = APIClient("MY_APIKEY", "MY_APISECRET", api_endpoint=server.url + "/v1/BTC", store=store)
+
+        print("%-28s %14s" % ("lookup", "lookups/s"))
+        for name, per_second in [
+            ("get_transaction", rate(store.get_transaction, txids)),
+            ("transactions_by_block", rate(store.transactions_by_block, blocks)),
+            ("transactions_by_address", rate(store.transactions_by_address, addresses)),
+            ("APIClient.transaction", rate(client.transaction, txids)),
+        ]:
+            print("%-28s %14.0f" % (name, per_second))
+        print("%d requests" % len(server.hits))
+    finally:
+        server.stop()
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,49 @@
+"""
+addresses per second derived with the kept chain nodes vs deriving every key from the root,
+ each measured on a fresh wallet so neither benefits from keys derived by the other
+
+    $ python -m benchmarks.wallet_derivation [addresses]
+"""
+from __future__ import print_function, division
+
+import sys
+import time
+
+from tests.wallet_keys_test import setup_wallet
+
+
+def keys_from_root(wallet, path):
+    path = path.replace("M/", "")
+    key_index = path.split("/")[0].replace("'", "")
+
+    return (
+        wallet.primary_private_key.subkey_for_path(path),
+        wallet.backup_public_key.subkey_for_path(path.replace("'", "")),
+        wallet.blocktrail_public_keys[key_index].subkey_for_path("/".join(path.split("/")[1:])),
+    )
+
+
+def rate(fn, paths):
+    start = time.time()
+    for path in paths:
+        fn(path)
+
+    return len(paths) / (time.time() - start)
+
+
+def main(addresses=50):
+    paths = ["M/0'/0/%d" % i for i in range(addresses)]
+    root_wallet, chain_wallet, address_wallet = setup_wallet(), setup_wallet(), setup_wallet()
+
+    print("%d addresses" % addresses)
+    print("%-28s %14s" % ("derivation", "addresses/s"))
+    for name, per_second in [
+        ("keys from the root", rate(lambda path: [key.sec() for key in keys_from_root(root_wallet, path)], paths)),
+        ("keys from the chain nodes", rate(lambda path: [key.sec() for key in chain_wallet.get_keys_by_path(path)], paths)),
+        ("get_address_by_path", rate(address_wallet.get_address_by_path, paths)),
+    ]:
+        print("%-28s %14.1f" % (name, per_second))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -1,22 +1,54 @@
 from __future__ import division
+import importlib
+import sys
 
 SDK_VERSION = "1.0.2"
 SDK_USER_AGENT = "blocktrail-sdk-python"
 
-COIN = 100000000
-PRECISION = 8
-COIN_FORMAT = "%.8f"
+from blocktrail.coin import COIN, PRECISION, COIN_FORMAT, to_satoshi, to_btc, to_btc_decimal, \
+    to_satoshi_many, to_btc_many, sum_satoshi
 
 
-def to_satoshi(btc):
-    return int("%.0f" % (btc * COIN))
+# the HTTP, wallet and crypto stacks are only imported when they're first used,
+#  so `import blocktrail` stays cheap for scripts that only need the helpers above
+LAZY_ATTRIBUTES = {
+    'connection': ('blocktrail.connection', None),
+    'exceptions': ('blocktrail.exceptions', None),
+    'transport': ('blocktrail.transport', None),
+    'APIClient': ('blocktrail.client', 'APIClient'),
+    'ChainFollower': ('blocktrail.follower', 'ChainFollower'),
+    'Refresher': ('blocktrail.refresher', 'Refresher'),
+    'Wallet': ('blocktrail.wallet', 'Wallet'),
+    'AddressWatchlist': ('blocktrail.watchlist', 'AddressWatchlist'),
+    'TransactionExporter': ('blocktrail.export', 'TransactionExporter'),
+    'SQLiteStore': ('blocktrail.store', 'SQLiteStore'),
+    'AddressIndex': ('blocktrail.address_index', 'AddressIndex'),
+    'AddressFilter': ('blocktrail.address_filter', 'AddressFilter'),
+    'PaymentExecutor': ('blocktrail.payments', 'PaymentExecutor'),
+    'ChangeAddressPool': ('blocktrail.change_pool', 'ChangeAddressPool'),
+    'SharedTokenBucket': ('blocktrail.shared', 'SharedTokenBucket'),
+}
 
 
-def to_btc(satoshi):
-    return COIN_FORMAT % (satoshi / float(COIN))
+def __getattr__(name):
+    if name not in LAZY_ATTRIBUTES:
+        raise AttributeError("module 'blocktrail' has no attribute '%s'" % name)
 
+    module_name, attribute = LAZY_ATTRIBUTES[name]
+    module = importlib.import_module(module_name)
+    value = module if attribute is None else getattr(module, attribute)
 
-from blocktrail import connection
-from blocktrail import exceptions
-from blocktrail.client import APIClient
-from blocktrail.wallet import Wallet
+    # cache it so __getattr__ is only hit once per name
+    globals()[name] = value
+
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(LAZY_ATTRIBUTES))
+
+
+# module level __getattr__ needs python 3.7+ (PEP 562), older pythons import everything up front
+if sys.version_info < (3, 7):
+    for _name in LAZY_ATTRIBUTES:
+        __getattr__(_name)
@@ -0,0 +1,191 @@
+from __future__ import division
+
+import hashlib
+import math
+import struct
+from binascii import hexlify
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from bitcoin.base58 import Base58Error
+
+from blocktrail import network
+from blocktrail.store import write_atomic
+
+FILTER_MAGIC = b"BTAF"
+FILTER_VERSION = 1
+# magic, version, size in bits, amount of hashes, amount of scriptPubKeys added
+FILTER_HEADER = "<4sBQBQ"
+
+MASK64 = (1 << 64) - 1
+
+
+def script_hashes(script_pub_key):
+    """
+    :param str      script_pub_key: the hex of a scriptPubKey
+    :rtype: (int, int)              the two 64 bit hashes the bit positions are derived from
+    """
+    return struct.unpack("<QQ", hashlib.sha256(script_pub_key.encode("ascii")).digest()[:16])
+
+
+def output_script(output):
+    """
+    :param dict     output:         a transaction output as returned by the API
+    :rtype: str|None                the hex of its scriptPubKey
+    """
+    if output.get('script_hex'):
+        return output['script_hex']
+
+    if output.get('address'):
+        try:
+            return hexlify(network.script_pub_key_for_address(output['address'])).decode()
+        except (Base58Error, ValueError):
+            return None
+
+    return None
+
+
+class AddressFilter(object):
+    """
+    compact, probabilistic set of the scriptPubKeys of our addresses (a Bloom filter), to scan block transactions with
+
+    a few bits per address instead of a set of millions of strings; it never misses one of our outputs,
+     but (at :error_rate) says an output is ours when it's not, so a match is confirmed with the AddressIndex.
+    match() checks a whole page of scriptPubKeys per call, vectorized with numpy when it's installed.
+    """
+
+    def __init__(self, capacity, error_rate=0.001, index=None, size=None, hashes=None, bits=None, count=0):
+        """
+        :param int      capacity:       the amount of scriptPubKeys the filter is sized for
+        :param float    error_rate:     the false positive rate at :capacity
+        :param AddressIndex index:      the exact check for matches, matches aren't confirmed when None
+        """
+        capacity = max(1, capacity)
+
+        self.size = size or max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hashes = hashes or max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bits if bits is not None else bytearray((self.size + 7) // 8)
+        self.count = count
+        self.index = index
+
+    @classmethod
+    def from_index(cls, index, wallet=None, error_rate=0.001, capacity=None):
+        """
+        build a filter of all the addresses (of a wallet) in an AddressIndex, which is also used as the exact check
+
+        :param AddressIndex index:      the address index
+        :param str      wallet:         only the addresses of this wallet, all when None
+        :param int      capacity:       the amount of addresses to size for, the amount in the index when None
+                                         (leave room when more addresses will be added)
+        :rtype: AddressFilter
+        """
+        address_filter = cls(capacity or index.count(wallet), error_rate=error_rate, index=index)
+        address_filter.add_many(index.script_pub_keys(wallet))
+
+        return address_filter
+
+    def positions(self, script_pub_key):
+        h1, h2 = script_hashes(script_pub_key)
+
+        return [((h1 + i * h2) & MASK64) % self.size for i in range(self.hashes)]
+
+    def add(self, script_pub_key):
+        """
+        :param str      script_pub_key: the hex of a scriptPubKey
+        """
+        for position in self.positions(script_pub_key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+        self.count += 1
+
+    def add_many(self, script_pub_keys):
+        for script_pub_key in script_pub_keys:
+            self.add(script_pub_key)
+
+    def add_address(self, address):
+        """
+        :param str      address:        a base58 address (of any network)
+        """
+        self.add(hexlify(network.script_pub_key_for_address(address)).decode())
+
+    def __contains__(self, script_pub_key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.positions(script_pub_key))
+
+    def __len__(self):
+        return self.count
+
+    def match(self, script_pub_keys):
+        """
+        check a batch of scriptPubKeys against the filter (no exact check)
+
+        :param list     script_pub_keys: the hex of scriptPubKeys
+        :rtype: list    a bool per scriptPubKey, False means it's certainly not ours
+        """
+        if numpy is None or not script_pub_keys:
+            return [script_pub_key in self for script_pub_key in script_pub_keys]
+
+        digests = b"".join(hashlib.sha256(script_pub_key.encode("ascii")).digest()[:16] for script_pub_key in script_pub_keys)
+        hashes = numpy.frombuffer(digests, dtype="<u8").reshape(-1, 2)
+
+        # (h1 + i * h2) wraps around at 64 bits, like the masking in positions()
+        with numpy.errstate(over='ignore'):
+            positions = (hashes[:, :1] + numpy.arange(self.hashes, dtype=numpy.uint64) * hashes[:, 1:]) % numpy.uint64(self.size)
+
+        bits = numpy.frombuffer(self.bits, dtype=numpy.uint8)
+        hits = (bits[positions >> numpy.uint64(3)] >> (positions & numpy.uint64(7)).astype(numpy.uint8)) & 1
+
+        return hits.all(axis=1).tolist()
+
+    def match_outputs(self, transactions):
+        """
+        the outputs of a page of transactions (eg from APIClient.block_transactions) that pay to our addresses,
+         filtered in one batch and then confirmed with the AddressIndex
+
+        :param list     transactions:   the transactions
+        :rtype: list    (transaction, output, (wallet identifier, path)) for every matching output,
+                         (wallet identifier, path) is None when there's no index to confirm with
+        """
+        candidates = []
+        for tx in transactions:
+            for output in tx.get('outputs', []):
+                script_pub_key = output_script(output)
+                if script_pub_key is not None:
+                    candidates.append((tx, output, script_pub_key))
+
+        candidates = [candidate for candidate, hit in zip(candidates, self.match([c[2] for c in candidates])) if hit]
+
+        if self.index is None:
+            return [(tx, output, None) for tx, output, script_pub_key in candidates]
+
+        found = self.index.lookup_scripts([script_pub_key for _, _, script_pub_key in candidates])
+
+        return [(tx, output, found[script_pub_key]) for tx, output, script_pub_key in candidates if script_pub_key in found]
+
+    def save(self, path):
+        """
+        write the filter to :path (atomically), it can be loaded with AddressFilter.load
+        """
+        header = struct.pack(FILTER_HEADER, FILTER_MAGIC, FILTER_VERSION, self.size, self.hashes, self.count)
+        write_atomic(path, header + bytes(self.bits))
+
+    @classmethod
+    def load(cls, path, index=None):
+        """
+        :param str      path:           a file written by save()
+        :param AddressIndex index:      the exact check for matches
+        :rtype: AddressFilter
+        """
+        with open(path, "rb") as f:
+            magic, version, size, hashes, count = struct.unpack(FILTER_HEADER, f.read(struct.calcsize(FILTER_HEADER)))
+            if magic != FILTER_MAGIC or version != FILTER_VERSION:
+                raise ValueError("%s is not an address filter" % path)
+
+            bits = bytearray(f.read())
+
+        if len(bits) != (size + 7) // 8:
+            raise ValueError("%s is truncated" % path)
+
+        return cls(count, index=index, size=size, hashes=hashes, bits=bits, count=count)
@@ -0,0 +1,111 @@
+from binascii import hexlify
+
+from blocktrail.store import SQLiteDatabase
+
+INDEX_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS wallet_addresses (
+        address TEXT PRIMARY KEY,
+        script_pub_key TEXT NOT NULL,
+        wallet TEXT NOT NULL,
+        path TEXT NOT NULL
+    )""",
+    "CREATE UNIQUE INDEX IF NOT EXISTS wallet_addresses_script_pub_key ON wallet_addresses (script_pub_key)",
+    "CREATE INDEX IF NOT EXISTS wallet_addresses_wallet ON wallet_addresses (wallet, path)",
+]
+
+
+def script_pub_key_for_address(address):
+    """
+    :param str      address:        a base58 address (of any network)
+    :rtype: str     the hex of its scriptPubKey
+    """
+    from blocktrail import network
+
+    return hexlify(network.script_pub_key_for_address(address)).decode()
+
+
+class AddressIndex(SQLiteDatabase):
+    """
+    persistent reverse index of wallet addresses (and their scriptPubKey) to the wallet and path they were derived at
+
+    it's filled by Wallet as addresses are derived and by Wallet.sync_address_index,
+     so an incoming payment to one of our addresses can be mapped back to its path without deriving anything.
+    """
+
+    SCHEMA = INDEX_SCHEMA
+
+    def add(self, wallet, path, address, script_pub_key=None):
+        """
+        :param str      wallet:         the wallet identifier
+        :param str      path:           the path the address was derived at, eg M/9999'/0/1
+        :param str      address:        the address
+        :param str      script_pub_key: the hex of the scriptPubKey of the address (derived from :address when None)
+        """
+        self.add_many(wallet, [(path, address, script_pub_key)])
+
+    def add_many(self, wallet, entries):
+        """
+        :param str      wallet:         the wallet identifier
+        :param list     entries:        (path, address, script_pub_key) tuples, script_pub_key can be None
+        """
+        rows = [(address, script_pub_key or script_pub_key_for_address(address), wallet, path)
+                for path, address, script_pub_key in entries]
+
+        db = self.db()
+        with db:
+            db.executemany("INSERT OR REPLACE INTO wallet_addresses (address, script_pub_key, wallet, path) VALUES (?, ?, ?, ?)", rows)
+
+    def lookup(self, address):
+        """
+        :param str      address:        the address
+        :rtype: (str, str)|None         (wallet identifier, path)
+        """
+        row = self.db().execute("SELECT wallet, path FROM wallet_addresses WHERE address = ?", (address, )).fetchone()
+
+        return tuple(row) if row else None
+
+    def lookup_script(self, script_pub_key):
+        """
+        :param str      script_pub_key: the hex of a scriptPubKey
+        :rtype: (str, str)|None         (wallet identifier, path)
+        """
+        row = self.db().execute("SELECT wallet, path FROM wallet_addresses WHERE script_pub_key = ?", (script_pub_key, )).fetchone()
+
+        return tuple(row) if row else None
+
+    def lookup_scripts(self, script_pub_keys, batch_size=500):
+        """
+        :param list     script_pub_keys: the hex of scriptPubKeys
+        :param int      batch_size:     the amount of scriptPubKeys per query
+        :rtype: dict    script_pub_key => (wallet identifier, path), for the ones that are in the index
+        """
+        script_pub_keys = list(set(script_pub_keys))
+        found = {}
+
+        for i in range(0, len(script_pub_keys), batch_size):
+            batch = script_pub_keys[i:i + batch_size]
+            rows = self.db().execute("SELECT script_pub_key, wallet, path FROM wallet_addresses WHERE script_pub_key IN (%s)"
+                                     % ", ".join("?" * len(batch)), batch)
+            for script_pub_key, wallet, path in rows:
+                found[script_pub_key] = (wallet, path)
+
+        return found
+
+    def script_pub_keys(self, wallet=None):
+        """
+        :param str      wallet:         only the scriptPubKeys of this wallet, all when None
+        :rtype: generator               the hex of each scriptPubKey in the index
+        """
+        if wallet is None:
+            rows = self.db().execute("SELECT script_pub_key FROM wallet_addresses")
+        else:
+            rows = self.db().execute("SELECT script_pub_key FROM wallet_addresses WHERE wallet = ?", (wallet, ))
+
+        for row in rows:
+            yield row[0]
+
+    def count(self, wallet=None):
+        if wallet is None:
+            return self.db().execute("SELECT COUNT(*) FROM wallet_addresses").fetchone()[0]
+
+        return self.db().execute("SELECT COUNT(*) FROM wallet_addresses WHERE wallet = ?", (wallet, )).fetchone()[0]
@@ -0,0 +1,134 @@
+import json
+import os
+import threading
+from multiprocessing.pool import ThreadPool
+from blocktrail.store import write_atomic
+
+
+class ChangeAddressPool(object):
+    """
+    a pool of change addresses that are reserved with the API (and verified locally) ahead of time,
+     so Wallet.pay doesn't have to do that round-trip in the middle of a payment
+
+    the pool is refilled in the background, :concurrency addresses at a time, once it's down to :refill_at addresses.
+    with :persist_file the reserved addresses survive restarts; an address is removed from the file before it's handed out,
+     so it's never used twice by this pool. the file is read once, when the pool is created, so it must not be shared
+     by pools in different processes (they'd hand out the same addresses), give every process a file of its own.
+    """
+
+    def __init__(self, wallet, size=20, refill_at=None, concurrency=4, persist_file=None):
+        """
+        :param Wallet   wallet:         the wallet to reserve change addresses for
+        :param int      size:           the amount of addresses to keep in the pool
+        :param int      refill_at:      refill the pool when it's down to this many addresses (half of :size by default)
+        :param int      concurrency:    the amount of addresses to reserve in parallel
+        :param str      persist_file:   file to keep the pool in, used by this pool only
+        """
+        self.wallet = wallet
+        self.size = size
+        self.refill_at = size // 2 if refill_at is None else refill_at
+        self.persist_file = persist_file
+
+        self.lock = threading.Lock()
+        # (path, address)
+        self.addresses = []
+        self.pool = ThreadPool(concurrency)
+        self.refilling = None
+
+        self.load()
+
+    def load(self):
+        if self.persist_file is None or not os.path.exists(self.persist_file):
+            return
+
+        with open(self.persist_file) as f:
+            data = json.load(f)
+
+        if data['identifier'] == self.wallet.identifier:
+            self.addresses = [tuple(address) for address in data['addresses']]
+
+    def save(self):
+        # called with the lock held
+        if self.persist_file is None:
+            return
+
+        write_atomic(self.persist_file, json.dumps({'identifier': self.wallet.identifier, 'addresses': self.addresses}))
+
+    def __len__(self):
+        return len(self.addresses)
+
+    def take(self):
+        """
+        take a change address from the pool, reserves one right away when the pool is empty
+
+        :rtype: (str, str)              (path, address)
+        """
+        with self.lock:
+            address = self.addresses.pop(0) if self.addresses else None
+            if address is not None:
+                self.save()
+
+            if len(self.addresses) <= self.refill_at:
+                self.start_refill()
+
+        if address is None:
+            address = self.wallet.get_new_address_pair()
+
+        return address
+
+    def fill(self):
+        """
+        start filling the pool in the background
+        """
+        with self.lock:
+            self.start_refill()
+
+    def start_refill(self):
+        # called with the lock held
+        if self.refilling is not None and self.refilling.is_alive():
+            return
+
+        self.refilling = threading.Thread(target=self.refill)
+        self.refilling.daemon = True
+        self.refilling.start()
+
+    def refill(self):
+        """
+        reserve addresses until the pool is full
+
+        :rtype: int     the amount of addresses that were added
+        """
+        with self.lock:
+            missing = self.size - len(self.addresses)
+
+        if missing <= 0:
+            return 0
+
+        def reserve(_):
+            try:
+                return self.wallet.get_new_address_pair()
+            except Exception:
+                # retried on the next take(), the addresses that were reserved are kept
+                return None
+
+        reserved = [address for address in self.pool.map(reserve, range(missing)) if address is not None]
+        if not reserved:
+            return 0
+
+        with self.lock:
+            self.addresses.extend(reserved)
+            self.save()
+
+        return len(reserved)
+
+    def wait(self):
+        """
+        wait for a background refill to finish
+        """
+        refilling = self.refilling
+        if refilling is not None:
+            refilling.join()
+
+    def close(self):
+        self.wait()
+        self.pool.terminate()
@@ -1,14 +1,56 @@
 import os
-from bitcoin import SelectParams
-from bitcoin.wallet import CBitcoinSecret, P2PKHBitcoinAddress
 from blocktrail import connection
-from blocktrail.wallet import Wallet
-from mnemonic.mnemonic import Mnemonic
-from pycoin.key.BIP32Node import BIP32Node
+from blocktrail.network import get_params
+from blocktrail.store import update_confirmations
+
+# the wallet and crypto stacks (pycoin, python-bitcoinlib's wallet, mnemonic) are only imported by the wallet methods,
+#  so a client that only uses the data API never loads them
+
+
+def generate_wallet_keys(passphrase, key_index, testnet):
+    """
+    the CPU heavy part of creating a wallet: the mnemonics, their seeds, the master keys and the checksum
+
+    it's a plain function of picklable arguments, so it can be run in another process
+
+    :rtype: tuple   (primary mnemonic, backup mnemonic, primary private key, primary public key (of :key_index),
+                     backup public key, checksum, key index)
+    """
+    from mnemonic.mnemonic import Mnemonic
+    from pycoin.key.BIP32Node import BIP32Node
+    from blocktrail.crypto import mnemonic_to_seed
+
+    netcode = "XTN" if testnet else "BTC"
+
+    primary_mnemonic = Mnemonic(language='english').generate(strength=512)
+    primary_seed = mnemonic_to_seed(primary_mnemonic, passphrase)
+    primary_private_key = BIP32Node.from_master_secret(primary_seed, netcode=netcode)
+
+    primary_public_key = primary_private_key.subkey_for_path("%d'.pub" % key_index)
+
+    backup_mnemonic = Mnemonic(language='english').generate(strength=512)
+    backup_seed = mnemonic_to_seed(backup_mnemonic, "")
+    backup_public_key = BIP32Node.from_master_secret(backup_seed, netcode=netcode).public_copy()
+
+    checksum = APIClient.create_checksum(primary_private_key)
+
+    return primary_mnemonic, backup_mnemonic, primary_private_key, primary_public_key, backup_public_key, checksum, key_index
+
+
+def _generate_wallet_keys(args):
+    # Pool.starmap is python 3 only
+    return generate_wallet_keys(*args)
 
 
 class APIClient(object):
-    def __init__(self, api_key, api_secret, network='BTC', testnet=False, api_version='v1', api_endpoint=None, debug=False):
+    """
+    a client can be shared by many threads: requests only share thread-safe state (the transport's connection pool,
+     the store and the request coalescing / latency bookkeeping, which are locked)
+    """
+
+    def __init__(self, api_key, api_secret, network='BTC', testnet=False, api_version='v1', api_endpoint=None, debug=False, transport=None,
+                 store=None, timeout=connection.DEFAULT_TIMEOUT, hedge=False, compress_requests=None,
+                 rate_limiter=None, conditional_gets=False, key_pool=None):
         """
         :param str      api_key:        the API_KEY to use for authentication
         :param str      api_secret:     the API_SECRET to use for authentication
@@ -18,18 +60,74 @@ class APIClient(object):
         :param str      api_endpoint:   overwrite the endpoint used
                                          this will cause the :network, :testnet and :api_version to be ignored!
         :param bool     debug:          print debug information when requests fail
+        :param          transport:      the transport to send requests with (see blocktrail.transport)
+        :param          store:          local store to read / write confirmed blocks and transactions through (see blocktrail.store)
+                                         the `confirmations` of stored data are only current with start_refresher(),
+                                         otherwise they're what they were when it was stored (a lower bound)
+        :param tuple    timeout:        (connect timeout, read timeout) in seconds, None to wait forever
+        :param bool     hedge:          hedge GETs that are slower than usual with a second request
+        :param int      compress_requests:  gzip request bodies of at least this many bytes (eg batch subscriptions),
+                                             None to never compress
+        :param          rate_limiter:   limits the rate of requests, eg a blocktrail.shared.SharedTokenBucket shared by
+                                         all processes of the host (pair it with a SQLiteStore as :store to share the cache too)
+        :param bool     conditional_gets:   revalidate repeated GETs (eg of watched addresses) with ETag / Last-Modified,
+                                             unchanged data isn't downloaded again
+        :param KeyPool  key_pool:       spread the requests over several API keys (see blocktrail.connection.KeyPool),
+                                         :api_key should be the pool's first key
         """
 
         self.testnet = testnet
 
-        SelectParams('testnet' if self.testnet else 'mainnet')
+        # per client, so clients of different networks can be used in the same process
+        self.params = get_params(self.testnet)
 
         if api_endpoint is None:
             network = ("t" if testnet else "") + network.upper()
             api_endpoint = os.environ.get('BLOCKTRAIL_SDK_API_ENDPOINT', "https://api.blocktrail.com")
             api_endpoint = "%s/%s/%s" % (api_endpoint, api_version, network)
 
-        self.client = connection.RestClient(api_endpoint=api_endpoint, api_key=api_key, api_secret=api_secret, debug=debug)
+        self.client = connection.RestClient(api_endpoint=api_endpoint, api_key=api_key, api_secret=api_secret, debug=debug,
+                                            transport=transport, timeout=timeout, hedge=hedge, compress_requests=compress_requests,
+                                            rate_limiter=rate_limiter, conditional_gets=conditional_gets,
+                                            key_pool=key_pool)
+        self.store = store
+        self.refresher = None
+
+    def start_refresher(self, interval=10, endpoints=None):
+        """
+        keep the latest block and the price (or :endpoints) in memory, refreshed in the background every :interval seconds,
+         read them with client.refresher.get('block_latest') / get('price')
+
+        :rtype: Refresher
+        """
+        from blocktrail.refresher import Refresher, DEFAULT_ENDPOINTS
+
+        if self.refresher is not None:
+            self.refresher.stop()
+
+        self.refresher = Refresher(self, interval=interval, endpoints=endpoints or DEFAULT_ENDPOINTS)
+
+        return self.refresher
+
+    def close(self):
+        """
+        stop the refresher and close the transport's connections
+        """
+        if self.refresher is not None:
+            self.refresher.stop()
+            self.refresher = None
+
+        self.client.transport.close()
+
+    def deadline(self, seconds):
+        """
+        context manager that bounds all the requests made by the current thread inside of it to :seconds in total
+
+            with client.deadline(5):
+                block = client.block_latest()
+                txs = client.block_transactions(block['hash'])
+        """
+        return self.client.deadline(seconds)
 
     def address(self, address):
         """
@@ -121,6 +219,18 @@ class APIClient(object):
 
         return response.json()
 
+    def tip_height(self):
+        """
+        the height of the latest block as kept by the refresher, None when it isn't running (it's never fetched for this,
+         a block or transaction from the store is returned without a request)
+
+        :rtype: int|None
+        """
+        if self.refresher is not None and 'block_latest' in self.refresher.endpoints:
+            return self.refresher.get('block_latest').value['height']
+
+        return None
+
     def block(self, block):
         """
         get a block
@@ -129,9 +239,18 @@ class APIClient(object):
         :rtype: dict
         """
 
+        if self.store is not None:
+            cached = self.store.get_block(block)
+            if cached is not None:
+                return update_confirmations(cached, self.tip_height())
+
         response = self.client.get("/block/%s" % (block, ))
+        result = response.json()
 
-        return response.json()
+        if self.store is not None:
+            self.store.put_block(result)
+
+        return result
 
     def block_transactions(self, block, page=1, limit=20, sort_dir='asc'):
         """
@@ -144,9 +263,22 @@ class APIClient(object):
         :rtype: dict
         """
 
+        if self.store is not None:
+            cached = self.store.get_block_transactions(block, page, limit, sort_dir)
+            if cached is not None:
+                tip_height = self.tip_height()
+                for transaction in cached['data']:
+                    update_confirmations(transaction, tip_height)
+
+                return cached
+
         response = self.client.get("/block/%s/transactions" % (block, ), params={'page': page, 'limit': limit, 'sort_dir': sort_dir})
+        result = response.json()
 
-        return response.json()
+        if self.store is not None:
+            self.store.put_block_transactions(block, page, limit, sort_dir, result)
+
+        return result
 
     def transaction(self, txhash):
         """
@@ -156,9 +288,18 @@ class APIClient(object):
         :rtype: dict
         """
 
+        if self.store is not None:
+            cached = self.store.get_transaction(txhash)
+            if cached is not None:
+                return update_confirmations(cached, self.tip_height())
+
         response = self.client.get("/transaction/%s" % (txhash, ))
+        result = response.json()
 
-        return response.json()
+        if self.store is not None:
+            self.store.put_transaction(result)
+
+        return result
 
     def all_webhooks(self, page=1, limit=20):
         """
@@ -266,8 +407,8 @@ class APIClient(object):
         :param list     batch_data:
         :rtype: dict
         """
-        for record in batch_data:
-            record['event_type'] = 'address-transactions'
+        # copies, the caller's records are left as they are
+        batch_data = [dict(record, event_type='address-transactions') for record in batch_data]
 
         response = self.client.post("/webhook/%s/events/batch" % (identifier, ), data=batch_data, auth=True)
 
@@ -388,20 +529,78 @@ class APIClient(object):
 
         return response.json()
 
-    def create_new_wallet(self, identifier, passphrase, key_index=0):
-        netcode = "XTN" if self.testnet else "BTC"
+    def create_new_wallet(self, identifier, passphrase, key_index=0, address_index=None):
+        keys = generate_wallet_keys(passphrase, key_index, self.testnet)
 
-        primary_mnemonic = Mnemonic(language='english').generate(strength=512)
-        primary_seed = Mnemonic.to_seed(primary_mnemonic, passphrase)
-        primary_private_key = BIP32Node.from_master_secret(primary_seed, netcode=netcode)
+        return self.register_wallet(identifier, keys, address_index=address_index)
 
-        primary_public_key = primary_private_key.subkey_for_path("%d'.pub" % key_index)
+    def create_new_wallets(self, specs, processes=None, concurrency=8, batch_size=100, address_index=None):
+        """
+        create many wallets: the keys are generated in a process pool and the wallets are registered with the API
+         :concurrency at a time, while the keys of the next batch are being generated
 
-        backup_mnemonic = Mnemonic(language='english').generate(strength=512)
-        backup_seed = Mnemonic.to_seed(backup_mnemonic, "")
-        backup_public_key = BIP32Node.from_master_secret(backup_seed, netcode=netcode).public_copy()
+        results are yielded as they're done (in the order of :specs), only a batch or two is held in memory at a time
 
-        checksum = self.create_checksum(primary_private_key)
+        :param iterable specs:          dicts with the identifier, passphrase and optionally key_index of each wallet
+        :param int      processes:      the amount of processes to generate keys in (the amount of CPUs when None),
+                                         0 to generate them in the calling thread
+        :param int      concurrency:    the amount of wallets to register in parallel
+        :param int      batch_size:     the amount of wallets per batch
+        :param AddressIndex address_index: index for the wallets to record derived addresses in
+        :rtype: generator               (identifier, result) tuples, the result is what create_new_wallet returns
+                                         or the exception it failed with
+        """
+        import itertools
+        import multiprocessing
+        from multiprocessing.pool import ThreadPool
+
+        key_pool = multiprocessing.Pool(processes) if processes != 0 else None
+        register_pool = ThreadPool(concurrency)
+
+        def generate(batch):
+            args = [(spec['passphrase'], spec.get('key_index', 0), self.testnet) for spec in batch]
+            if key_pool is None:
+                return [generate_wallet_keys(*arg) for arg in args]
+
+            return key_pool.map_async(_generate_wallet_keys, args)
+
+        def register(spec_keys):
+            spec, keys = spec_keys
+            try:
+                return spec['identifier'], self.register_wallet(spec['identifier'], keys, address_index=address_index)
+            except Exception as e:
+                return spec['identifier'], e
+
+        specs = iter(specs)
+        try:
+            batch = list(itertools.islice(specs, batch_size))
+            generating = generate(batch)
+
+            while batch:
+                keys = generating.get() if key_pool is not None else generating
+
+                # the keys of the next batch are generated while this one is registered
+                next_batch = list(itertools.islice(specs, batch_size))
+                generating = generate(next_batch) if next_batch else None
+
+                for result in register_pool.imap(register, zip(batch, keys)):
+                    yield result
+
+                batch = next_batch
+        finally:
+            register_pool.terminate()
+            if key_pool is not None:
+                key_pool.terminate()
+
+    def register_wallet(self, identifier, keys, address_index=None):
+        """
+        register a wallet with the keys from generate_wallet_keys
+
+        :rtype: (Wallet, str, str, list)    (wallet, primary mnemonic, backup mnemonic, blocktrail public keys)
+        """
+        from blocktrail.wallet import Wallet
+
+        primary_mnemonic, backup_mnemonic, primary_private_key, primary_public_key, backup_public_key, checksum, key_index = keys
 
         result = self._create_new_wallet(
             identifier=identifier,
@@ -423,7 +622,8 @@ class APIClient(object):
             backup_public_key=backup_public_key,
             blocktrail_public_keys=blocktrail_public_keys,
             key_index=key_index,
-            testnet=self.testnet
+            testnet=self.testnet,
+            address_index=address_index
         ), primary_mnemonic, backup_mnemonic, blocktrail_public_keys
 
     def _create_new_wallet(self, identifier, primary_public_key, backup_public_key, primary_mnemonic, checksum, key_index):
@@ -438,12 +638,16 @@ class APIClient(object):
 
         return response.json()
 
-    def init_wallet(self, identifier, passphrase):
+    def init_wallet(self, identifier, passphrase, address_index=None):
+        from blocktrail.wallet import Wallet
+        from pycoin.key.BIP32Node import BIP32Node
+        from blocktrail.crypto import mnemonic_to_seed
+
         netcode = "XTN" if self.testnet else "BTC"
 
         data = self.get_wallet(identifier)
 
-        primary_seed = Mnemonic.to_seed(data['primary_mnemonic'], passphrase)
+        primary_seed = mnemonic_to_seed(data['primary_mnemonic'], passphrase)
         primary_private_key = BIP32Node.from_master_secret(primary_seed, netcode=netcode)
 
         backup_public_key = BIP32Node.from_hwif(data['backup_public_key'][0])
@@ -463,15 +667,16 @@ class APIClient(object):
             backup_public_key=backup_public_key,
             blocktrail_public_keys=blocktrail_public_keys,
             key_index=key_index,
-            testnet=self.testnet
+            testnet=self.testnet,
+            address_index=address_index
         )
 
     @staticmethod
     def create_checksum(key):
-        key = CBitcoinSecret(key.wif())
-        address = P2PKHBitcoinAddress.from_pubkey(key.pub)
+        from blocktrail.network import p2pkh_address
 
-        return str(address)
+        # the address is encoded for the network of the key, not of whatever SelectParams() was called last
+        return p2pkh_address(key.sec(use_uncompressed=False), get_params(key._netcode == "XTN"))
 
     def get_wallet(self, identifier):
         response = self.client.get("/wallet/%s" % (identifier, ), auth=True)
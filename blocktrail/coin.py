@@ -0,0 +1,134 @@
+from __future__ import division
+from decimal import Decimal, ROUND_HALF_EVEN
+from six import integer_types
+
+COIN = 100000000
+PRECISION = 8
+COIN_FORMAT = "%.8f"
+
+# below this (the 21M coin supply, ~2^51 satoshi) a float BTC amount times COIN is always
+#  within 0.5 of the exact satoshi value, so rounding the float product is exact
+MAX_EXACT_FLOAT_BTC = 21000000
+
+SATOSHI = Decimal(1)
+
+
+def to_decimal(value):
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def is_ndarray(value):
+    # checked without importing numpy, so it's only loaded when numpy arrays are actually passed in
+    return type(value).__module__ == 'numpy' and hasattr(value, 'dtype')
+
+
+def to_satoshi(btc):
+    """
+    convert a BTC amount to satoshi
+
+    ints, Decimals and strings are converted exactly,
+     floats are exact up to the 21M coin supply and go through their shortest repr (eg 1.23456789) above that
+
+    :param int|float|Decimal|str btc:   the BTC amount
+    :rtype: int
+    """
+    if isinstance(btc, float):
+        if -MAX_EXACT_FLOAT_BTC <= btc <= MAX_EXACT_FLOAT_BTC:
+            return int(round(btc * COIN))
+
+        btc = repr(btc)
+
+    if isinstance(btc, integer_types):
+        return btc * COIN
+
+    return int((to_decimal(btc) * COIN).quantize(SATOSHI, rounding=ROUND_HALF_EVEN))
+
+
+def to_btc(satoshi):
+    """
+    format a satoshi amount as BTC with 8 decimals, using integer math only
+
+    :param int      satoshi:        the satoshi amount
+    :rtype: str
+    """
+    if not isinstance(satoshi, integer_types):
+        satoshi = int(to_decimal(satoshi).quantize(SATOSHI, rounding=ROUND_HALF_EVEN))
+
+    if satoshi >= 0:
+        return "%d.%08d" % divmod(satoshi, COIN)
+
+    return "-%d.%08d" % divmod(-satoshi, COIN)
+
+
+def to_btc_decimal(satoshi):
+    """
+    convert a satoshi amount to an exact BTC Decimal
+
+    :param int      satoshi:        the satoshi amount
+    :rtype: Decimal
+    """
+    return to_decimal(satoshi).scaleb(-PRECISION)
+
+
+def to_int64(satoshis):
+    """
+    a numpy array of satoshi amounts as int64, floats are rounded half to even (like to_btc does) instead of truncated
+    """
+    import numpy
+
+    if satoshis.dtype.kind == 'f':
+        satoshis = numpy.rint(satoshis)
+
+    return satoshis.astype(numpy.int64)
+
+
+def to_satoshi_many(amounts):
+    """
+    convert many BTC amounts to satoshi in one call
+
+    a numpy array is converted vectorized into an int64 array (floats exact up to the 21M coin supply),
+     any other iterable into a list of ints
+
+    :param list|numpy.ndarray amounts:  the BTC amounts
+    :rtype: list|numpy.ndarray
+    """
+    if is_ndarray(amounts):
+        import numpy
+
+        if amounts.dtype.kind in 'iu':
+            return amounts.astype(numpy.int64) * COIN
+
+        return numpy.rint(amounts.astype(numpy.float64) * COIN).astype(numpy.int64)
+
+    return [to_satoshi(btc) for btc in amounts]
+
+
+def to_btc_many(satoshis):
+    """
+    format many satoshi amounts as BTC strings in one call
+
+    :param list|numpy.ndarray satoshis: the satoshi amounts
+    :rtype: list
+    """
+    if is_ndarray(satoshis):
+        satoshis = to_int64(satoshis).tolist()
+
+    return [to_btc(satoshi) for satoshi in satoshis]
+
+
+def sum_satoshi(values, key=None):
+    """
+    exact sum of many satoshi amounts, eg all the output values of a page of transactions
+
+    :param list|numpy.ndarray values:   the satoshi amounts, or dicts to take :key from
+    :param str      key:                the key of the value in each dict (eg 'value')
+    :rtype: int
+    """
+    if is_ndarray(values):
+        # int64 holds ~4000x the coin supply, so the sum can't overflow for real amounts
+        return int(to_int64(values).sum(dtype='int64'))
+
+    if key is not None:
+        return sum(value[key] for value in values)
+
+    return sum(values)
@@ -0,0 +1,80 @@
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def available_encodings():
+    """
+    the content-codings that can be decoded, most preferred first
+
+    :rtype: list
+    """
+    encodings = []
+    if zstandard is not None:
+        encodings.append('zstd')
+    if brotli is not None:
+        encodings.append('br')
+
+    return encodings + ['gzip', 'deflate']
+
+
+class BrotliDecompressor(object):
+    def __init__(self):
+        self.decompressor = brotli.Decompressor()
+
+    def decompress(self, data):
+        return self.decompressor.process(data)
+
+    def flush(self):
+        return b""
+
+
+class IdentityDecompressor(object):
+    def decompress(self, data):
+        return data
+
+    def flush(self):
+        return b""
+
+
+def decompressor(encoding):
+    """
+    streaming decompressor for a Content-Encoding, feed it chunks with decompress() as they arrive and finish with flush()
+
+    :param str      encoding:       the Content-Encoding of the response (None for identity)
+    """
+    encoding = (encoding or "identity").strip().lower()
+
+    if encoding in ('gzip', 'x-gzip'):
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    elif encoding == 'deflate':
+        return zlib.decompressobj()
+    elif encoding == 'br' and brotli is not None:
+        return BrotliDecompressor()
+    elif encoding == 'zstd' and zstandard is not None:
+        return zstandard.ZstdDecompressor().decompressobj()
+    elif encoding == 'identity':
+        return IdentityDecompressor()
+
+    raise ValueError("Unsupported Content-Encoding [%s]" % encoding)
+
+
+def gzip_compress(data, level=6):
+    """
+    gzip :data without a timestamp in the header, so the same body always compresses to the same bytes (and Content-MD5)
+
+    :param bytes    data:           the data to compress
+    :param int      level:          zlib compression level
+    :rtype: bytes
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    return compressor.compress(data) + compressor.flush()
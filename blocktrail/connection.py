@@ -2,11 +2,18 @@ from __future__ import print_function
 from future.standard_library import install_aliases
 install_aliases()
 
+import collections
+import contextlib
 import datetime
+import fnmatch
+import re
 from urllib.parse import urlparse, urlencode
+from queue import Queue, Empty
 import requests
 import json
 import hashlib
+import threading
+import time
 
 try:
     from httpsig_cffi.requests_auth import HTTPSignatureAuth
@@ -17,6 +24,8 @@ from requests.models import RequestEncodingMixin
 
 import blocktrail
 from blocktrail.exceptions import *
+from blocktrail.compression import gzip_compress
+from blocktrail.transport import RequestsTransport
 
 
 EXCEPTION_INVALID_CREDENTIALS = "Your credentials are incorrect."
@@ -26,23 +35,336 @@ EXCEPTION_EMPTY_RESPONSE = "The HTTP Response was empty."
 EXCEPTION_UNKNOWN_ENDPOINT_SPECIFIC_ERROR = "The endpoint returned an unknown error."
 EXCEPTION_MISSING_ENDPOINT = "The endpoint you've tried to access does not exist. Check your URL."
 EXCEPTION_OBJECT_NOT_FOUND = "The object you've tried to access does not exist."
+EXCEPTION_REQUEST_TIMEOUT = "The request timed out."
+EXCEPTION_DEADLINE_EXCEEDED = "The deadline was exceeded."
+
+# (connect timeout, read timeout) in seconds
+DEFAULT_TIMEOUT = (10, 60)
+
+# endpoints (fnmatch patterns) that are allowed to take longer
+DEFAULT_ENDPOINT_TIMEOUTS = {
+    '/wallet/*/discovery': (10, 600),
+}
+
+
+def cap_timeout(timeout, deadline):
+    """
+    cap a (connect, read) timeout to the time that's left until :deadline (time.time()), None for no deadline
+
+    :rtype: tuple|None
+    """
+    if deadline is None:
+        return timeout
+
+    remaining = deadline - time.time()
+    if remaining <= 0:
+        raise DeadlineExceeded(EXCEPTION_DEADLINE_EXCEEDED)
+
+    if timeout is None:
+        return remaining, remaining
+
+    return min(timeout[0], remaining), min(timeout[1], remaining)
+
+
+def endpoint_key(endpoint_url):
+    """
+    the endpoint without its identifiers, eg /address/*/transactions for /address/1dice.../transactions
+
+    :rtype: str
+    """
+    return "/".join(["*" if re.search(r"[0-9]", segment) or len(segment) > 20 else segment
+                     for segment in endpoint_url.split("?")[0].split("/")])
+
+
+class LatencyTracker(object):
+    """
+    keeps the most recent latencies per endpoint to take quantiles from
+    """
+
+    def __init__(self, window=200, min_samples=20):
+        """
+        :param int      window:         the amount of latencies to keep per endpoint
+        :param int      min_samples:    the amount of latencies needed before there's a quantile
+        """
+        self.window = window
+        self.min_samples = min_samples
+        self.lock = threading.Lock()
+        self.latencies = {}
+
+    def record(self, key, seconds):
+        with self.lock:
+            self.latencies.setdefault(key, collections.deque(maxlen=self.window)).append(seconds)
+
+    def quantile(self, key, q):
+        """
+        :rtype: float|None              None while there are less than :min_samples latencies
+        """
+        with self.lock:
+            latencies = sorted(self.latencies.get(key, []))
+
+        if len(latencies) < self.min_samples:
+            return None
+
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+
+class SingleFlight(object):
+    """
+    collapses concurrent calls with the same key into one call,
+     every caller that joins while the call is in flight gets the same result (or exception)
+    """
+
+    class Call(object):
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.saved = 0
+
+    def do(self, key, fn, deadline=None):
+        """
+        :param          key:            hashable key identifying the call
+        :param callable fn:             the call to make when no identical call is in flight
+        :param float    deadline:       the time (time.time()) a caller that joins an in-flight call waits until at most,
+                                         after which it raises DeadlineExceeded
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = SingleFlight.Call()
+            else:
+                self.saved += 1
+
+        if not leader:
+            if not call.done.wait(deadline - time.time() if deadline is not None else None):
+                raise DeadlineExceeded(EXCEPTION_DEADLINE_EXCEEDED)
+            if call.error is not None:
+                raise call.error
+
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+
+        return call.result
+
+
+class ValidatorCache(object):
+    """
+    the last response of GETs that came with a validator (ETag and/or Last-Modified),
+     so the next identical GET can be sent as a conditional request and a 304 is answered from here
+
+    responses without a validator aren't kept, those GETs stay unconditional
+    """
+
+    class Entry(object):
+        def __init__(self, response, etag, last_modified):
+            self.response = response
+            self.etag = etag
+            self.last_modified = last_modified
+
+        def conditional_headers(self):
+            headers = {}
+            if self.etag is not None:
+                headers['If-None-Match'] = self.etag
+            if self.last_modified is not None:
+                headers['If-Modified-Since'] = self.last_modified
+
+            return headers
+
+    def __init__(self, max_entries=10000):
+        """
+        :param int      max_entries:    the amount of responses to keep, the least recently used ones are dropped
+        """
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = collections.OrderedDict()
+        self.revalidated = 0
+
+    def get(self, key):
+        """
+        :rtype: ValidatorCache.Entry|None
+        """
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is not None:
+                self.entries[key] = entry
+
+            return entry
+
+    def put(self, key, response):
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+
+        with self.lock:
+            self.entries.pop(key, None)
+            if etag is None and last_modified is None:
+                return
+
+            self.entries[key] = ValidatorCache.Entry(response, etag, last_modified)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def not_modified(self, entry):
+        """
+        :rtype: requests.Response       the cached response, for a 304
+        """
+        with self.lock:
+            self.revalidated += 1
+
+        return entry.response
+
+
+def signer(api_key, api_secret):
+    """
+    :rtype: HTTPSignatureAuth       the HTTP-Signature Auth signer for an API key
+    """
+    return HTTPSignatureAuth(key_id=api_key, secret=api_secret, algorithm='hmac-sha256',
+                             headers=['(request-target)', 'Date', 'Content-MD5'])
+
+
+class ApiKey(object):
+    def __init__(self, api_key, api_secret, rate_limiter=None):
+        """
+        :param str      api_key:        the API_KEY
+        :param str      api_secret:     the API_SECRET
+        :param          rate_limiter:   the rate limit of this key, eg a blocktrail.shared.SharedTokenBucket
+        """
+        self.api_key = api_key
+        self.auth = signer(api_key, api_secret)
+        self.rate_limiter = rate_limiter
+        self.in_flight = 0
+        self.requests = 0
+
+    def remaining(self):
+        """
+        the quota this key has left right now, unlimited without a rate limiter
+        """
+        return self.rate_limiter.available() if self.rate_limiter is not None else float('inf')
+
+    def __repr__(self):
+        return "ApiKey(%s)" % (self.api_key, )
+
+
+class KeyPool(object):
+    """
+    several API keys (each with its own signer and rate limit) to spread requests over,
+     so the throughput isn't capped by the quota of a single key
+
+    unauthenticated (data API) requests go to the key with the most remaining quota, the fewest requests in flight when tied.
+    authenticated requests are pinned: wallet requests (/wallet/<identifier>...) to the key that owns the wallet,
+     everything else (creating wallets, webhooks, ...) to the first key, which is also the owner of wallets that aren't pinned.
+    """
+
+    def __init__(self, keys, wallet_owners=None):
+        """
+        :param list     keys:           ApiKey's or (api_key, api_secret[, rate_limiter]) tuples
+        :param dict     wallet_owners:  wallet identifier => the api_key that owns it
+        """
+        self.keys = [key if isinstance(key, ApiKey) else ApiKey(*key) for key in keys]
+        if not self.keys:
+            raise ValueError("KeyPool needs at least one key")
+
+        self.by_api_key = dict((key.api_key, key) for key in self.keys)
+        self.lock = threading.Lock()
+        self.wallet_owners = {}
+        for identifier, api_key in (wallet_owners or {}).items():
+            self.pin(identifier, api_key)
+
+    def pin(self, identifier, api_key):
+        """
+        send the requests of wallet :identifier with :api_key
+        """
+        if api_key not in self.by_api_key:
+            raise ValueError("[%s] isn't in the pool" % api_key)
+
+        with self.lock:
+            self.wallet_owners[identifier] = self.by_api_key[api_key]
+
+    def acquire(self, endpoint, authenticated=False):
+        """
+        :param str      endpoint:       the endpoint of the request, eg /wallet/mywallet/balance
+        :param bool     authenticated:  the request is signed
+        :rtype: ApiKey  the key to send the request with, release() it once it's done
+        """
+        parts = endpoint.split("?")[0].split("/")
+
+        with self.lock:
+            if parts[1:2] == ["wallet"] and len(parts) > 2:
+                key = self.wallet_owners.get(parts[2], self.keys[0])
+            elif authenticated or parts[1:2] == ["wallet"]:
+                key = self.keys[0]
+            else:
+                key = max(self.keys, key=lambda k: (k.remaining(), -k.in_flight))
+
+            key.in_flight += 1
+            key.requests += 1
+
+        return key
+
+    def release(self, key):
+        with self.lock:
+            key.in_flight -= 1
 
 
 class RestClient(object):
-    def __init__(self, api_endpoint, api_key, api_secret, debug=False):
+    def __init__(self, api_endpoint, api_key, api_secret, debug=False, coalesce_gets=True, transport=None,
+                 compress_requests=None, timeout=DEFAULT_TIMEOUT, endpoint_timeouts=None, hedge=False, hedge_quantile=0.95,
+                 rate_limiter=None, conditional_gets=False, key_pool=None):
         """
         :param str      api_endpoint:   the base url to use for all API requests
         :param str      api_key:        the API_KEY to use for authentication
         :param str      api_secret:     the API_SECRET to use for authentication
         :param bool     debug:          print debug information when requests fail
+        :param bool     coalesce_gets:  share one in-flight request between concurrent identical GETs
+        :param          transport:      the transport to send requests with, defaults to a keep-alive RequestsTransport
+                                         (see blocktrail.transport.HTTP2Transport for HTTP/2)
+        :param int      compress_requests:  gzip request bodies of at least this many bytes, None to never compress
+        :param tuple    timeout:        (connect timeout, read timeout) in seconds, None to wait forever
+        :param dict     endpoint_timeouts:  endpoint pattern (eg /wallet/*/discovery) => timeout, for endpoints that differ
+        :param bool     hedge:          send a second GET when the first is slower than the endpoint's :hedge_quantile latency,
+                                         whichever answers first is used
+        :param float    hedge_quantile: the latency quantile after which a GET is hedged
+        :param          rate_limiter:   takes a token before each request, eg a blocktrail.shared.SharedTokenBucket
+                                         to share the API quota between the processes of a host
+        :param bool     conditional_gets:   keep the responses that have an ETag / Last-Modified and revalidate them with
+                                             conditional GETs, a 304 is answered from memory
+        :param KeyPool  key_pool:       spread the requests over several API keys instead of only :api_key
         """
         self.api_endpoint = api_endpoint
         self.debug = debug
+        self.transport = transport if transport is not None else RequestsTransport()
+        self.compress_requests = compress_requests
+        self.single_flight = SingleFlight() if coalesce_gets else None
+        self.timeout = timeout
+        self.endpoint_timeouts = dict_merge(DEFAULT_ENDPOINT_TIMEOUTS, endpoint_timeouts)
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.latencies = LatencyTracker()
+        self.hedged_requests = 0
+        self.lock = threading.Lock()
+        self.deadlines = threading.local()
+        self.rate_limiter = rate_limiter
+        self.validators = ValidatorCache() if conditional_gets else None
+        self.key_pool = key_pool
 
         # create a default User-Agent
         self.default_headers = {
             'User-Agent': "%s/%s" % (blocktrail.SDK_USER_AGENT, blocktrail.SDK_VERSION),
-            'X-SDK-Version': 'blocktrail-sdk-nodejs/3.7.9'
+            'X-SDK-Version': 'blocktrail-sdk-nodejs/3.7.9',
+            'Accept-Encoding': self.transport.accept_encoding
         }
 
         # api_key is always in the query string
@@ -51,8 +373,7 @@ class RestClient(object):
         }
 
         # prepare HTTP-Signature Auth signer
-        self.auth = HTTPSignatureAuth(key_id=api_key, secret=api_secret, algorithm='hmac-sha256',
-                                      headers=['(request-target)', 'Date', 'Content-MD5'])
+        self.auth = signer(api_key, api_secret)
 
     def get(self, endpoint_url, params=None, auth=None):
         """
@@ -61,7 +382,9 @@ class RestClient(object):
         :param bool     auth:           do HMAC auth
         :rtype: requests.Response
         """
+        endpoint = endpoint_url
         endpoint_url = self.api_endpoint + endpoint_url
+        timeout = self.request_timeout(endpoint)
 
         if auth is True:
             auth = self.auth
@@ -73,14 +396,164 @@ class RestClient(object):
 
         params = RestClient.sort_params(params)
 
+        def fetch():
+            get = self._get_hedged if self.hedge else self._get
+
+            return get(endpoint_key(endpoint), endpoint_url, params, auth, timeout)
+
+        if self.single_flight is None:
+            return fetch()
+
+        # identical GETs (same url, query string and auth) that are in flight at the same time share one response
+        key = (endpoint_url + "?" + urlencode(params), auth is not None)
+
+        return self.single_flight.do(key, fetch, deadline=getattr(self.deadlines, 'deadline', None))
+
+    def _get(self, key, endpoint_url, params, auth, timeout):
+        cache_key = (endpoint_url + "?" + urlencode(params), auth is not None)
+        params, auth, api_key = self.use_key(endpoint_url, params, auth)
+
         headers = dict_merge(self.default_headers, {
             'Date': RestClient.httpdate(datetime.datetime.utcnow()),
             'Content-MD5': RestClient.content_md5(urlparse(endpoint_url).path + "?" + urlencode(params))
         })
 
-        response = requests.get(endpoint_url, params=params, headers=headers, auth=auth)
+        cached = self.validators.get(cache_key) if self.validators is not None else None
+        if cached is not None:
+            headers.update(cached.conditional_headers())
 
-        return self.handle_response(response)
+        start = time.time()
+        response = self.send('GET', endpoint_url, params=params, headers=headers, auth=auth, timeout=timeout, api_key=api_key)
+        self.latencies.record(key, time.time() - start)
+
+        if cached is not None and response.status_code == 304:
+            return self.validators.not_modified(cached)
+
+        response = self.handle_response(response)
+        if self.validators is not None:
+            self.validators.put(cache_key, response)
+
+        return response
+
+    def _get_hedged(self, key, endpoint_url, params, auth, timeout):
+        """
+        GET, sending a second identical request when the first one takes longer than the endpoint usually does
+        """
+        hedge_after = self.latencies.quantile(key, self.hedge_quantile)
+        if hedge_after is None:
+            return self._get(key, endpoint_url, params, auth, timeout)
+
+        results = Queue()
+        # the attempts run in threads of their own, the deadline of the calling thread goes along with them
+        deadline = getattr(self.deadlines, 'deadline', None)
+
+        def attempt():
+            self.deadlines.deadline = deadline
+            try:
+                results.put((self._get(key, endpoint_url, params, auth, cap_timeout(timeout, deadline)), None))
+            except Exception as e:
+                results.put((None, e))
+
+        def start_attempt():
+            thread = threading.Thread(target=attempt)
+            thread.daemon = True
+            thread.start()
+
+        start_attempt()
+        try:
+            result, error = results.get(timeout=hedge_after)
+        except Empty:
+            with self.lock:
+                self.hedged_requests += 1
+            start_attempt()
+
+            # the first one to succeed wins, the other one is left to finish on its own
+            result, error = results.get()
+            if error is not None:
+                result, error = results.get()
+
+        if error is not None:
+            raise error
+
+        return result
+
+    def request_timeout(self, endpoint):
+        """
+        the (connect, read) timeout for a request to :endpoint, capped by the deadline of the current thread
+
+        :rtype: tuple|None
+        """
+        timeout = self.timeout
+        for pattern, endpoint_timeout in self.endpoint_timeouts.items():
+            if fnmatch.fnmatch(endpoint.split("?")[0], pattern):
+                timeout = endpoint_timeout
+
+        return cap_timeout(timeout, getattr(self.deadlines, 'deadline', None))
+
+    @contextlib.contextmanager
+    def deadline(self, seconds):
+        """
+        context manager that bounds all the requests made by the current thread inside of it (pagination, retries, ...)
+         to :seconds in total, a request that would exceed it raises DeadlineExceeded
+
+        deadlines nest, the earliest one applies
+        """
+        previous = getattr(self.deadlines, 'deadline', None)
+        deadline = time.time() + seconds
+        self.deadlines.deadline = deadline if previous is None else min(previous, deadline)
+
+        try:
+            yield
+        finally:
+            self.deadlines.deadline = previous
+
+    def use_key(self, endpoint_url, params, auth):
+        """
+        pick the API key from the key pool for a request
+
+        :rtype: (list, HTTPSignatureAuth, ApiKey)   the params and auth for the key, and the key (None without a pool)
+        """
+        if self.key_pool is None:
+            return params, auth, None
+
+        api_key = self.key_pool.acquire(endpoint_url[len(self.api_endpoint):], authenticated=auth is not None)
+        params = [(name, api_key.api_key if name == 'api_key' else value) for name, value in params]
+
+        return params, (api_key.auth if auth is not None else None), api_key
+
+    def send(self, method, endpoint_url, api_key=None, **kwargs):
+        """
+        send a request through the transport, timeouts are raised as RequestTimeout
+
+        :param ApiKey   api_key:        the key from the key pool the request is sent with, released once it's done
+        :rtype: requests.Response
+        """
+        try:
+            for rate_limiter in [self.rate_limiter, api_key.rate_limiter if api_key is not None else None]:
+                if rate_limiter is not None:
+                    deadline = getattr(self.deadlines, 'deadline', None)
+                    if not rate_limiter.acquire(timeout=deadline - time.time() if deadline is not None else None):
+                        raise DeadlineExceeded(EXCEPTION_DEADLINE_EXCEEDED)
+
+            try:
+                return self.transport.request(method, endpoint_url, **kwargs)
+            except requests.exceptions.Timeout as e:
+                if getattr(self.deadlines, 'deadline', None) is not None and time.time() >= self.deadlines.deadline:
+                    raise DeadlineExceeded(EXCEPTION_DEADLINE_EXCEEDED)
+
+                raise RequestTimeout("%s (%s)" % (EXCEPTION_REQUEST_TIMEOUT, e))
+        finally:
+            if api_key is not None:
+                self.key_pool.release(api_key)
+
+    @property
+    def coalesced_requests(self):
+        """
+        the amount of GET requests that were saved by sharing an identical in-flight request
+
+        :rtype: int
+        """
+        return self.single_flight.saved if self.single_flight is not None else 0
 
     def post(self, endpoint_url, data, params=None, auth=None):
         """
@@ -89,6 +562,7 @@ class RestClient(object):
         :param bool     auth:           do HMAC auth
         :rtype: requests.Response
         """
+        timeout = self.request_timeout(endpoint_url)
         endpoint_url = self.api_endpoint + endpoint_url
 
         if auth is True:
@@ -98,15 +572,14 @@ class RestClient(object):
         params = RestClient.sort_params(params)
 
         # do the post body encoding here since we need it to get the MD5
-        data = json.dumps(data)
+        data, body_headers = self.encode_body(data)
+        params, auth, api_key = self.use_key(endpoint_url, params, auth)
 
-        headers = dict_merge(self.default_headers, {
-            'Date': RestClient.httpdate(datetime.datetime.utcnow()),
-            'Content-MD5': RestClient.content_md5(data),
-            'Content-Type': 'application/json'
-        })
+        headers = dict_merge(self.default_headers, dict_merge(body_headers, {
+            'Date': RestClient.httpdate(datetime.datetime.utcnow())
+        }))
 
-        response = requests.post(endpoint_url, data=data, params=params, headers=headers, auth=auth)
+        response = self.send('POST', endpoint_url, data=data, params=params, headers=headers, auth=auth, timeout=timeout, api_key=api_key)
 
         return self.handle_response(response)
 
@@ -117,6 +590,7 @@ class RestClient(object):
         :param bool     auth:           do HMAC auth
         :rtype: requests.Response
         """
+        timeout = self.request_timeout(endpoint_url)
         endpoint_url = self.api_endpoint + endpoint_url
 
         if auth is True:
@@ -126,15 +600,14 @@ class RestClient(object):
         params = RestClient.sort_params(params)
 
         # do the post body encoding here since we need it to get the MD5
-        data = json.dumps(data)
+        data, body_headers = self.encode_body(data)
+        params, auth, api_key = self.use_key(endpoint_url, params, auth)
 
-        headers = dict_merge(self.default_headers, {
-            'Date': RestClient.httpdate(datetime.datetime.utcnow()),
-            'Content-MD5': RestClient.content_md5(data),
-            'Content-Type': 'application/json'
-        })
+        headers = dict_merge(self.default_headers, dict_merge(body_headers, {
+            'Date': RestClient.httpdate(datetime.datetime.utcnow())
+        }))
 
-        response = requests.put(endpoint_url, data=data, params=params, headers=headers, auth=auth)
+        response = self.send('PUT', endpoint_url, data=data, params=params, headers=headers, auth=auth, timeout=timeout, api_key=api_key)
 
         return self.handle_response(response)
 
@@ -145,6 +618,7 @@ class RestClient(object):
         :param bool     auth:           do HMAC auth
         :rtype: requests.Response
         """
+        timeout = self.request_timeout(endpoint_url)
         endpoint_url = self.api_endpoint + endpoint_url
 
         if auth is True:
@@ -155,21 +629,43 @@ class RestClient(object):
 
         if data:
             # do the post body encoding here since we need it to get the MD5
-            data = json.dumps(data)
-            content_md5 = RestClient.content_md5(data)
+            data, body_headers = self.encode_body(data)
+            params, auth, api_key = self.use_key(endpoint_url, params, auth)
         else:
-            content_md5 = RestClient.content_md5(urlparse(endpoint_url).path + "?" + urlencode(params))
+            params, auth, api_key = self.use_key(endpoint_url, params, auth)
+            body_headers = {
+                'Content-MD5': RestClient.content_md5(urlparse(endpoint_url).path + "?" + urlencode(params)),
+                'Content-Type': 'application/json'
+            }
 
-        headers = dict_merge(self.default_headers, {
-            'Date': RestClient.httpdate(datetime.datetime.utcnow()),
-            'Content-MD5': content_md5,
-            'Content-Type': 'application/json'
-        })
+        headers = dict_merge(self.default_headers, dict_merge(body_headers, {
+            'Date': RestClient.httpdate(datetime.datetime.utcnow())
+        }))
 
-        response = requests.delete(endpoint_url, data=data, params=params, headers=headers, auth=auth)
+        response = self.send('DELETE', endpoint_url, data=data, params=params, headers=headers, auth=auth, timeout=timeout, api_key=api_key)
 
         return self.handle_response(response)
 
+    def encode_body(self, data):
+        """
+        JSON encode a request body, gzipped when it's at least :compress_requests bytes
+
+        the Content-MD5 is taken over the body as it is sent, so after compression
+
+        :param          data:           the body to encode
+        :rtype: (str|bytes, dict)
+        """
+        data = json.dumps(data)
+        headers = {'Content-Type': 'application/json'}
+
+        if self.compress_requests is not None and len(data) >= self.compress_requests:
+            data = gzip_compress(data.encode("utf-8"))
+            headers['Content-Encoding'] = 'gzip'
+
+        headers['Content-MD5'] = RestClient.content_md5(data)
+
+        return data, headers
+
     def handle_response(self, response):
         """
         helper function to handle the response and raise Exceptions
@@ -210,7 +706,10 @@ class RestClient(object):
 
     @classmethod
     def content_md5(cls, content=""):
-        return hashlib.md5(content.encode("utf-8")).hexdigest()
+        if not isinstance(content, bytes):
+            content = content.encode("utf-8")
+
+        return hashlib.md5(content).hexdigest()
 
     @classmethod
     def httpdate(cls, dt):
@@ -0,0 +1,156 @@
+import hashlib
+import hmac
+import struct
+import unicodedata
+
+from pycoin.encoding import from_bytes_32, to_bytes_32
+from pycoin.key.bip32 import ORDER
+
+try:
+    import coincurve
+except ImportError:
+    coincurve = None
+
+
+class PythonBackend(object):
+    """
+    the EC math of the libraries the wallet was built on: pycoin's pure python derivation and python-bitcoinlib's signing
+    """
+
+    name = 'python'
+
+    def subkey(self, node, i, is_hardened=False):
+        """
+        :param BIP32Node node:          the parent node
+        :param int      i:              the child index
+        :param bool     is_hardened:    hardened derivation
+        :rtype: BIP32Node
+        """
+        return node.subkey(i, is_hardened=is_hardened)
+
+    def subkey_for_path(self, node, path):
+        """
+        :param BIP32Node node:          the parent node
+        :param str      path:           the path of child indexes, eg 9999'/0
+        :rtype: BIP32Node
+        """
+        for i in path.split("/"):
+            node = self.subkey(node, int(i.rstrip("'")), is_hardened=i.endswith("'"))
+
+        return node
+
+    def sign(self, key, sighash):
+        """
+        :param BIP32Node key:           the private key
+        :param bytes    sighash:        the hash to sign
+        :rtype: bytes   DER signature
+        """
+        from bitcoin.wallet import CKey
+
+        # CKey instead of CBitcoinSecret(wif), which only accepts keys of the network of the last SelectParams()
+        return CKey(to_bytes_32(key.secret_exponent()), compressed=True).sign(sighash)
+
+
+class LibSecp256k1Backend(PythonBackend):
+    """
+    libsecp256k1 (through coincurve) for the point multiplications, pubkey serialization and signing,
+     it's native code and releases the GIL
+    """
+
+    name = 'libsecp256k1'
+
+    def subkey(self, node, i, is_hardened=False):
+        if is_hardened:
+            i |= 0x80000000
+
+        secret_exponent = node.secret_exponent()
+
+        if i & 0x80000000:
+            if secret_exponent is None:
+                raise ValueError("can't derive a hardened key from a public key")
+            data = b'\0' + to_bytes_32(secret_exponent)
+        else:
+            data = node.sec(use_uncompressed=False)
+
+        I64 = hmac.new(node.chain_code(), data + struct.pack(">L", i), hashlib.sha512).digest()
+        I_left = from_bytes_32(I64[:32])
+        if I_left >= ORDER:
+            # astronomically unlikely, pycoin knows how to deal with it
+            return super(LibSecp256k1Backend, self).subkey(node, i & 0x7fffffff, is_hardened=bool(i & 0x80000000))
+
+        d = dict(netcode=node._netcode, chain_code=I64[32:], depth=node.tree_depth() + 1,
+                 parent_fingerprint=node.fingerprint(), child_index=i)
+
+        if secret_exponent is None:
+            public_key = coincurve.PublicKey(node.sec(use_uncompressed=False)).add(I64[:32])
+            child = node.__class__(public_pair=public_key.point(), **d)
+        else:
+            child = node.__class__(secret_exponent=(I_left + secret_exponent) % ORDER, **d)
+            # set so pycoin doesn't do the point multiplication itself when the public key is needed
+            child._public_pair = coincurve.PrivateKey(to_bytes_32(child.secret_exponent())).public_key.point()
+
+        return child
+
+    def sign(self, key, sighash):
+        return coincurve.PrivateKey(to_bytes_32(key.secret_exponent())).sign(sighash, hasher=None)
+
+
+BACKENDS = {
+    PythonBackend.name: PythonBackend,
+    LibSecp256k1Backend.name: LibSecp256k1Backend,
+}
+
+
+def available_backends():
+    """
+    the names of the backends that can be used, fastest first
+
+    :rtype: list[str]
+    """
+    return ([LibSecp256k1Backend.name] if coincurve is not None else []) + [PythonBackend.name]
+
+
+def get_backend(name=None):
+    """
+    :param str      name:           the backend to use, the fastest available one when None
+    :rtype: PythonBackend
+    """
+    if name is None:
+        name = available_backends()[0]
+
+    if name not in available_backends():
+        raise ValueError("Crypto backend [%s] isn't available" % name)
+
+    return BACKENDS[name]()
+
+
+# BIP39
+SEED_ROUNDS = 2048
+
+
+def normalize_string(text):
+    if isinstance(text, bytes):
+        text = text.decode("utf-8")
+
+    return unicodedata.normalize("NFKD", text)
+
+
+def mnemonic_to_seed(mnemonic, passphrase=""):
+    """
+    the BIP39 seed of a mnemonic, the same as mnemonic's Mnemonic.to_seed but with OpenSSL's PBKDF2 (hashlib.pbkdf2_hmac),
+     which is many times faster than mnemonic's pure python PBKDF2 and releases the GIL, so seeds can be derived in parallel threads
+
+    :param str      mnemonic:       the mnemonic
+    :param str      passphrase:     the passphrase
+    :rtype: bytes   the 64 byte seed
+    """
+    mnemonic = normalize_string(mnemonic).encode("utf-8")
+    salt = ("mnemonic" + normalize_string(passphrase)).encode("utf-8")
+
+    if not hasattr(hashlib, 'pbkdf2_hmac'):
+        # python < 2.7.8
+        from mnemonic.mnemonic import Mnemonic
+
+        return Mnemonic.to_seed(mnemonic, passphrase)
+
+    return hashlib.pbkdf2_hmac("sha512", mnemonic, salt, SEED_ROUNDS)
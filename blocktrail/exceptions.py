@@ -45,3 +45,11 @@ class GenericHTTPError(BlockTrailSDKException):
 
 class GenericServerError(BlockTrailSDKException):
     pass
+
+
+class RequestTimeout(BlockTrailSDKException):
+    pass
+
+
+class DeadlineExceeded(RequestTimeout):
+    pass
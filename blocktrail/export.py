@@ -0,0 +1,187 @@
+import calendar
+import collections
+import datetime
+import math
+from multiprocessing.pool import ThreadPool
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+# one row per input and per output of a transaction
+COLUMNS = [
+    ('txid', 'string'),
+    ('block_height', 'int64'),
+    ('time', 'timestamp'),
+    ('io', 'string'),
+    ('index', 'int32'),
+    ('address', 'string'),
+    ('value', 'int64'),
+    ('output_hash', 'string'),
+    ('output_index', 'int32'),
+]
+
+
+def schema():
+    """
+    the fixed arrow schema of exported transactions
+
+    :rtype: pyarrow.Schema
+    """
+    if pyarrow is None:
+        raise ImportError("exporting requires pyarrow, install it with `pip install pyarrow`")
+
+    types = {
+        'string': pyarrow.string(),
+        'int64': pyarrow.int64(),
+        'int32': pyarrow.int32(),
+        'timestamp': pyarrow.timestamp('s', tz='UTC'),
+    }
+
+    return pyarrow.schema([(name, types[type]) for name, type in COLUMNS])
+
+
+def parse_time(value):
+    """
+    :param str      value:          API time, eg 2015-03-30T09:41:16+0000
+    :rtype: int
+    """
+    if value is None:
+        return None
+
+    return calendar.timegm(datetime.datetime.strptime(value[:19], "%Y-%m-%dT%H:%M:%S").timetuple())
+
+
+class TransactionExporter(object):
+    """
+    exports the transactions of a paginated endpoint as columnar record batches, to Parquet or Arrow IPC files
+
+    pages are fetched ahead concurrently but only :prefetch pages are held at a time,
+     and rows are handed out in batches of :batch_size, so memory stays bounded however many transactions there are
+    """
+
+    def __init__(self, client, batch_size=65536, page_limit=200, concurrency=4, prefetch=8):
+        """
+        :param APIClient client:          the client to fetch pages with
+        :param int      batch_size:       the amount of rows per record batch
+        :param int      page_limit:       the amount of transactions per page, can be between 1 and 200
+        :param int      concurrency:      the amount of pages to fetch in parallel
+        :param int      prefetch:         the amount of pages to fetch ahead
+        """
+        self.client = client
+        self.batch_size = batch_size
+        self.page_limit = page_limit
+        self.prefetch = prefetch
+        self.pool = ThreadPool(concurrency)
+
+    def pages(self, endpoint, *args):
+        """
+        generator of the transactions of every page of an endpoint, in order
+
+        :param str      endpoint:       the APIClient method, eg 'address_transactions'
+        :param          args:           the arguments for the method (the address, block or wallet identifier)
+        :rtype: collections.Iterable[list]
+        """
+        method = getattr(self.client, endpoint)
+
+        def fetch(page):
+            return method(*args, page=page, limit=self.page_limit)['data']
+
+        first_page = method(*args, page=1, limit=self.page_limit)
+        yield first_page['data']
+
+        pages = int(math.ceil(first_page['total'] / float(self.page_limit)))
+        pending = collections.deque()
+        next_page = 2
+
+        while next_page <= pages or pending:
+            while next_page <= pages and len(pending) < self.prefetch:
+                pending.append(self.pool.apply_async(fetch, (next_page, )))
+                next_page += 1
+
+            yield pending.popleft().get()
+
+    def rows(self, transactions):
+        """
+        flatten transactions into one row per input and per output
+        """
+        for tx in transactions:
+            txid = tx['hash']
+            block_height = tx.get('block_height')
+            time = parse_time(tx.get('time'))
+
+            for txin in tx.get('inputs', []):
+                yield (txid, block_height, time, 'input', txin.get('index'), txin.get('address'), txin.get('value'),
+                       txin.get('output_hash'), txin.get('output_index'))
+
+            for txout in tx.get('outputs', []):
+                yield (txid, block_height, time, 'output', txout.get('index'), txout.get('address'), txout.get('value'),
+                       None, None)
+
+    def record_batches(self, pages):
+        """
+        generator of record batches of (at most) :batch_size rows
+
+        :param pages:                   iterable of lists of transactions, eg pages()
+        :rtype: collections.Iterable[pyarrow.RecordBatch]
+        """
+        arrow_schema = schema()
+        columns = [[] for _ in COLUMNS]
+
+        def batch():
+            arrays = [pyarrow.array(column, type=field.type) for column, field in zip(columns, arrow_schema)]
+            for column in columns:
+                del column[:]
+
+            return pyarrow.RecordBatch.from_arrays(arrays, schema=arrow_schema)
+
+        rows = 0
+        for transactions in pages:
+            for row in self.rows(transactions):
+                for column, value in zip(columns, row):
+                    column.append(value)
+                rows += 1
+
+                if rows == self.batch_size:
+                    yield batch()
+                    rows = 0
+
+        if rows:
+            yield batch()
+
+    def export(self, path, endpoint, *args, **kwargs):
+        """
+        write all the transactions of an endpoint to a file
+
+        :param str      path:           the file to write
+        :param str      endpoint:       'address_transactions', 'block_transactions' or 'wallet_transactions'
+        :param          args:           the arguments for the endpoint (the address, block or wallet identifier)
+        :param str      format:         'parquet' or 'arrow' (Arrow IPC file)
+        :rtype: int     the amount of rows written
+        """
+        format = kwargs.get('format', 'parquet')
+        arrow_schema = schema()
+
+        if format == 'parquet':
+            writer = pyarrow.parquet.ParquetWriter(path, arrow_schema)
+        elif format == 'arrow':
+            writer = pyarrow.ipc.new_file(path, arrow_schema)
+        else:
+            raise ValueError("Unknown format [%s]" % format)
+
+        rows = 0
+        try:
+            for batch in self.record_batches(self.pages(endpoint, *args)):
+                writer.write_batch(batch)
+                rows += batch.num_rows
+        finally:
+            writer.close()
+
+        return rows
+
+    def close(self):
+        self.pool.terminate()
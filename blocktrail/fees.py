@@ -0,0 +1,129 @@
+from __future__ import division
+from six import integer_types
+
+# the sizes of the scriptPubKey of each type of output
+OUTPUT_SCRIPT_SIZES = {
+    'p2pkh': 25,
+    'p2sh': 23,
+    'p2wpkh': 22,
+    'p2wsh': 34,
+}
+
+PUBKEY_SIZE = 33
+
+# a DER signature is at most 72 bytes, plus 1 for the sighash type;
+#  low-S signatures (like the libsecp256k1 backend makes) are 71 or 72 bytes, so estimating with the max never underpays
+SIGNATURE_SIZE = 73
+
+DEFAULT_FEE_PER_KB = 10000
+
+
+def varint_size(n):
+    if n < 0xfd:
+        return 1
+    if n <= 0xffff:
+        return 3
+    if n <= 0xffffffff:
+        return 5
+    return 9
+
+
+def push_size(n):
+    """
+    the size of pushing :n bytes onto the stack, including the data
+    """
+    if n < 0x4c:
+        return 1 + n
+    if n <= 0xff:
+        return 2 + n
+    if n <= 0xffff:
+        return 3 + n
+    return 5 + n
+
+
+def redeem_script_size(pubkeys=3):
+    # OP_m <pubkey> * pubkeys OP_n OP_CHECKMULTISIG
+    return 1 + pubkeys * (1 + PUBKEY_SIZE) + 1 + 1
+
+
+def script_sig_size(signatures=2, signature_size=SIGNATURE_SIZE, pubkeys=3):
+    # OP_0 <sig> * signatures <redeemScript>
+    return 1 + signatures * push_size(signature_size) + push_size(redeem_script_size(pubkeys))
+
+
+def input_size(signatures=2, signature_size=SIGNATURE_SIZE, pubkeys=3):
+    """
+    the size of a P2SH multisig input (2-of-3 for wallets)
+
+    :param int      signatures:     the amount of signatures in the scriptSig (2 once BlockTrail cosigned it)
+    :param int      signature_size: the size of each signature, including the sighash type
+    :rtype: int
+    """
+    script_size = script_sig_size(signatures, signature_size, pubkeys)
+
+    # outpoint + script + sequence
+    return 36 + varint_size(script_size) + script_size + 4
+
+
+def output_size(script_type='p2sh'):
+    """
+    :param str|int  script_type:    'p2pkh', 'p2sh', 'p2wpkh', 'p2wsh' or the size of the scriptPubKey
+    :rtype: int
+    """
+    script_size = OUTPUT_SCRIPT_SIZES[script_type] if not isinstance(script_type, integer_types) else script_type
+
+    # value + script
+    return 8 + varint_size(script_size) + script_size
+
+
+def script_type_for_address(address, params=None):
+    """
+    :param str      address:        a base58 address
+    :param          params:         the network the address has to be for, None for any (see blocktrail.network)
+    :rtype: str     'p2pkh' or 'p2sh'
+    """
+    from blocktrail.network import decode_address
+
+    return decode_address(address, params)[0]
+
+
+def transaction_size(inputs, outputs, signatures=2, signature_size=SIGNATURE_SIZE):
+    """
+    the serialized size of a wallet transaction, computed from its shape without building or signing it
+
+    :param int      inputs:         the amount of (2-of-3 P2SH) inputs
+    :param int|dict|list outputs:   the amount of P2SH outputs, a dict of script type => amount of outputs,
+                                     or a list of script types
+    :param int      signatures:     the amount of signatures per input (2 once BlockTrail cosigned it)
+    :param int      signature_size: the size of each signature, including the sighash type
+    :rtype: int
+    """
+    if isinstance(outputs, integer_types):
+        outputs = {'p2sh': outputs}
+    elif isinstance(outputs, list):
+        counts = {}
+        for script_type in outputs:
+            counts[script_type] = counts.get(script_type, 0) + 1
+        outputs = counts
+
+    output_count = sum(outputs.values())
+
+    inputs_size = varint_size(inputs) + inputs * input_size(signatures, signature_size)
+    outputs_size = varint_size(output_count) + sum(count * output_size(script_type) for script_type, count in outputs.items())
+
+    # version + inputs + outputs + locktime
+    return 4 + inputs_size + outputs_size + 4
+
+
+def estimate_fee(inputs, outputs, fee_per_kb=DEFAULT_FEE_PER_KB, signature_size=SIGNATURE_SIZE):
+    """
+    the fee for a fully signed wallet transaction, at :fee_per_kb satoshi per 1000 bytes (rounded up)
+
+    :param int      inputs:         the amount of inputs
+    :param int|dict|list outputs:   the outputs, as for transaction_size
+    :param int      fee_per_kb:     satoshi per 1000 bytes
+    :rtype: int
+    """
+    size = transaction_size(inputs, outputs, signature_size=signature_size)
+
+    return -(-size * fee_per_kb // 1000)
@@ -0,0 +1,168 @@
+import collections
+import json
+import math
+import os
+import threading
+from multiprocessing.pool import ThreadPool
+from blocktrail.store import write_atomic
+
+
+class ChainEvent(object):
+    BLOCK = 'block'
+    ROLLBACK = 'rollback'
+
+    def __init__(self, type, height, hash, block=None, transactions=None):
+        """
+        :param str      type:           ChainEvent.BLOCK for a new block, ChainEvent.ROLLBACK for a block that was reorged out
+        :param int      height:         the block height
+        :param str      hash:           the block hash
+        :param dict     block:          the block (only for BLOCK events)
+        :param list     transactions:   all the transactions of the block (only for BLOCK events)
+        """
+        self.type = type
+        self.height = height
+        self.hash = hash
+        self.block = block
+        self.transactions = transactions
+
+    def __repr__(self):
+        return "ChainEvent(%s, %d, %s)" % (self.type, self.height, self.hash)
+
+
+class ChainFollower(object):
+    """
+    streams the blocks of the chain in order, starting from a checkpoint height
+
+    upcoming blocks (and their transaction pages) are prefetched concurrently,
+     when a block doesn't build on the previous one the previous one is rolled back until the chain links up again.
+
+    the position is persisted in :checkpoint_file after each event has been handled by the consumer,
+     so after a restart the follower resumes with the first event that wasn't handled yet.
+    """
+
+    def __init__(self, client, start_height=0, checkpoint_file=None, confirmations=0, transactions=True,
+                 prefetch=20, concurrency=4, page_limit=200, poll_interval=30, max_reorg_depth=100):
+        """
+        :param APIClient client:          the client to fetch blocks with
+        :param int      start_height:     the first block to stream (ignored when resuming from :checkpoint_file)
+        :param str      checkpoint_file:  file to persist the position in
+        :param int      confirmations:    only stream blocks with at least this many confirmations
+        :param bool     transactions:     fetch all the transactions of each block
+        :param int      prefetch:         the amount of blocks to fetch ahead
+        :param int      concurrency:      the amount of requests to do in parallel
+        :param int      page_limit:       the amount of transactions per page, can be between 1 and 200
+        :param int      poll_interval:    seconds to wait for a new block when the follower has caught up
+        :param int      max_reorg_depth:  the amount of block hashes to keep for detecting reorgs
+        """
+        self.client = client
+        self.checkpoint_file = checkpoint_file
+        self.confirmations = confirmations
+        self.transactions = transactions
+        self.prefetch = prefetch
+        self.page_limit = page_limit
+        self.poll_interval = poll_interval
+        self.max_reorg_depth = max_reorg_depth
+
+        self.height = start_height
+        # (height, hash) of the most recent blocks that were streamed
+        self.chain = collections.deque(maxlen=max_reorg_depth)
+        self.load_checkpoint()
+
+        self.pool = ThreadPool(concurrency)
+        self.page_pool = ThreadPool(concurrency) if transactions else None
+        self.stopped = threading.Event()
+
+    def load_checkpoint(self):
+        if self.checkpoint_file is None or not os.path.exists(self.checkpoint_file):
+            return
+
+        with open(self.checkpoint_file) as f:
+            checkpoint = json.load(f)
+
+        self.height = checkpoint['height']
+        self.chain.extend([tuple(block) for block in checkpoint['chain']])
+
+    def save_checkpoint(self):
+        if self.checkpoint_file is None:
+            return
+
+        write_atomic(self.checkpoint_file, json.dumps({'height': self.height, 'chain': list(self.chain)}))
+
+    def fetch(self, height):
+        """
+        fetch a block and all of its transactions
+
+        :rtype: (dict, list)
+        """
+        block = self.client.block(height)
+        if not self.transactions:
+            return block, None
+
+        first_page = self.client.block_transactions(block['hash'], page=1, limit=self.page_limit)
+        pages = int(math.ceil(first_page['total'] / float(self.page_limit)))
+
+        transactions = list(first_page['data'])
+        for page in self.page_pool.map(lambda page: self.client.block_transactions(block['hash'], page=page, limit=self.page_limit)['data'],
+                                       range(2, pages + 1)):
+            transactions.extend(page)
+
+        return block, transactions
+
+    def target_height(self):
+        return self.client.block_latest()['height'] - self.confirmations
+
+    def follow(self):
+        """
+        generator of ChainEvent, runs until stop() is called
+
+        :rtype: collections.Iterable[ChainEvent]
+        """
+        while not self.stopped.is_set():
+            target = self.target_height()
+            if self.height > target:
+                self.stopped.wait(self.poll_interval)
+                continue
+
+            for event in self.catch_up(target):
+                yield event
+
+                # persisted once the consumer is done with the event
+                self.save_checkpoint()
+
+                if self.stopped.is_set():
+                    return
+
+    def catch_up(self, target):
+        """
+        stream blocks up to :target, prefetching the next :prefetch blocks while the consumer handles the current one
+        """
+        pending = collections.deque()
+        next_fetch = self.height
+
+        while self.height <= target:
+            while next_fetch <= target and len(pending) < self.prefetch:
+                pending.append(self.pool.apply_async(self.fetch, (next_fetch, )))
+                next_fetch += 1
+
+            block, transactions = pending.popleft().get()
+
+            if self.chain and block['prev_block'] != self.chain[-1][1]:
+                # the block doesn't build on our tip, roll the tip back and fetch that height again,
+                #  anything that was prefetched after it is dropped
+                height, hash = self.chain.pop()
+                self.height = height
+                yield ChainEvent(ChainEvent.ROLLBACK, height, hash)
+                return
+
+            self.chain.append((block['height'], block['hash']))
+            self.height = block['height'] + 1
+            yield ChainEvent(ChainEvent.BLOCK, block['height'], block['hash'], block, transactions)
+
+    def stop(self):
+        self.stopped.set()
+
+    def close(self):
+        self.stop()
+        self.pool.terminate()
+        if self.page_pool is not None:
+            self.page_pool.terminate()
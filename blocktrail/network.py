@@ -0,0 +1,83 @@
+from bitcoin import MainParams, TestNetParams
+from bitcoin.base58 import CBase58Data
+from bitcoin.core import Hash160
+from bitcoin.core.script import CScript, OP_DUP, OP_HASH160, OP_EQUAL, OP_EQUALVERIFY, OP_CHECKSIG
+
+# python-bitcoinlib's CBitcoinAddress encodes with the params of the last SelectParams() of the process,
+#  so every APIClient / Wallet carries its own params and encodes / decodes addresses with these helpers instead.
+#  bitcoin.wallet (and the OpenSSL bindings it loads) is only imported to raise its CBitcoinAddressError
+NETWORK_PARAMS = {
+    'mainnet': MainParams(),
+    'testnet': TestNetParams(),
+}
+
+# OP_DUP OP_HASH160 <20 bytes> OP_EQUALVERIFY OP_CHECKSIG
+P2PKH_PREFIX = b'\x76\xa9\x14'
+P2PKH_SUFFIX = b'\x88\xac'
+
+
+def get_params(testnet=False):
+    """
+    :param bool     testnet:        testnet network yes/no
+    :rtype: bitcoin.core.CoreChainParams
+    """
+    return NETWORK_PARAMS['testnet' if testnet else 'mainnet']
+
+
+def address_from_script_pub_key(script_pub_key, params):
+    """
+    :param CScript  script_pub_key: a P2SH or P2PKH scriptPubKey
+    :param          params:         the network params to encode the address for
+    :rtype: str
+    """
+    if script_pub_key.is_p2sh():
+        return str(CBase58Data.from_bytes(script_pub_key[2:22], params.BASE58_PREFIXES['SCRIPT_ADDR']))
+
+    if len(script_pub_key) == 25 and bytes(script_pub_key[0:3]) == P2PKH_PREFIX and bytes(script_pub_key[23:25]) == P2PKH_SUFFIX:
+        return str(CBase58Data.from_bytes(script_pub_key[3:23], params.BASE58_PREFIXES['PUBKEY_ADDR']))
+
+    from bitcoin.wallet import CBitcoinAddressError
+
+    raise CBitcoinAddressError("scriptPubKey not a valid address")
+
+
+def p2pkh_address(pubkey, params):
+    """
+    :param bytes    pubkey:         a serialized public key
+    :param          params:         the network params to encode the address for
+    :rtype: str
+    """
+    return str(CBase58Data.from_bytes(Hash160(pubkey), params.BASE58_PREFIXES['PUBKEY_ADDR']))
+
+
+def decode_address(address, params=None):
+    """
+    :param str      address:        a base58 address
+    :param          params:         the network the address has to be for, None to accept any of NETWORK_PARAMS
+    :rtype: (str, bytes)            ('p2sh' or 'p2pkh', the hash160)
+    """
+    data = CBase58Data(address)
+
+    for network_params in ([params] if params is not None else NETWORK_PARAMS.values()):
+        if data.nVersion == network_params.BASE58_PREFIXES['SCRIPT_ADDR']:
+            return 'p2sh', data.to_bytes()
+        if data.nVersion == network_params.BASE58_PREFIXES['PUBKEY_ADDR']:
+            return 'p2pkh', data.to_bytes()
+
+    from bitcoin.wallet import CBitcoinAddressError
+
+    raise CBitcoinAddressError("Version %d not a recognized address of this network" % data.nVersion)
+
+
+def script_pub_key_for_address(address, params=None):
+    """
+    :param str      address:        a base58 address
+    :param          params:         the network the address has to be for, None to accept any of NETWORK_PARAMS
+    :rtype: CScript
+    """
+    script_type, hash160 = decode_address(address, params)
+
+    if script_type == 'p2sh':
+        return CScript([OP_HASH160, hash160, OP_EQUAL])
+
+    return CScript([OP_DUP, OP_HASH160, hash160, OP_EQUALVERIFY, OP_CHECKSIG])
@@ -0,0 +1,204 @@
+import collections
+import multiprocessing
+import threading
+from multiprocessing.pool import ThreadPool
+
+from blocktrail.wallet import sign_transaction
+
+
+def run_stage(fn, *args):
+    # exceptions are returned instead of raised, so the pool's callback always fires
+    try:
+        return fn(*args), None
+    except Exception as e:
+        return None, e
+
+
+class Payment(object):
+    def __init__(self, wallet, pay, kwargs):
+        """
+        :param Wallet   wallet:         the wallet to pay from
+        :param list|dict pay:           the outputs, as for Wallet.pay
+        :param dict     kwargs:         the other arguments for Wallet.pay
+        """
+        self.wallet = wallet
+        self.pay = pay
+        self.kwargs = kwargs
+        self.seq = None
+
+        self.utxos = None
+        self.raw_tx = None
+        self.txid = None
+        self.error = None
+        self.done = threading.Event()
+
+    def get(self, timeout=None):
+        """
+        wait for the payment to be broadcasted
+
+        :rtype: str     the txid
+        """
+        if not self.done.wait(timeout):
+            raise RuntimeError("Payment not done after %ss" % timeout)
+
+        if self.error is not None:
+            raise self.error
+
+        return self.txid
+
+
+class WalletLane(object):
+    """
+    the payments of a single wallet, selected one at a time and broadcasted in the order they were submitted
+    """
+
+    def __init__(self):
+        self.submitted = 0
+        self.pending = collections.deque()
+        self.selecting = False
+
+        # seq => signed (or failed) payment, waiting for its turn to be broadcasted
+        self.ready = {}
+        self.next_broadcast = 0
+        self.broadcasting = False
+
+
+class PaymentExecutor(object):
+    """
+    runs many Wallet.pay's at once by splitting them into stages:
+     coin selection (+ change address), signing and broadcasting.
+
+    the network stages run on a thread pool and signing on its own pool, threads by default or
+     :signing_processes processes (the signing keys are sent to those processes).
+
+    payments of the same wallet are ordered: the coin selection of a payment starts once the previous one's UTXOs are
+     locked, and they're broadcasted in the order they were submitted. payments of different wallets don't wait on each other.
+    """
+
+    def __init__(self, network_workers=16, signing_workers=4, signing_processes=0):
+        """
+        :param int      network_workers:    the amount of coin selections / broadcasts to do in parallel
+        :param int      signing_workers:    the amount of signing threads (when :signing_processes is 0)
+        :param int      signing_processes:  sign in this many processes instead of threads
+        """
+        self.network_pool = ThreadPool(network_workers)
+        if signing_processes:
+            self.signing_pool = multiprocessing.Pool(signing_processes)
+        else:
+            self.signing_pool = ThreadPool(signing_workers)
+
+        self.lock = threading.Lock()
+        self.lanes = {}
+
+    def submit(self, wallet, pay, **kwargs):
+        """
+        queue a payment, takes the same arguments as Wallet.pay
+
+        :rtype: Payment
+        """
+        payment = Payment(wallet, pay, kwargs)
+
+        with self.lock:
+            lane = self.lanes.setdefault(wallet.identifier, WalletLane())
+            payment.seq = lane.submitted
+            lane.submitted += 1
+            lane.pending.append(payment)
+
+            self.schedule_selection(lane)
+
+        return payment
+
+    def pay_many(self, payments):
+        """
+        :param list     payments:       (wallet, pay) tuples
+        :rtype: list    the txid of each payment (or the exception it failed with)
+        """
+        submitted = [self.submit(wallet, pay) for wallet, pay in payments]
+
+        for payment in submitted:
+            payment.done.wait()
+
+        return [payment.error if payment.error is not None else payment.txid for payment in submitted]
+
+    def schedule_selection(self, lane):
+        # called with the lock held
+        if lane.selecting or not lane.pending:
+            return
+
+        payment = lane.pending.popleft()
+        lane.selecting = True
+
+        self.network_pool.apply_async(run_stage, (self.select, payment), callback=lambda result: self.selected(lane, payment, result))
+
+    def select(self, payment):
+        wallet = payment.wallet
+        kwargs = payment.kwargs
+
+        send, payment.utxos, change_address = wallet.select_coins(payment.pay,
+                                                                  change_address=kwargs.get('change_address'),
+                                                                  allow_zero_conf=kwargs.get('allow_zero_conf', False),
+                                                                  fee_strategy=kwargs.get('fee_strategy', 'optimal'))
+
+        tx = wallet.build_transaction(send, payment.utxos, change_address=change_address,
+                                      randomize_change_idx=kwargs.get('randomize_change_idx', True))
+
+        return (wallet.crypto, tx.serialize(), wallet.get_signing_keys(payment.utxos), [utxo['redeem_script'] for utxo in payment.utxos])
+
+    def selected(self, lane, payment, result):
+        sign_args, error = result
+
+        with self.lock:
+            lane.selecting = False
+            self.schedule_selection(lane)
+
+        if error is not None:
+            self.failed(lane, payment, error)
+            return
+
+        self.signing_pool.apply_async(run_stage, (sign_transaction, ) + sign_args, callback=lambda result: self.signed(lane, payment, result))
+
+    def signed(self, lane, payment, result):
+        payment.raw_tx, error = result
+
+        if error is not None:
+            self.failed(lane, payment, error)
+            return
+
+        with self.lock:
+            lane.ready[payment.seq] = payment
+            self.schedule_broadcast(lane)
+
+    def failed(self, lane, payment, error):
+        payment.error = error
+        payment.done.set()
+
+        # its turn to broadcast is skipped
+        with self.lock:
+            lane.ready[payment.seq] = payment
+            self.schedule_broadcast(lane)
+
+    def schedule_broadcast(self, lane):
+        # called with the lock held
+        while not lane.broadcasting and lane.next_broadcast in lane.ready:
+            payment = lane.ready.pop(lane.next_broadcast)
+
+            if payment.error is not None:
+                lane.next_broadcast += 1
+                continue
+
+            lane.broadcasting = True
+            self.network_pool.apply_async(run_stage, (payment.wallet.send_signed_transaction, payment.raw_tx, payment.utxos),
+                                          callback=lambda result, payment=payment: self.broadcasted(lane, payment, result))
+
+    def broadcasted(self, lane, payment, result):
+        payment.txid, payment.error = result
+        payment.done.set()
+
+        with self.lock:
+            lane.broadcasting = False
+            lane.next_broadcast += 1
+            self.schedule_broadcast(lane)
+
+    def close(self):
+        self.network_pool.terminate()
+        self.signing_pool.terminate()
@@ -0,0 +1,108 @@
+import threading
+import time
+
+DEFAULT_ENDPOINTS = ('block_latest', 'price')
+
+
+class RefreshedValue(object):
+    def __init__(self, value, fetched_at, error=None):
+        """
+        :param          value:          the last value that was fetched
+        :param float    fetched_at:     when it was fetched (time.time())
+        :param Exception error:         the error of the last refresh, when it failed (the value is kept)
+        """
+        self.value = value
+        self.fetched_at = fetched_at
+        self.error = error
+
+    @property
+    def age(self):
+        """
+        seconds since the value was fetched
+        """
+        return time.time() - self.fetched_at
+
+    def __repr__(self):
+        return "RefreshedValue(%r, age=%.1fs)" % (self.value, self.age)
+
+
+class Refresher(object):
+    """
+    keeps the values of hot, volatile endpoints (the latest block and the price by default) in memory
+     and refreshes them in the background every :interval seconds (stale-while-revalidate)
+
+    get() returns the last value right away, along with its age; only the very first get() of an endpoint waits for it.
+    a refresh that fails keeps the previous value (and records the error), so callers keep getting the last good value.
+    """
+
+    def __init__(self, client, interval=10, endpoints=DEFAULT_ENDPOINTS):
+        """
+        :param APIClient client:        the client to refresh with
+        :param float    interval:       seconds between refreshes
+        :param list     endpoints:      the names of the APIClient methods (without arguments) to keep refreshed
+        """
+        self.client = client
+        self.interval = interval
+        self.endpoints = list(endpoints)
+
+        self.lock = threading.Lock()
+        # endpoint => RefreshedValue, replaced as a whole on every refresh
+        self.values = {}
+        self.stopped = threading.Event()
+
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def get(self, endpoint):
+        """
+        :param str      endpoint:       one of :endpoints
+        :rtype: RefreshedValue
+        """
+        value = self.values.get(endpoint)
+        if value is not None:
+            return value
+
+        if endpoint not in self.endpoints:
+            raise KeyError("%s isn't refreshed" % endpoint)
+
+        # nothing fetched yet
+        with self.lock:
+            if endpoint not in self.values:
+                self.refresh(endpoint)
+
+        return self.values[endpoint]
+
+    def refresh(self, endpoint):
+        """
+        fetch :endpoint now, a failure is raised and recorded on the previous value (which is kept)
+        """
+        try:
+            self.values[endpoint] = RefreshedValue(getattr(self.client, endpoint)(), time.time())
+        except Exception as e:
+            previous = self.values.get(endpoint)
+            if previous is not None:
+                self.values[endpoint] = RefreshedValue(previous.value, previous.fetched_at, error=e)
+            raise
+
+    def run(self):
+        while not self.stopped.is_set():
+            for endpoint in self.endpoints:
+                if self.stopped.is_set():
+                    return
+
+                try:
+                    self.refresh(endpoint)
+                except Exception:
+                    # retried on the next interval, get() keeps returning the previous value
+                    pass
+
+            self.stopped.wait(self.interval)
+
+    def stop(self):
+        """
+        stop refreshing, waits for a refresh that's in progress
+        """
+        self.stopped.set()
+        if self.thread is not threading.current_thread():
+            self.thread.join()
@@ -0,0 +1,139 @@
+import mmap
+import os
+import struct
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# tokens, time of the last refill
+BUCKET_FORMAT = "dd"
+BUCKET_SIZE = struct.calcsize(BUCKET_FORMAT)
+
+
+class SharedTokenBucket(object):
+    """
+    a token bucket in a memory-mapped file, so every process on the host that opens the same file shares one budget
+     (eg all the workers of a pre-fork server sharing the API quota)
+
+    reading the state is lock-free, taking tokens holds an flock on the file for the few microseconds of the update.
+    every process opens the file itself (a bucket created before forking is reopened in the children),
+     flock doesn't exclude processes that share one open file.
+    the cache for immutable block / transaction responses that goes with it is blocktrail.store.SQLiteStore,
+     which is shared between processes the same way.
+    """
+
+    def __init__(self, path, rate, burst=None):
+        """
+        :param str      path:           the file to share the bucket through, created when it doesn't exist
+        :param float    rate:           tokens (requests) per second
+        :param float    burst:          the size of the bucket, :rate by default
+        """
+        if fcntl is None:
+            raise ImportError("SharedTokenBucket requires fcntl (a POSIX system)")
+
+        self.path = path
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else rate)
+
+        self.pid = None
+        self.open()
+
+    def open(self):
+        """
+        the file and map of the current process, opened again after a fork
+        """
+        if self.pid != os.getpid():
+            self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            self.thread_lock = threading.Lock()
+            self.pid = os.getpid()
+
+            with self.locked():
+                if os.fstat(self.fd).st_size < BUCKET_SIZE:
+                    os.ftruncate(self.fd, BUCKET_SIZE)
+                    os.write(self.fd, struct.pack(BUCKET_FORMAT, self.burst, time.time()))
+
+            self.map = mmap.mmap(self.fd, BUCKET_SIZE)
+
+        return self.map
+
+    def locked(self):
+        """
+        held by one thread of one process at a time, flock only excludes other processes
+        """
+        return FileLock(self.fd, self.thread_lock)
+
+    def state(self):
+        """
+        :rtype: (float, float)          (tokens, time of the last refill)
+        """
+        return struct.unpack(BUCKET_FORMAT, self.open()[:BUCKET_SIZE])
+
+    def available(self):
+        """
+        the amount of tokens that can be taken right now, read without locking
+        """
+        tokens, refilled = self.state()
+
+        return min(self.burst, tokens + (time.time() - refilled) * self.rate)
+
+    def try_acquire(self, tokens=1):
+        """
+        take :tokens when they're available
+
+        :rtype: float   0 when they were taken, otherwise the seconds until they will be available
+        """
+        self.open()
+        with self.locked():
+            available, refilled = self.state()
+            now = time.time()
+            available = min(self.burst, available + max(0, now - refilled) * self.rate)
+
+            if available >= tokens:
+                self.map[:BUCKET_SIZE] = struct.pack(BUCKET_FORMAT, available - tokens, now)
+                return 0
+
+            return (tokens - available) / self.rate
+
+    def acquire(self, tokens=1, timeout=None):
+        """
+        take :tokens, waiting for them when needed
+
+        :param float    timeout:        seconds to wait at most, None to wait as long as it takes
+        :rtype: bool    False when the tokens couldn't be taken within :timeout
+        """
+        deadline = time.time() + timeout if timeout is not None else None
+
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait == 0:
+                return True
+
+            if deadline is not None:
+                if time.time() + wait > deadline:
+                    return False
+
+            time.sleep(wait)
+
+    def close(self):
+        if self.pid == os.getpid():
+            self.map.close()
+            os.close(self.fd)
+            self.pid = None
+
+
+class FileLock(object):
+    def __init__(self, fd, thread_lock):
+        self.fd = fd
+        self.thread_lock = thread_lock
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+
+    def __exit__(self, *exc):
+        fcntl.flock(self.fd, fcntl.LOCK_UN)
+        self.thread_lock.release()
@@ -0,0 +1,261 @@
+import json
+import os
+import sqlite3
+import threading
+from six import string_types
+
+STORE_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS blocks (
+        hash TEXT PRIMARY KEY,
+        height INTEGER NOT NULL,
+        data TEXT NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS blocks_height ON blocks (height)",
+    """CREATE TABLE IF NOT EXISTS transactions (
+        txid TEXT PRIMARY KEY,
+        block_hash TEXT,
+        block_height INTEGER,
+        data TEXT NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS transactions_block_hash ON transactions (block_hash)",
+    "CREATE INDEX IF NOT EXISTS transactions_block_height ON transactions (block_height)",
+    """CREATE TABLE IF NOT EXISTS transaction_addresses (
+        address TEXT NOT NULL,
+        txid TEXT NOT NULL,
+        PRIMARY KEY (address, txid)
+    )""",
+    """CREATE TABLE IF NOT EXISTS block_pages (
+        block_hash TEXT NOT NULL,
+        page INTEGER NOT NULL,
+        lim INTEGER NOT NULL,
+        sort_dir TEXT NOT NULL,
+        total INTEGER NOT NULL,
+        txids TEXT NOT NULL,
+        PRIMARY KEY (block_hash, page, lim, sort_dir)
+    )""",
+]
+
+
+def is_block_hash(block):
+    return isinstance(block, string_types) and len(block) == 64
+
+
+def update_confirmations(data, tip_height):
+    """
+    set the `confirmations` of a stored block or transaction to what they are with :tip_height as the latest block
+
+    :param dict     data:           the block or transaction as it was returned by get_block / get_transaction
+    :param int      tip_height:     the height of the latest block, None to keep the stored count (a lower bound)
+    :rtype: dict
+    """
+    height = data['block_height'] if 'block_height' in data else data.get('height')
+    if height is not None and tip_height is not None:
+        data['confirmations'] = max(0, tip_height - height + 1)
+
+    return data
+
+
+def write_atomic(path, content):
+    """
+    write :content (str or bytes) to :path through a temporary file that replaces it,
+     so a crash never leaves a half written file
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb" if isinstance(content, bytes) else "w") as f:
+        f.write(content)
+
+    getattr(os, 'replace', os.rename)(tmp_path, path)
+
+
+class SQLiteDatabase(object):
+    """
+    an SQLite database in WAL mode with a connection per thread and per process,
+     so any number of threads and processes on the same host can share one file
+    """
+
+    SCHEMA = []
+
+    def __init__(self, path, timeout=30):
+        """
+        :param str      path:               the SQLite database file
+        :param int      timeout:            seconds to wait for another process' write lock
+        """
+        self.path = path
+        self.timeout = timeout
+        self.local = threading.local()
+
+        db = self.db()
+        db.execute("PRAGMA journal_mode=WAL")
+        with db:
+            for statement in self.SCHEMA:
+                db.execute(statement)
+
+    def db(self):
+        """
+        the connection of the current thread, connections aren't shared between threads or forked processes
+        """
+        if getattr(self.local, 'pid', None) != os.getpid():
+            self.local.db = sqlite3.connect(self.path, timeout=self.timeout)
+            self.local.db.execute("PRAGMA synchronous=NORMAL")
+            self.local.pid = os.getpid()
+
+        return self.local.db
+
+
+class SQLiteStore(SQLiteDatabase):
+    """
+    local persistent store of blocks and transactions, used by APIClient to read through / write through
+     block(), transaction() and block_transactions()
+
+    only data with at least :min_confirmations confirmations is stored, so what's in the store doesn't change anymore
+     (except for its `confirmations` count, which is frozen at the time it was stored: APIClient brings it up to date
+     with the refresher's latest block when it's running, otherwise it's a lower bound, see update_confirmations).
+    a block that's stored for a height replaces the one that was stored for it before (which was orphaned).
+
+    readers never block each other and writers only block for the duration of a single insert.
+    """
+
+    SCHEMA = STORE_SCHEMA
+
+    def __init__(self, path, min_confirmations=6, timeout=30):
+        """
+        :param str      path:               the SQLite database file
+        :param int      min_confirmations:  only store blocks and transactions with at least this many confirmations
+        :param int      timeout:            seconds to wait for another process' write lock
+        """
+        self.min_confirmations = min_confirmations
+
+        super(SQLiteStore, self).__init__(path, timeout=timeout)
+
+    def confirmed(self, data):
+        return data.get('confirmations', 0) >= self.min_confirmations
+
+    def get_block(self, block):
+        """
+        :param str|int  block:          the block hash or block height
+        :rtype: dict|None
+        """
+        if is_block_hash(block):
+            row = self.db().execute("SELECT data FROM blocks WHERE hash = ?", (block, )).fetchone()
+        else:
+            row = self.db().execute("SELECT data FROM blocks WHERE height = ?", (int(block), )).fetchone()
+
+        return json.loads(row[0]) if row else None
+
+    def put_block(self, block):
+        if not self.confirmed(block):
+            return
+
+        db = self.db()
+        with db:
+            orphaned = [row[0] for row in db.execute("SELECT hash FROM blocks WHERE height = ? AND hash != ?",
+                                                     (block['height'], block['hash'])).fetchall()]
+            self.delete_blocks(db, orphaned)
+            db.execute("INSERT OR REPLACE INTO blocks (hash, height, data) VALUES (?, ?, ?)",
+                       (block['hash'], block['height'], json.dumps(block)))
+
+    def delete_blocks(self, db, block_hashes):
+        """
+        delete blocks along with their transactions and pages, eg the blocks of an orphaned fork
+        """
+        for block_hash in block_hashes:
+            db.execute("DELETE FROM transaction_addresses WHERE txid IN (SELECT txid FROM transactions WHERE block_hash = ?)",
+                       (block_hash, ))
+            db.execute("DELETE FROM transactions WHERE block_hash = ?", (block_hash, ))
+            db.execute("DELETE FROM block_pages WHERE block_hash = ?", (block_hash, ))
+            db.execute("DELETE FROM blocks WHERE hash = ?", (block_hash, ))
+
+    def get_transaction(self, txid):
+        """
+        :param str      txid:           the transaction hash
+        :rtype: dict|None
+        """
+        row = self.db().execute("SELECT data FROM transactions WHERE txid = ?", (txid, )).fetchone()
+
+        return json.loads(row[0]) if row else None
+
+    def put_transactions(self, transactions):
+        transactions = [tx for tx in transactions if self.confirmed(tx)]
+        if not transactions:
+            return
+
+        db = self.db()
+        with db:
+            self.insert_transactions(db, transactions)
+
+    def put_transaction(self, transaction):
+        self.put_transactions([transaction])
+
+    def insert_transactions(self, db, transactions):
+        db.executemany("INSERT OR REPLACE INTO transactions (txid, block_hash, block_height, data) VALUES (?, ?, ?, ?)",
+                       [(tx['hash'], tx.get('block_hash'), tx.get('block_height'), json.dumps(tx)) for tx in transactions])
+        db.executemany("INSERT OR IGNORE INTO transaction_addresses (address, txid) VALUES (?, ?)",
+                       [(io['address'], tx['hash'])
+                        for tx in transactions for io in tx.get('inputs', []) + tx.get('outputs', []) if io.get('address')])
+
+    def get_block_transactions(self, block, page, limit, sort_dir):
+        """
+        a page of block_transactions as it was stored by put_block_transactions
+
+        :rtype: dict|None
+        """
+        if not is_block_hash(block):
+            row = self.db().execute("SELECT hash FROM blocks WHERE height = ?", (int(block), )).fetchone()
+            if row is None:
+                return None
+            block = row[0]
+
+        row = self.db().execute("SELECT total, txids FROM block_pages WHERE block_hash = ? AND page = ? AND lim = ? AND sort_dir = ?",
+                                (block, page, limit, sort_dir)).fetchone()
+        if row is None:
+            return None
+
+        total, txids = row[0], json.loads(row[1])
+        transactions = [self.get_transaction(txid) for txid in txids]
+        if None in transactions:
+            return None
+
+        return {'current_page': page, 'per_page': limit, 'total': total, 'data': transactions}
+
+    def put_block_transactions(self, block, page, limit, sort_dir, result):
+        """
+        store a page of block_transactions, only when all of its transactions are confirmed
+        """
+        transactions = result['data']
+        if not all(self.confirmed(tx) for tx in transactions) or not transactions:
+            return
+
+        block_hash = block if is_block_hash(block) else transactions[0].get('block_hash')
+        if block_hash is None:
+            return
+
+        db = self.db()
+        with db:
+            self.insert_transactions(db, transactions)
+            db.execute("INSERT OR REPLACE INTO block_pages (block_hash, page, lim, sort_dir, total, txids) VALUES (?, ?, ?, ?, ?, ?)",
+                       (block_hash, page, limit, sort_dir, result['total'], json.dumps([tx['hash'] for tx in transactions])))
+
+    def transactions_by_address(self, address):
+        """
+        all the stored transactions that have :address in one of their inputs or outputs
+
+        :rtype: list
+        """
+        rows = self.db().execute("SELECT t.data FROM transaction_addresses a JOIN transactions t ON t.txid = a.txid "
+                                 "WHERE a.address = ? ORDER BY t.block_height", (address, )).fetchall()
+
+        return [json.loads(row[0]) for row in rows]
+
+    def transactions_by_block(self, block):
+        """
+        all the stored transactions of a block
+
+        :param str|int  block:          the block hash or block height
+        :rtype: list
+        """
+        if is_block_hash(block):
+            rows = self.db().execute("SELECT data FROM transactions WHERE block_hash = ?", (block, )).fetchall()
+        else:
+            rows = self.db().execute("SELECT data FROM transactions WHERE block_height = ?", (int(block), )).fetchall()
+
+        return [json.loads(row[0]) for row in rows]
@@ -0,0 +1,360 @@
+from future.standard_library import install_aliases
+install_aliases()
+
+from urllib.parse import urlparse, urlencode
+from http.client import responses
+import json
+import socket
+import ssl
+import threading
+import requests
+import requests.packages.urllib3.response
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError, ConnectTimeout, ReadTimeout
+from requests.structures import CaseInsensitiveDict
+from blocktrail import compression
+
+try:
+    import h2.config
+    import h2.connection
+    import h2.events
+except ImportError:
+    h2 = None
+
+
+class RequestsTransport(object):
+    """
+    HTTP/1.1 transport on top of a requests.Session, connections are kept alive and pooled per host
+
+    responses are decoded by urllib3, so only the content-codings it supports are accepted.
+    it can be shared by many threads, urllib3's connection pool and the session's cookie jar are thread-safe
+    """
+
+    def __init__(self, pool_maxsize=10):
+        """
+        :param int      pool_maxsize:   the amount of connections to keep alive per host
+        """
+        decoders = getattr(requests.packages.urllib3.response.HTTPResponse, 'CONTENT_DECODERS', ['gzip', 'deflate'])
+        self.accept_encoding = ", ".join([e for e in compression.available_encodings() if e in decoders])
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def request(self, method, url, params=None, data=None, headers=None, auth=None, timeout=None):
+        """
+        :param str      method:         the HTTP method
+        :param str      url:            the full url without query string
+        :param list     params:         the (sorted) query string params
+        :param str      data:           the encoded request body
+        :param dict     headers:        the request headers
+        :param          auth:           HTTPSignatureAuth to sign the request with
+        :param tuple    timeout:        (connect timeout, read timeout) in seconds, None to wait forever
+        :rtype: requests.Response
+        """
+        return self.session.request(method, url, params=params, data=data, headers=headers, auth=auth, timeout=timeout)
+
+    def close(self):
+        self.session.close()
+
+
+class HTTP2Response(object):
+    """
+    the parts of requests.Response that RestClient.handle_response and APIClient use
+    """
+
+    def __init__(self, url, status_code, headers, content):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        # HTTP/2 has no reason phrase, so a 404 can't be told apart as "Endpoint Not Found"
+        self.reason = responses.get(status_code, "")
+
+    def json(self, **kwargs):
+        return json.loads(self.content.decode("utf-8"), **kwargs)
+
+
+class HTTP2Stream(object):
+    def __init__(self):
+        self.done = threading.Event()
+        self.status_code = None
+        self.headers = CaseInsensitiveDict()
+        self.decompressor = None
+        self.chunks = []
+        self.error = None
+
+
+class HTTP2Connection(object):
+    """
+    a single HTTP/2 connection, requests from any thread are multiplexed onto it as streams
+     while a reader thread dispatches the response frames back to the waiting streams
+    """
+
+    def __init__(self, scheme, host, port, max_streams, connect_timeout=None):
+        self.authority = "%s:%d" % (host, port)
+        self.scheme = scheme
+        self.max_streams = max_streams
+
+        try:
+            sock = socket.create_connection((host, port), timeout=connect_timeout)
+        except socket.timeout:
+            raise ConnectTimeout("connecting to %s timed out" % self.authority)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if scheme == "https":
+            context = ssl.create_default_context()
+            context.set_alpn_protocols(["h2"])
+            sock = context.wrap_socket(sock, server_hostname=host)
+            if sock.selected_alpn_protocol() != "h2":
+                sock.close()
+                raise ConnectionError("%s does not support HTTP/2" % self.authority)
+        # the reader thread blocks on the socket, timeouts are per stream
+        sock.settimeout(None)
+        self.sock = sock
+
+        self.lock = threading.Lock()
+        self.window_open = threading.Condition(self.lock)
+        self.streams = {}
+        self.closed = False
+        # streams reserved by the transport, guarded by the transport's lock
+        self.in_flight = 0
+
+        self.h2 = h2.connection.H2Connection(config=h2.config.H2Configuration(client_side=True, header_encoding="utf-8"))
+        with self.lock:
+            self.h2.initiate_connection()
+            self.sock.sendall(self.h2.data_to_send())
+
+        self.reader = threading.Thread(target=self.read_forever)
+        self.reader.daemon = True
+        self.reader.start()
+
+    @property
+    def available(self):
+        """
+        the amount of streams that can still be opened on this connection
+        """
+        if self.closed:
+            return 0
+
+        return min(self.max_streams, self.h2.remote_settings.max_concurrent_streams) - self.in_flight
+
+    def request(self, method, path, headers, body, timeout=None):
+        stream = HTTP2Stream()
+
+        with self.lock:
+            if self.closed:
+                raise ConnectionError("connection to %s was closed" % self.authority)
+
+            stream_id = self.h2.get_next_available_stream_id()
+            self.streams[stream_id] = stream
+
+            headers = [(':method', method), (':authority', self.authority), (':scheme', self.scheme), (':path', path)] + \
+                [(name.lower(), str(value)) for name, value in headers.items()]
+            if body:
+                headers.append(('content-length', str(len(body))))
+
+            try:
+                self.h2.send_headers(stream_id, headers, end_stream=not body)
+                self.sock.sendall(self.h2.data_to_send())
+
+                while body:
+                    if self.closed:
+                        raise ConnectionError("connection to %s was closed" % self.authority)
+
+                    window = min(self.h2.local_flow_control_window(stream_id), self.h2.max_outbound_frame_size)
+                    if window <= 0:
+                        self.window_open.wait()
+                        continue
+
+                    chunk, body = body[:window], body[window:]
+                    self.h2.send_data(stream_id, chunk, end_stream=not body)
+                    self.sock.sendall(self.h2.data_to_send())
+            except Exception:
+                self.streams.pop(stream_id, None)
+                raise
+
+        if not stream.done.wait(timeout):
+            with self.lock:
+                if self.streams.pop(stream_id, None) is not None and not self.closed:
+                    self.h2.reset_stream(stream_id)
+                    self.sock.sendall(self.h2.data_to_send())
+
+            raise ReadTimeout("reading from %s timed out after %ss" % (self.authority, timeout))
+
+        if stream.error is not None:
+            raise stream.error
+
+        return stream.status_code, stream.headers, b"".join(stream.chunks)
+
+    def read_forever(self):
+        try:
+            while True:
+                data = self.sock.recv(65535)
+                if not data:
+                    raise ConnectionError("connection to %s was closed" % self.authority)
+
+                with self.lock:
+                    for event in self.h2.receive_data(data):
+                        self.handle_event(event)
+                    self.sock.sendall(self.h2.data_to_send())
+        except Exception as e:
+            self.close(e)
+
+    def handle_event(self, event):
+        stream = self.streams.get(getattr(event, 'stream_id', None))
+
+        if isinstance(event, h2.events.ResponseReceived) and stream is not None:
+            for name, value in event.headers:
+                if name == ':status':
+                    stream.status_code = int(value)
+                else:
+                    stream.headers[name] = value
+
+            try:
+                stream.decompressor = compression.decompressor(stream.headers.get('content-encoding'))
+            except ValueError as e:
+                self.finish(event.stream_id, e)
+                self.h2.reset_stream(event.stream_id)
+        elif isinstance(event, h2.events.DataReceived):
+            # the body is decompressed frame by frame as it arrives
+            if stream is not None:
+                stream.chunks.append(stream.decompressor.decompress(event.data))
+            self.h2.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+        elif isinstance(event, h2.events.StreamEnded):
+            if stream is not None:
+                stream.chunks.append(stream.decompressor.flush())
+            self.finish(event.stream_id)
+        elif isinstance(event, h2.events.StreamReset):
+            self.finish(event.stream_id, ConnectionError("stream was reset by %s (error %s)" % (self.authority, event.error_code)))
+        elif isinstance(event, h2.events.WindowUpdated):
+            self.window_open.notify_all()
+        elif isinstance(event, h2.events.ConnectionTerminated):
+            raise ConnectionError("%s closed the connection (error %s)" % (self.authority, event.error_code))
+
+    def finish(self, stream_id, error=None):
+        stream = self.streams.pop(stream_id, None)
+        if stream is not None:
+            stream.error = error
+            stream.done.set()
+
+    def close(self, error=None):
+        with self.lock:
+            self.closed = True
+            for stream_id in list(self.streams):
+                self.finish(stream_id, error or ConnectionError("connection to %s was closed" % self.authority))
+            self.window_open.notify_all()
+
+        try:
+            self.sock.close()
+        except Exception:
+            pass
+
+
+class HTTP2Transport(object):
+    """
+    HTTP/2 transport on top of the h2 protocol library,
+     concurrent requests are multiplexed as streams over at most :max_connections connections per host
+
+    https:// endpoints negotiate h2 through ALPN, plain http:// endpoints speak h2c with prior knowledge,
+     responses are decompressed as their frames arrive (zstd and br when zstandard / brotli are installed, gzip and deflate)
+
+    requires `pip install h2`
+    """
+
+    def __init__(self, max_connections=2, max_streams=100):
+        """
+        :param int      max_connections:    the maximum amount of connections to open per host
+        :param int      max_streams:        the maximum amount of concurrent streams per connection
+                                             (the server's own limit is respected as well)
+        """
+        if h2 is None:
+            raise ImportError("HTTP2Transport requires h2, install it with `pip install h2`")
+
+        self.max_connections = max_connections
+        self.max_streams = max_streams
+        self.accept_encoding = ", ".join(compression.available_encodings())
+        self.lock = threading.Lock()
+        self.stream_released = threading.Condition(self.lock)
+        self.connections = {}
+        # host => the amount of connections being opened, they count towards :max_connections
+        self.connecting = {}
+
+    def request(self, method, url, params=None, data=None, headers=None, auth=None, timeout=None):
+        """
+        :param str      method:         the HTTP method
+        :param str      url:            the full url without query string
+        :param list     params:         the (sorted) query string params
+        :param str      data:           the encoded request body
+        :param dict     headers:        the request headers
+        :param          auth:           HTTPSignatureAuth to sign the request with
+        :param tuple    timeout:        (connect timeout, read timeout) in seconds, None to wait forever
+        :rtype: HTTP2Response
+        """
+        connect_timeout, read_timeout = timeout if timeout is not None else (None, None)
+
+        parsed = urlparse(url)
+        path = parsed.path + ("?" + urlencode(params) if params else "")
+
+        headers = dict(headers or {})
+        if auth is not None:
+            # the same HTTP-Signature signer as the requests auth, signing the exact path that is sent
+            headers = dict(auth.header_signer.sign(headers, method=method, path=path).items())
+
+        body = data.encode("utf-8") if data is not None and not isinstance(data, bytes) else data
+
+        connection = self.acquire(parsed.scheme, parsed.hostname, parsed.port or (443 if parsed.scheme == "https" else 80),
+                                  connect_timeout)
+        try:
+            status_code, response_headers, content = connection.request(method, path, headers, body, read_timeout)
+        finally:
+            with self.lock:
+                connection.in_flight -= 1
+                self.stream_released.notify()
+
+        return HTTP2Response(url + (path[len(parsed.path):]), status_code, response_headers, content)
+
+    def acquire(self, scheme, host, port, connect_timeout=None):
+        """
+        pick the least busy connection to the host, opening a new one when all of them are at their stream limit
+
+        a new connection is opened (connect + TLS handshake) without holding the lock, so it doesn't stall other requests
+        """
+        key = (scheme, host, port)
+
+        with self.lock:
+            while True:
+                connections = self.connections[key] = [c for c in self.connections.get(key, []) if not c.closed]
+
+                connection = max(connections, key=lambda c: c.available) if connections else None
+                if connection is not None and connection.available > 0:
+                    connection.in_flight += 1
+                    return connection
+
+                if len(connections) + self.connecting.get(key, 0) < self.max_connections:
+                    self.connecting[key] = self.connecting.get(key, 0) + 1
+                    break
+
+                self.stream_released.wait()
+
+        try:
+            connection = HTTP2Connection(scheme, host, port, self.max_streams, connect_timeout)
+        finally:
+            with self.lock:
+                self.connecting[key] -= 1
+                # waiters can use the new connection, or open one in the slot that was reserved for it
+                self.stream_released.notify_all()
+
+        with self.lock:
+            connection.in_flight += 1
+            self.connections.setdefault(key, []).append(connection)
+
+        return connection
+
+    def close(self):
+        with self.lock:
+            connections = [c for connections in self.connections.values() for c in connections]
+            self.connections = {}
+
+        for connection in connections:
+            connection.close()
@@ -1,18 +1,48 @@
 import struct
 import random
+import threading
 from pycoin.key.BIP32Node import BIP32Node
-from bitcoin.core import x, b2x, lx, COutPoint, CMutableTxOut, CMutableTxIn, CMutableTransaction
+from bitcoin.core import x, b2x, lx, COutPoint, CMutableTxOut, CMutableTxIn, CMutableTransaction, CTransaction
 from bitcoin.core.script import CScript, SignatureHash, SIGHASH_ALL, OP_CHECKMULTISIG, OP_0
-from bitcoin.wallet import CBitcoinAddress, CBitcoinSecret, P2PKHBitcoinAddress
+from binascii import hexlify
+from blocktrail import crypto, network
 
 VERIFY_NEW_DERIVATIONS = True
 
 
+def sign_transaction(crypto_backend, raw_tx, keys, redeem_scripts):
+    """
+    sign all the (2-of-3 P2SH) inputs of a transaction with the primary keys
+
+    it's a plain function of picklable arguments, so the signing can be done in another process
+
+    :param PythonBackend crypto_backend: the crypto backend to sign with
+    :param bytes    raw_tx:         the serialized unsigned transaction
+    :param list     keys:           the primary private key (BIP32Node) of each input
+    :param list     redeem_scripts: the hex redeem script of each input
+    :rtype: bytes   the serialized signed transaction
+    """
+    tx = CMutableTransaction.from_tx(CTransaction.deserialize(raw_tx))
+
+    for idx, (key, redeem_script) in enumerate(zip(keys, redeem_scripts)):
+        redeemScript = CScript(x(redeem_script))
+        sighash = SignatureHash(redeemScript, tx, idx, SIGHASH_ALL)
+
+        sig = crypto_backend.sign(key, sighash) + struct.pack("B", SIGHASH_ALL)
+
+        tx.vin[idx].scriptSig = CScript([OP_0, sig, redeemScript])
+
+    return tx.serialize()
+
+
 class Wallet(object):
-    def __init__(self, client, identifier, primary_mnemonic, primary_private_key, backup_public_key, blocktrail_public_keys, key_index, testnet):
+    def __init__(self, client, identifier, primary_mnemonic, primary_private_key, backup_public_key, blocktrail_public_keys, key_index, testnet,
+                 crypto_backend=None, address_index=None):
         """
         @type primary_private_key: BIP32Node
         @type backup_public_key: BIP32Node
+        @type crypto_backend: str  the crypto backend to derive and sign with (see blocktrail.crypto), the fastest available one when None
+        @type address_index: AddressIndex  index to record derived addresses in (see blocktrail.address_index)
         """
         self.client = client
         self.identifier = identifier
@@ -20,9 +50,67 @@ class Wallet(object):
         self.primary_private_key = primary_private_key
         self.backup_public_key = backup_public_key
 
+        # replaced as a whole (never mutated) by upgrade_key_index, so concurrent derivations always see a complete map
         self.blocktrail_public_keys = dict([(str(_key_index), BIP32Node.from_hwif(_key[0])) for _key_index, _key in enumerate(blocktrail_public_keys)])
         self.key_index = int(key_index)
         self.testnet = testnet
+        # the network params addresses are encoded / decoded with, not python-bitcoinlib's process wide SelectParams
+        self.params = network.get_params(testnet)
+        self.crypto = crypto.get_backend(crypto_backend)
+        self.address_index = address_index
+        self.change_pool = None
+
+        # (key_index, chain) => the (primary, backup, blocktrail) nodes of M/key_index'/chain,
+        #  so deriving an address on a chain only takes a single child derivation per key
+        self.chain_nodes = {}
+
+        # serializes the writes to the wallet state, reads don't take it
+        self.lock = threading.Lock()
+
+    def get_chain_nodes(self, key_index, chain):
+        """
+        the primary, backup and blocktrail nodes of a chain, derived once and then kept
+
+        :param int      key_index:      the key index (the hardened first level of the path)
+        :param int      chain:          the chain (0 for receive, 1 for change)
+        :rtype: (BIP32Node, BIP32Node, BIP32Node)
+        """
+        nodes = self.chain_nodes.get((key_index, chain))
+
+        if nodes is None:
+            nodes = (
+                self.crypto.subkey_for_path(self.primary_private_key, "%d'/%d" % (key_index, chain)),
+                self.crypto.subkey_for_path(self.backup_public_key, "%d/%d" % (key_index, chain)),
+                self.crypto.subkey(self.blocktrail_public_keys[str(key_index)], chain),
+            )
+            # when two threads derive the same chain at once, both get the nodes of the first one
+            nodes = self.chain_nodes.setdefault((key_index, chain), nodes)
+
+        return nodes
+
+    def get_keys_by_path(self, path):
+        """
+        the primary private key, backup public key and blocktrail public key for a path
+
+        :param str      path:           the path, eg M/9999'/0/1
+        :rtype: (BIP32Node, BIP32Node, BIP32Node)
+        """
+        path = path.replace("M/", "")
+        parts = path.split("/")
+
+        if len(parts) == 3 and parts[0].endswith("'") and parts[1].isdigit() and parts[2].isdigit():
+            index = int(parts[2])
+
+            return tuple(self.crypto.subkey(node, index) for node in self.get_chain_nodes(int(parts[0][:-1]), int(parts[1])))
+
+        # any other shape of path is derived from the root
+        key_index = parts[0].replace("'", "")
+
+        return (
+            self.primary_private_key.subkey_for_path(path),
+            self.backup_public_key.subkey_for_path(path.replace("'", "")),
+            self.blocktrail_public_keys[str(key_index)].subkey_for_path("/".join(parts[1:])),
+        )
 
     def get_new_address_pair(self):
         path = self.get_new_derivation()
@@ -42,26 +130,79 @@ class Wallet(object):
 
         return path
 
-    def get_address_by_path(self, path, key=None):
-        path = path.replace("M/", "")
-        key_index = path.split("/")[0].replace("'", "")
+    def get_redeem_script_by_path(self, path, key=None):
+        primary_key, backup_public_key, blocktrail_public_key = self.get_keys_by_path(path)
 
         if key is None:
-            key = self.primary_private_key.subkey_for_path(path)
+            key = primary_key
 
-        backup_public_key = self.backup_public_key.subkey_for_path(path.replace("'", ""))
-        blocktrail_public_key = self.blocktrail_public_keys[str(key_index)].subkey_for_path("/".join(path.split("/")[1:]))
-
-        redeemScript = CScript([2] + sorted([
+        return CScript([2] + sorted([
             key.sec(use_uncompressed=False),
             backup_public_key.sec(use_uncompressed=False),
             blocktrail_public_key.sec(use_uncompressed=False),
         ]) + [3, OP_CHECKMULTISIG])
 
+    def get_address_by_path(self, path, key=None):
+        indexed = key is None and self.address_index is not None
+
+        redeemScript = self.get_redeem_script_by_path(path, key=key)
         scriptPubKey = redeemScript.to_p2sh_scriptPubKey()
-        address = CBitcoinAddress.from_scriptPubKey(scriptPubKey)
+        address = network.address_from_script_pub_key(scriptPubKey, self.params)
+
+        if indexed:
+            self.address_index.add(self.identifier, "M/" + path.replace("M/", ""), address, hexlify(scriptPubKey).decode())
+
+        return address
+
+    def get_path_by_address(self, address):
+        """
+        the path an address of this wallet was derived at, from the address index (so without deriving anything)
+
+        :param str      address:        the address
+        :rtype: str|None
+        """
+        found = self.address_index.lookup(address) if self.address_index is not None else None
+
+        return found[1] if found and found[0] == self.identifier else None
+
+    def sync_address_index(self, limit=200):
+        """
+        add all the addresses the API knows for this wallet to the address index
+
+        :param int      limit:          the amount of addresses per page
+        :rtype: int     the amount of addresses added
+        """
+        if self.address_index is None:
+            raise Exception("Wallet [%s] has no address index to sync, pass one as address_index" % self.identifier)
+
+        page, added = 1, 0
+
+        while True:
+            addresses = self.addresses(page=page, limit=limit)
+            entries = [(address['path'], address['address'], None) for address in addresses['data'] if address.get('path')]
+            self.address_index.add_many(self.identifier, entries)
+            added += len(entries)
+
+            if page * limit >= addresses['total'] or not addresses['data']:
+                return added
+
+            page += 1
+
+    def setup_change_pool(self, size=20, persist_file=None, **kwargs):
+        """
+        keep a pool of reserved change addresses for pay(), it's filled in the background right away
+
+        :param int      size:           the amount of addresses to keep in the pool
+        :param str      persist_file:   file to keep the pool in across restarts
+        :rtype: ChangeAddressPool
+        """
+        from blocktrail.change_pool import ChangeAddressPool
+
+        with self.lock:
+            self.change_pool = ChangeAddressPool(self, size=size, persist_file=persist_file, **kwargs)
+            self.change_pool.fill()
 
-        return str(address)
+            return self.change_pool
 
     def get_balance(self):
         balance_info = self.client.get_wallet_balance(self.identifier)
@@ -69,13 +210,28 @@ class Wallet(object):
         return balance_info['confirmed'], balance_info['unconfirmed']
 
     def pay(self, pay, change_address=None, allow_zero_conf=False, randomize_change_idx=True, fee_strategy='optimal'):
+        send, utxos, change_address = self.select_coins(pay, change_address=change_address, allow_zero_conf=allow_zero_conf,
+                                                        fee_strategy=fee_strategy)
+
+        tx = self.build_transaction(send, utxos, change_address=change_address, randomize_change_idx=randomize_change_idx)
+        raw_tx = sign_transaction(self.crypto, tx.serialize(), self.get_signing_keys(utxos), [utxo['redeem_script'] for utxo in utxos])
+
+        return self.send_signed_transaction(raw_tx, utxos)
+
+    def select_coins(self, pay, change_address=None, allow_zero_conf=False, fee_strategy='optimal'):
+        """
+        the network part of pay() before signing: select (and lock) the UTXOs and get a change address if there's change
+
+        :rtype: (dict, list, str)       (address => value to send, the selected UTXOs, the change address)
+        """
         send = {}
 
         if isinstance(pay, list):
             for address, value in pay:
                 send[address] = value
         else:
-            send = pay
+            # the change is added to our own copy, :pay can be reused by the caller
+            send = dict(pay)
 
         coin_selection = self.client.coin_selection(self.identifier, send, lockUTXO=True, allow_zero_conf=allow_zero_conf,
                                                     fee_strategy=fee_strategy)
@@ -86,10 +242,16 @@ class Wallet(object):
 
         if change > 0:
             if change_address is None:
-                _, change_address = self.get_new_address_pair()
+                _, change_address = self.change_pool.take() if self.change_pool is not None else self.get_new_address_pair()
 
             send[change_address] = change
 
+        return send, utxos, change_address
+
+    def build_transaction(self, send, utxos, change_address=None, randomize_change_idx=True):
+        """
+        :rtype: CMutableTransaction     the unsigned transaction
+        """
         txins = []
         for utxo in utxos:
             txins.append(CMutableTxIn(COutPoint(lx(utxo['hash']), utxo['idx'])))
@@ -97,7 +259,7 @@ class Wallet(object):
         txouts = []
         change_txout = None
         for address, value in send.items():
-            txout = CMutableTxOut(value, CBitcoinAddress(address).to_scriptPubKey())
+            txout = CMutableTxOut(value, network.script_pub_key_for_address(address, self.params))
             if address == change_address:
                 change_txout = txout
             txouts.append(txout)
@@ -107,22 +269,18 @@ class Wallet(object):
             txouts.remove(change_txout)
             txouts.insert(random.randrange(len(txouts) + 1), change_txout)
 
-        tx = CMutableTransaction(txins, txouts)
-
-        for idx, utxo in enumerate(utxos):
-            path = utxo['path'].replace("M/", "")
-
-            key = self.primary_private_key.subkey_for_path(path)
-            redeemScript = CScript(x(utxo['redeem_script']))
-            sighash = SignatureHash(redeemScript, tx, idx, SIGHASH_ALL)
-
-            ckey = CBitcoinSecret(key.wif())
+        return CMutableTransaction(txins, txouts)
 
-            sig = ckey.sign(sighash) + struct.pack("B", SIGHASH_ALL)
+    def get_signing_keys(self, utxos):
+        return [self.get_keys_by_path(utxo['path'])[0] for utxo in utxos]
 
-            txins[idx].scriptSig = CScript([OP_0, sig, redeemScript])
-
-        signed = self.client.send_transaction(self.identifier, b2x(tx.serialize()), [utxo['path'] for utxo in utxos], check_fee=True)
+    def send_signed_transaction(self, raw_tx, utxos):
+        """
+        :param bytes    raw_tx:         the serialized signed transaction
+        :param list     utxos:          the UTXOs it spends
+        :rtype: str     the txid
+        """
+        signed = self.client.send_transaction(self.identifier, b2x(raw_tx), [utxo['path'] for utxo in utxos], check_fee=True)
 
         return signed['txid']
 
@@ -134,11 +292,18 @@ class Wallet(object):
     def upgrade_key_index(self, key_index):
         primary_public_key = self.primary_private_key.subkey_for_path("%d'.pub" % key_index)
 
-        data = self.client.upgrade_key_index(self.identifier, key_index, (primary_public_key.hwif(), "M/%d'" % key_index))
+        with self.lock:
+            data = self.client.upgrade_key_index(self.identifier, key_index, (primary_public_key.hwif(), "M/%d'" % key_index))
+
+            blocktrail_public_keys = dict(self.blocktrail_public_keys)
+            for blocktrail_key_index, blocktrail_public_key in enumerate(data['blocktrail_public_keys']):
+                # keys we already have are kept, along with the chain nodes derived from them
+                if str(blocktrail_key_index) not in blocktrail_public_keys:
+                    blocktrail_public_keys[str(blocktrail_key_index)] = BIP32Node.from_hwif(blocktrail_public_key[0])
 
-        self.key_index = key_index
-        for blocktrail_key_index, blocktrail_public_key in enumerate(data['blocktrail_public_keys']):
-            self.blocktrail_public_keys[str(blocktrail_key_index)] = BIP32Node.from_hwif(blocktrail_public_key[0])
+            # the new keys are in place before the key index that needs them
+            self.blocktrail_public_keys = blocktrail_public_keys
+            self.key_index = key_index
 
     def delete_wallet(self):
         # can't right now because we can't create a signature
@@ -150,14 +315,13 @@ class Wallet(object):
         return result and result['deleted']
 
     def create_checksum_signature(self):
-        key = CBitcoinSecret(self.primary_private_key.wif())
-        address = P2PKHBitcoinAddress.from_pubkey(key.pub)
+        address = network.p2pkh_address(self.primary_private_key.sec(use_uncompressed=False), self.params)
 
         signature = None
 
-        print(self.primary_private_key.wif(), str(address))
+        print(self.primary_private_key.wif(), address)
 
-        return str(address), signature
+        return address, signature
 
     def transactions(self, page=1, limit=20):
         return self.client.wallet_transactions(self.identifier, page=page, limit=limit)
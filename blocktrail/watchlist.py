@@ -0,0 +1,235 @@
+from future.standard_library import install_aliases
+install_aliases()
+
+import heapq
+import itertools
+import threading
+import time
+from multiprocessing.pool import ThreadPool
+from queue import Queue
+
+
+def address_digest(address):
+    """
+    compact digest of the parts of an address that change when it sends or receives
+
+    :param dict     address:        the address as returned by APIClient.address
+    :rtype: int
+    """
+    return hash((
+        address.get('balance'),
+        address.get('received'),
+        address.get('sent'),
+        address.get('transactions'),
+        address.get('unconfirmed_received'),
+        address.get('unconfirmed_sent'),
+        address.get('unconfirmed_transactions'),
+    ))
+
+
+class AddressChange(object):
+    def __init__(self, address, data, transactions):
+        """
+        :param str      address:        the address hash
+        :param dict     data:           the address as returned by APIClient.address
+        :param list     transactions:   the most recent transactions of the address (newest first)
+        """
+        self.address = address
+        self.data = data
+        self.transactions = transactions
+
+    def __repr__(self):
+        return "AddressChange(%s)" % (self.address, )
+
+
+class WatchedAddress(object):
+    def __init__(self, address, interval, generation=0):
+        self.address = address
+        self.interval = interval
+        self.generation = generation
+        self.digest = None
+
+
+class AddressWatchlist(object):
+    """
+    polls a set of addresses and emits an AddressChange whenever one of them sent or received something
+
+    every address is polled on its own interval; an address that changed is polled again after :min_interval,
+     every poll without a change doubles its interval up to :max_interval, so busy addresses are polled often
+     and dormant ones rarely.
+
+    only the address itself is polled, the latest transactions are only fetched for addresses that changed.
+    changes are passed to :callback and/or can be consumed with events().
+    """
+
+    def __init__(self, client, addresses=None, callback=None, min_interval=10, max_interval=3600, concurrency=8,
+                 transactions_limit=20):
+        """
+        :param APIClient client:            the client to poll with
+        :param list     addresses:          the addresses to watch
+        :param callable callback:           called with each AddressChange (from the watchlist's thread)
+        :param int      min_interval:       seconds between polls of an address that just changed
+        :param int      max_interval:       seconds between polls of a dormant address
+        :param int      concurrency:        the amount of addresses to poll in parallel
+        :param int      transactions_limit: the amount of recent transactions to fetch for a changed address
+        """
+        self.client = client
+        self.callback = callback
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.transactions_limit = transactions_limit
+
+        self.lock = threading.Lock()
+        self.watched = {}
+        # heap of (next poll time, address, generation), entries of a removed (or removed and added again) address are stale
+        self.schedule = []
+        self.generations = itertools.count()
+        self.queue = None
+
+        self.pool = ThreadPool(concurrency)
+        self.stopped = threading.Event()
+        self.wakeup = threading.Event()
+        self.thread = None
+
+        for address in addresses or []:
+            self.add(address)
+
+    def add(self, address):
+        """
+        start watching an address, it's polled right away to take its initial digest
+        """
+        with self.lock:
+            if address in self.watched:
+                return
+
+            watched = self.watched[address] = WatchedAddress(address, self.min_interval, next(self.generations))
+            heapq.heappush(self.schedule, (0, address, watched.generation))
+
+        self.wakeup.set()
+
+    def remove(self, address):
+        with self.lock:
+            # its entry in the schedule is skipped when it comes up
+            self.watched.pop(address, None)
+
+    def due(self, now):
+        """
+        pop all the addresses that are due for a poll
+
+        :rtype: list[WatchedAddress]
+        """
+        due = []
+        with self.lock:
+            while self.schedule and self.schedule[0][0] <= now:
+                _, address, generation = heapq.heappop(self.schedule)
+                watched = self.watched.get(address)
+                if watched is not None and watched.generation == generation:
+                    due.append(watched)
+
+        return due
+
+    def check(self, watched):
+        """
+        poll a single address
+
+        :rtype: AddressChange|None
+        """
+        data = self.client.address(watched.address)
+        digest = address_digest(data)
+
+        if digest == watched.digest:
+            watched.interval = min(watched.interval * 2, self.max_interval)
+            return None
+
+        first_poll = watched.digest is None
+        watched.digest = digest
+        watched.interval = self.min_interval
+
+        if first_poll:
+            return None
+
+        transactions = self.client.address_transactions(watched.address, limit=self.transactions_limit, sort_dir='desc')['data']
+
+        return AddressChange(watched.address, data, transactions)
+
+    def check_safe(self, watched):
+        try:
+            return self.check(watched)
+        except Exception:
+            # polled again on the current interval
+            return None
+
+    def poll(self, now=None):
+        """
+        poll all the addresses that are due, rescheduling each of them
+
+        :rtype: list[AddressChange]
+        """
+        now = time.time() if now is None else now
+        due = self.due(now)
+        changes = [change for change in self.pool.map(self.check_safe, due) if change is not None]
+
+        with self.lock:
+            for watched in due:
+                if self.watched.get(watched.address) is watched:
+                    heapq.heappush(self.schedule, (now + watched.interval, watched.address, watched.generation))
+
+        for change in changes:
+            if self.callback is not None:
+                self.callback(change)
+            if self.queue is not None:
+                self.queue.put(change)
+
+        return changes
+
+    def next_poll(self):
+        with self.lock:
+            return self.schedule[0][0] if self.schedule else None
+
+    def run(self):
+        while not self.stopped.is_set():
+            self.wakeup.clear()
+            self.poll()
+
+            next_poll = self.next_poll()
+            self.wakeup.wait(self.max_interval if next_poll is None else max(0, next_poll - time.time()))
+
+    def start(self):
+        """
+        start polling in a background thread
+        """
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+        self.thread.start()
+
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        self.wakeup.set()
+
+        if self.thread is not None:
+            self.thread.join()
+
+        if self.queue is not None:
+            self.queue.put(None)
+
+        self.pool.terminate()
+
+    def events(self):
+        """
+        iterator of AddressChange, collects changes from the moment it's called and ends when the watchlist is stopped
+
+        :rtype: collections.Iterable[AddressChange]
+        """
+        self.queue = queue = Queue()
+
+        def iterate():
+            while True:
+                change = queue.get()
+                if change is None:
+                    return
+
+                yield change
+
+        return iterate()
@@ -45,5 +45,11 @@ For examples and instructions on how to use, please see our official documentati
         'python-bitcoinlib == 0.2.1',
         'mnemonic == 0.12'
     ],
+    extras_require={
+        'http2': ['h2'],
+        'compression': ['brotli', 'zstandard'],
+        'export': ['pyarrow'],
+        'crypto': ['coincurve'],
+    },
     test_suite="tests.get_tests",
 )
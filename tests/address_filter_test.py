@@ -0,0 +1,81 @@
+import unittest
+import hashlib
+import os
+import shutil
+import tempfile
+from blocktrail import address_filter
+from blocktrail.address_filter import AddressFilter
+from blocktrail.address_index import AddressIndex, script_pub_key_for_address
+from tests.wallet_keys_test import setup_wallet
+
+
+def random_script(i):
+    return "a914" + hashlib.sha256(str(i).encode()).hexdigest()[:40] + "87"
+
+
+class AddressFilterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.index = AddressIndex(os.path.join(self.tmp_dir, "addresses.db"))
+
+        wallet = setup_wallet()
+        wallet.address_index = self.index
+        self.addresses = [wallet.get_address_by_path("M/0'/0/%d" % i) for i in range(50)]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_no_false_negatives_and_few_false_positives(self):
+        scripts = [random_script(i) for i in range(5000)]
+        bloom = AddressFilter(len(scripts), error_rate=0.01)
+        bloom.add_many(scripts)
+
+        self.assertTrue(all(bloom.match(scripts)))
+        others = bloom.match([random_script(-i - 1) for i in range(20000)])
+        self.assertTrue(sum(others) < 20000 * 0.02, sum(others))
+
+    def test_vectorized_matches_scalar(self):
+        bloom = AddressFilter(100, error_rate=0.2)
+        bloom.add_many(random_script(i) for i in range(100))
+        scripts = [random_script(i) for i in range(1000)]
+
+        self.assertEqual(bloom.match(scripts), [script in bloom for script in scripts])
+
+        numpy, address_filter.numpy = address_filter.numpy, None
+        try:
+            self.assertEqual(bloom.match(scripts), [script in bloom for script in scripts])
+        finally:
+            address_filter.numpy = numpy
+
+    def test_match_outputs_is_exact(self):
+        # a tiny filter, most outputs will be false positives
+        bloom = AddressFilter.from_index(self.index, error_rate=0.5)
+        self.assertEqual(len(bloom), 50)
+
+        transactions = [{'hash': "tx%d" % i, 'outputs': [
+            {'index': 0, 'script_hex': random_script(i), 'value': 1000},
+            {'index': 1, 'address': self.addresses[i], 'value': 2000},
+            {'index': 2, 'address': "not-an-address", 'value': 3000},
+        ]} for i in range(0, 50, 5)]
+
+        matches = bloom.match_outputs(transactions)
+        self.assertEqual([(tx['hash'], output['index'], found) for tx, output, found in matches],
+                         [("tx%d" % i, 1, ("unittest", "M/0'/0/%d" % i)) for i in range(0, 50, 5)])
+
+    def test_save_and_load(self):
+        bloom = AddressFilter.from_index(self.index)
+        path = os.path.join(self.tmp_dir, "addresses.filter")
+        bloom.save(path)
+
+        loaded = AddressFilter.load(path, index=self.index)
+        self.assertEqual((loaded.size, loaded.hashes, len(loaded)), (bloom.size, bloom.hashes, 50))
+        self.assertTrue(all(loaded.match([script_pub_key_for_address(address) for address in self.addresses])))
+
+        with open(path, "r+b") as f:
+            f.truncate(30)
+        with self.assertRaises(ValueError):
+            AddressFilter.load(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
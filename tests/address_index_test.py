@@ -0,0 +1,80 @@
+import unittest
+import os
+import shutil
+import tempfile
+from blocktrail.address_index import AddressIndex, script_pub_key_for_address
+from tests.wallet_keys_test import setup_wallet
+
+
+class FakeWalletClient(object):
+    def __init__(self, addresses):
+        self.addresses = addresses
+        self.requests = 0
+
+    def wallet_addresses(self, identifier, page=1, limit=20):
+        self.requests += 1
+
+        return {'total': len(self.addresses), 'data': self.addresses[(page - 1) * limit:page * limit]}
+
+
+class AddressIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "addresses.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def setup_wallet(self):
+        wallet = setup_wallet()
+        wallet.address_index = AddressIndex(self.path)
+
+        return wallet
+
+    def test_derived_addresses_are_indexed(self):
+        wallet = self.setup_wallet()
+        address = wallet.get_address_by_path("M/0'/0/3")
+
+        self.assertEqual(wallet.get_path_by_address(address), "M/0'/0/3")
+        self.assertEqual(wallet.address_index.lookup(address), ("unittest", "M/0'/0/3"))
+        self.assertEqual(wallet.address_index.lookup_script(script_pub_key_for_address(address)), ("unittest", "M/0'/0/3"))
+        self.assertEqual(wallet.get_path_by_address("2MzyKviSL6pnWxkbHV7ecFRE3hWKfzmT8WS"), None)
+
+    def test_persistent(self):
+        address = self.setup_wallet().get_address_by_path("M/0'/1/0")
+
+        index = AddressIndex(self.path)
+        self.assertEqual(index.lookup(address), ("unittest", "M/0'/1/0"))
+        self.assertEqual(index.count(), 1)
+
+    def test_other_wallet(self):
+        wallet = self.setup_wallet()
+        address = wallet.get_address_by_path("M/0'/0/0")
+
+        wallet.identifier = "other"
+        self.assertEqual(wallet.get_path_by_address(address), None)
+
+    def test_sync(self):
+        # derived by a wallet without an index, eg by another instance before the index existed
+        addresses = [{'address': setup_wallet().get_address_by_path("M/0'/0/%d" % i), 'path': "M/0'/0/%d" % i} for i in range(5)]
+
+        wallet = self.setup_wallet()
+        wallet.client = FakeWalletClient(addresses)
+
+        self.assertEqual(wallet.sync_address_index(limit=2), 5)
+        self.assertEqual(wallet.client.requests, 3)
+        self.assertEqual(wallet.address_index.count("unittest"), 5)
+        self.assertEqual(wallet.get_path_by_address(addresses[4]['address']), "M/0'/0/4")
+
+    def test_sync_without_index(self):
+        wallet = setup_wallet()
+        wallet.client = FakeWalletClient([])
+
+        with self.assertRaises(Exception) as context:
+            wallet.sync_address_index()
+        self.assertTrue("no address index" in str(context.exception))
+        self.assertEqual(wallet.client.requests, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
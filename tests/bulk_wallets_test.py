@@ -0,0 +1,64 @@
+import unittest
+import json
+from pycoin.key.BIP32Node import BIP32Node
+from blocktrail.client import APIClient
+from tests.local_server import LocalServer
+
+BLOCKTRAIL_KEY = BIP32Node.from_master_secret(b"blocktrail", netcode='XTN').subkey_for_path("0'.pub").hwif()
+
+
+def register_route(headers, body):
+    data = json.loads(body.decode())
+    if data['identifier'] == "taken":
+        return 400, {}, json.dumps({'code': 400, 'msg': "Wallet already exists"})
+
+    return 200, {'Content-Type': 'application/json'}, json.dumps({
+        'blocktrail_public_keys': [[BLOCKTRAIL_KEY, "M/0'"]],
+        'key_index': data['key_index'],
+    })
+
+
+class BulkWalletsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.server = LocalServer(routes={'/v1/tBTC/wallet': register_route}).start()
+        self.client = APIClient("MY_APIKEY", "MY_APISECRET", testnet=True, api_endpoint=self.server.url + "/v1/tBTC")
+
+    def tearDown(self):
+        self.server.stop()
+
+    def check_results(self, results, identifiers):
+        self.assertEqual([identifier for identifier, _ in results], identifiers)
+
+        for identifier, result in results:
+            if identifier == "taken":
+                self.assertTrue(isinstance(result, Exception))
+                continue
+
+            wallet, primary_mnemonic, backup_mnemonic, blocktrail_public_keys = result
+            self.assertEqual(wallet.identifier, identifier)
+            self.assertEqual(wallet.primary_mnemonic, primary_mnemonic)
+            self.assertTrue(wallet.get_address_by_path("M/0'/0/0").startswith("2"))
+
+        # every wallet got its own mnemonics, registered along with the checksum of its primary key
+        registered = [json.loads(hit[3].decode()) for hit in self.server.hits]
+        self.assertEqual(len(set(data['primary_mnemonic'] for data in registered)), len(identifiers))
+        for data in registered:
+            self.assertTrue(data['checksum'][0] in "mn")
+
+    def test_create_in_processes(self):
+        identifiers = ["wallet-%d" % i for i in range(5)] + ["taken", "wallet-5"]
+        results = list(self.client.create_new_wallets(({'identifier': identifier, 'passphrase': "password"} for identifier in identifiers),
+                                                      processes=2, concurrency=3, batch_size=3))
+
+        self.check_results(results, identifiers)
+
+    def test_create_in_calling_thread(self):
+        identifiers = ["wallet-%d" % i for i in range(3)]
+        results = list(self.client.create_new_wallets([{'identifier': identifier, 'passphrase': "password"} for identifier in identifiers],
+                                                      processes=0, batch_size=2))
+
+        self.check_results(results, identifiers)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+import os
+import shutil
+import tempfile
+from blocktrail import crypto
+from blocktrail.address_index import script_pub_key_for_address
+from tests.payments_test import FakePaymentClient, RECEIVER
+from tests.wallet_keys_test import setup_wallet
+
+
+@unittest.skipIf(crypto.coincurve is None, "signing with the python backend needs python-bitcoinlib's OpenSSL bindings")
+class ChangeAddressPoolTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.persist_file = os.path.join(self.tmp_dir, "change.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def setup_wallet(self):
+        wallet = setup_wallet()
+        wallet.client = FakePaymentClient(wallet, delay=0.01)
+
+        return wallet
+
+    def test_pay_takes_from_pool(self):
+        wallet = self.setup_wallet()
+        pool = wallet.setup_change_pool(size=4)
+        pool.wait()
+
+        self.assertEqual(len(pool), 4)
+        self.assertEqual(wallet.client.derivations, 4)
+
+        change_path, change_address = pool.addresses[0]
+        wallet.pay({RECEIVER: 1000})
+        pool.close()
+
+        # the change went to the first reserved address, no derivation was needed for the payment itself
+        self.assertTrue(script_pub_key_for_address(change_address) in wallet.client.sent[0][1])
+        self.assertEqual(wallet.client.derivations, 4)
+        self.assertTrue((change_path, change_address) not in pool.addresses)
+        self.assertEqual(wallet.get_address_by_path(change_path), change_address)
+
+    def test_refill_in_background(self):
+        wallet = self.setup_wallet()
+        pool = wallet.setup_change_pool(size=4, refill_at=2)
+        pool.wait()
+
+        taken = [pool.take() for _ in range(2)]
+        pool.wait()
+
+        self.assertEqual(len(pool), 4)
+        self.assertEqual(wallet.client.derivations, 6)
+        self.assertEqual(len(set(taken + pool.addresses)), 6)
+        pool.close()
+
+    def test_failed_reservations_keep_the_others(self):
+        wallet = self.setup_wallet()
+        get_new_derivation = wallet.client.get_new_derivation
+
+        def flaky_derivation(identifier, path):
+            derivation = get_new_derivation(identifier, path)
+            if derivation['path'].endswith(("/2", "/4")):
+                raise Exception("server error")
+
+            return derivation
+
+        wallet.client.get_new_derivation = flaky_derivation
+        pool = wallet.setup_change_pool(size=5)
+        pool.wait()
+
+        self.assertEqual(len(pool), 3)
+        self.assertEqual(sorted(path.split("/")[-1] for path, _ in pool.addresses), ["1", "3", "5"])
+        pool.close()
+
+    def test_empty_pool_reserves_right_away(self):
+        wallet = self.setup_wallet()
+        pool = wallet.setup_change_pool(size=0)
+
+        path, address = pool.take()
+        self.assertEqual(wallet.get_address_by_path(path), address)
+        pool.close()
+
+    def test_persistent(self):
+        wallet = self.setup_wallet()
+        pool = wallet.setup_change_pool(size=3, persist_file=self.persist_file)
+        pool.wait()
+        taken = pool.take()
+        pool.close()
+
+        restarted = setup_wallet()
+        restarted.client = wallet.client
+        restarted_pool = restarted.setup_change_pool(size=3, persist_file=self.persist_file)
+        restarted_pool.wait()
+
+        self.assertTrue(taken not in restarted_pool.addresses)
+        self.assertEqual(restarted_pool.addresses[:2], pool.addresses[:2])
+        self.assertEqual(len(restarted_pool), 3)
+        restarted_pool.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
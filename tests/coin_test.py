@@ -0,0 +1,78 @@
+import unittest
+from decimal import Decimal
+import blocktrail
+from blocktrail import coin
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class CoinTestCase(unittest.TestCase):
+    def test_to_satoshi(self):
+        self.assertEqual(1, blocktrail.to_satoshi(0.00000001))
+        self.assertEqual(123456789, blocktrail.to_satoshi(1.23456789))
+        self.assertEqual(29000000, blocktrail.to_satoshi(0.29))
+        self.assertEqual(-123456789, blocktrail.to_satoshi(-1.23456789))
+        self.assertEqual(2100000000000000, blocktrail.to_satoshi(21000000))
+        self.assertEqual(2099999999999999, blocktrail.to_satoshi(20999999.99999999))
+        self.assertEqual(123456789, blocktrail.to_satoshi(Decimal("1.23456789")))
+        self.assertEqual(123456789, blocktrail.to_satoshi("1.23456789"))
+        # beyond the exact float range the shortest repr of the float is used
+        self.assertEqual(12345678912345600000000, blocktrail.to_satoshi(123456789123456.0))
+        # more than 8 decimals rounds half to even
+        self.assertEqual(2, blocktrail.to_satoshi("0.000000015"))
+        self.assertEqual(2, blocktrail.to_satoshi("0.000000025"))
+
+    def test_to_btc(self):
+        self.assertEqual("1.00000000", blocktrail.to_btc(100000000))
+        self.assertEqual("1.23456789", blocktrail.to_btc(123456789))
+        self.assertEqual("0.00000001", blocktrail.to_btc(1))
+        self.assertEqual("-0.00000001", blocktrail.to_btc(-1))
+        self.assertEqual("21000000.00000000", blocktrail.to_btc(2100000000000000))
+        self.assertEqual("92233720368.54775807", blocktrail.to_btc(2 ** 63 - 1))
+        self.assertEqual(Decimal("1.23456789"), blocktrail.to_btc_decimal(123456789))
+
+    def test_round_trip(self):
+        for satoshi in [0, 1, 99999999, 100000001, 1234567890123, 2099999999999999]:
+            self.assertEqual(satoshi, blocktrail.to_satoshi(float(blocktrail.to_btc(satoshi))))
+            self.assertEqual(satoshi, blocktrail.to_satoshi(blocktrail.to_btc_decimal(satoshi)))
+
+    def test_many(self):
+        self.assertEqual([1, 123456789, 29000000], blocktrail.to_satoshi_many([0.00000001, 1.23456789, 0.29]))
+        self.assertEqual(["0.00000001", "1.23456789"], blocktrail.to_btc_many([1, 123456789]))
+
+        outputs = [{'value': 2099999999999999}, {'value': 1}, {'value': 12345}]
+        self.assertEqual(2100000000012345, blocktrail.sum_satoshi(outputs, key='value'))
+        self.assertEqual(2100000000012345, blocktrail.sum_satoshi([o['value'] for o in outputs]))
+
+    @unittest.skipIf(numpy is None, "numpy is not installed")
+    def test_many_numpy(self):
+        btc = numpy.array([0.00000001, 1.23456789, 0.29, 20999999.99999999])
+        satoshi = blocktrail.to_satoshi_many(btc)
+
+        self.assertEqual(numpy.int64, satoshi.dtype)
+        self.assertEqual([1, 123456789, 29000000, 2099999999999999], satoshi.tolist())
+        self.assertEqual([100000000, 200000000], blocktrail.to_satoshi_many(numpy.array([1, 2])).tolist())
+        self.assertEqual(["0.00000001", "1.23456789"], blocktrail.to_btc_many(numpy.array([1, 123456789])))
+        self.assertEqual(2100000152456789, blocktrail.sum_satoshi(satoshi))
+
+    @unittest.skipIf(numpy is None, "numpy is not installed")
+    def test_many_numpy_floats_round_like_scalars(self):
+        # satoshi amounts computed in floats are a hair off, they're rounded the same way one at a time and in bulk
+        satoshi = numpy.array([0.29, 0.57, 1.15, 2.5, 3.5, -0.29, 0.99999999]) * coin.COIN
+
+        self.assertEqual([blocktrail.to_btc(value) for value in satoshi.tolist()], blocktrail.to_btc_many(satoshi))
+        self.assertEqual(["0.29000000", "0.57000000", "1.15000000"], blocktrail.to_btc_many(satoshi[:3]))
+        self.assertEqual(871999999, blocktrail.sum_satoshi(satoshi))
+
+    def test_float_range_is_exact(self):
+        # every 8 decimal amount in the float fast path converts to its exact satoshi value
+        for satoshi in range(0, 2 * coin.COIN, 9999991):
+            self.assertEqual(satoshi, coin.to_satoshi(float(coin.to_btc(satoshi))))
+            self.assertEqual(2100000000000000 - satoshi, coin.to_satoshi(float(coin.to_btc(2100000000000000 - satoshi))))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,455 @@
+import unittest
+import json
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import zlib
+from urllib.parse import parse_qs, urlparse
+from blocktrail import compression, connection, exceptions, transport
+from blocktrail.client import APIClient
+from blocktrail.shared import SharedTokenBucket
+from tests.local_server import LocalServer, LocalH2Server, json_route
+
+try:
+    import httpsig_cffi as sign
+except:
+    import httpsig as sign
+
+
+class ConnectionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.server = LocalServer(routes={
+            '/v1/BTC/block/latest': json_route({'height': 1000}),
+            '/v1/BTC/price': json_route({'USD': 250.0}),
+        }, delay=0.2).start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def setup_rest_client(self, **kwargs):
+        return connection.RestClient(self.server.url + "/v1/BTC", "MY_APIKEY", "MY_APISECRET", **kwargs)
+
+    def run_concurrently(self, fn, count):
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(fn())) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return results
+
+    def test_coalesce_concurrent_gets(self):
+        client = self.setup_rest_client()
+
+        results = self.run_concurrently(lambda: client.get("/block/latest").json(), 10)
+
+        self.assertEqual([{'height': 1000}] * 10, results)
+        self.assertEqual(1, len(self.server.hits))
+        self.assertEqual(9, client.coalesced_requests)
+
+        # different params are different requests
+        self.run_concurrently(lambda: client.get("/price", params={'currency': 'USD'}), 2)
+        self.run_concurrently(lambda: client.get("/price"), 2)
+        self.assertEqual(3, len(self.server.hits))
+
+    def test_coalesce_shares_errors(self):
+        client = self.setup_rest_client()
+        errors = []
+
+        def get():
+            try:
+                client.get("/block/unknown")
+            except connection.ObjectNotFound as e:
+                errors.append(e)
+
+        self.run_concurrently(get, 5)
+
+        self.assertEqual(5, len(errors))
+        self.assertEqual(1, len(self.server.hits))
+
+    def test_coalesce_disabled(self):
+        client = self.setup_rest_client(coalesce_gets=False)
+
+        self.run_concurrently(lambda: client.get("/block/latest"), 5)
+
+        self.assertEqual(5, len(self.server.hits))
+        self.assertEqual(0, client.coalesced_requests)
+
+    def assert_signed(self, method, path, headers):
+        signer = sign.HeaderSigner(key_id="MY_APIKEY", secret="MY_APISECRET", algorithm='hmac-sha256',
+                                   headers=['(request-target)', 'Date', 'Content-MD5'])
+        expected = signer.sign({'Date': headers['Date'], 'Content-MD5': headers['Content-MD5']}, method=method, path=path)
+
+        self.assertEqual(expected['authorization'], headers['Authorization'])
+
+    def check_transport(self, client):
+        self.server.routes['/v1/BTC/webhook'] = json_route({'url': "https://example.com"})
+
+        self.assertEqual({'height': 1000}, client.get("/block/latest", params={'page': 2, 'limit': 5}, auth=True).json())
+        self.assertEqual({'url': "https://example.com"}, client.post("/webhook", data={'url': "https://example.com"}, auth=True).json())
+        with self.assertRaises(connection.ObjectNotFound):
+            client.delete("/webhook/unknown", auth=True)
+
+        (get_method, get_path, get_headers, _), (post_method, post_path, post_headers, post_body), _ = self.server.hits
+        self.assertEqual("/v1/BTC/block/latest?api_kdy=ruben1&api_key=MY_APIKEY&api_kfy=ruben1&limit=5&page=2", get_path)
+        self.assert_signed(get_method.lower(), get_path, get_headers)
+        self.assertEqual(b'{"url": "https://example.com"}', post_body)
+        self.assertEqual(connection.RestClient.content_md5(post_body.decode("utf-8")), post_headers['Content-MD5'])
+        self.assert_signed(post_method.lower(), post_path, post_headers)
+
+    def test_requests_transport(self):
+        self.server.delay = 0
+        self.check_transport(self.setup_rest_client())
+
+    @unittest.skipIf(transport.h2 is None, "h2 is not installed")
+    def test_http2_transport(self):
+        self.server.stop()
+        self.server = LocalH2Server(routes=self.server.routes).start()
+
+        self.check_transport(self.setup_rest_client(transport=transport.HTTP2Transport()))
+
+    @unittest.skipIf(transport.h2 is None, "h2 is not installed")
+    def test_http2_multiplexing(self):
+        self.server.stop()
+        self.server = LocalH2Server(routes={
+            '/v1/BTC/block/1': json_route({'height': 1}),
+        }, delay=0.2).start()
+        client = self.setup_rest_client(coalesce_gets=False, transport=transport.HTTP2Transport(max_connections=2, max_streams=10))
+
+        results = self.run_concurrently(lambda: client.get("/block/1").json(), 30)
+
+        self.assertEqual([{'height': 1}] * 30, results)
+        self.assertEqual(2, self.server.sockets)
+
+    @unittest.skipIf(transport.h2 is None, "h2 is not installed")
+    def test_http2_slow_connect_doesnt_block_other_hosts(self):
+        self.server.stop()
+        self.server = LocalH2Server(routes=self.server.routes).start()
+        http2 = transport.HTTP2Transport()
+        client = self.setup_rest_client(transport=http2)
+        client.get("/price")
+
+        # accepts connections (in its backlog) but never answers the TLS handshake
+        silent = socket.socket()
+        silent.bind(("127.0.0.1", 0))
+        silent.listen(5)
+        url = "https://127.0.0.1:%d/" % silent.getsockname()[1]
+        connecting = threading.Thread(target=lambda: self.assertRaises(Exception, http2.request, 'GET', url, timeout=(1, 1)))
+        connecting.start()
+        time.sleep(0.1)
+
+        start = time.time()
+        self.assertEqual(client.get("/block/latest").json(), {'height': 1000})
+        self.assertTrue(time.time() - start < 0.5)
+
+        connecting.join()
+        silent.close()
+
+    def compressed_route(self, data):
+        content = json.dumps(data).encode("utf-8")
+
+        def route(headers, body):
+            encoding = headers['Accept-Encoding'].split(", ")[0]
+            if encoding == 'zstd':
+                compressed = compression.zstandard.ZstdCompressor().compress(content)
+            elif encoding == 'br':
+                compressed = compression.brotli.compress(content)
+            else:
+                compressed = compression.gzip_compress(content)
+
+            return 200, {'Content-Type': 'application/json', 'Content-Encoding': encoding}, compressed
+
+        return route
+
+    def check_compression(self, client):
+        data = {'data': [{'hash': "%064x" % i, 'value': i} for i in range(1000)], 'total': 1000}
+        self.server.routes['/v1/BTC/block/1/transactions'] = self.compressed_route(data)
+        self.server.routes['/v1/BTC/webhook/hook/events/batch'] = json_route(True)
+
+        self.assertEqual(data, client.get("/block/1/transactions").json())
+
+        batch = [{'event_type': 'address-transactions', 'address': "1dice8EMZmqKvrGE4Qc9bUFf9PX3xaYDp", 'confirmations': 6}] * 100
+        self.assertEqual(True, client.post("/webhook/hook/events/batch", data=batch, auth=True).json())
+
+        (_, _, get_headers, _), (_, post_path, post_headers, post_body) = self.server.hits
+        self.assertEqual(client.transport.accept_encoding, get_headers['Accept-Encoding'])
+        self.assertEqual('gzip', post_headers['Content-Encoding'])
+        self.assertEqual(batch, json.loads(zlib.decompress(post_body, 16 + zlib.MAX_WBITS).decode("utf-8")))
+        # Content-MD5 is over the body as sent
+        self.assertEqual(connection.RestClient.content_md5(post_body), post_headers['Content-MD5'])
+        self.assert_signed('post', post_path, post_headers)
+
+    def test_requests_transport_compression(self):
+        self.server.delay = 0
+        self.check_compression(self.setup_rest_client(compress_requests=1024))
+
+    @unittest.skipIf(transport.h2 is None, "h2 is not installed")
+    def test_http2_transport_compression(self):
+        self.server.stop()
+        self.server = LocalH2Server().start()
+
+        self.check_compression(self.setup_rest_client(compress_requests=1024, transport=transport.HTTP2Transport()))
+
+    def test_api_client_compression(self):
+        self.server.routes['/v1/BTC/webhook/hook/events/batch'] = json_route(True)
+        client = APIClient("MY_APIKEY", "MY_APISECRET", api_endpoint=self.server.url + "/v1/BTC", compress_requests=1024)
+
+        batch = [{'address': "1dice8EMZmqKvrGE4Qc9bUFf9PX3xaYDp", 'confirmations': 6}] * 100
+        self.assertEqual(True, client.batch_subscribe_address_transactions("hook", batch))
+
+        _, _, headers, body = self.server.hits[0]
+        self.assertEqual('gzip', headers['Content-Encoding'])
+        self.assertEqual(100, len(json.loads(zlib.decompress(body, 16 + zlib.MAX_WBITS).decode("utf-8"))))
+
+    def test_small_bodies_are_not_compressed(self):
+        client = self.setup_rest_client(compress_requests=1024)
+
+        data, headers = client.encode_body({'url': "https://example.com"})
+
+        self.assertEqual('{"url": "https://example.com"}', data)
+        self.assertNotIn('Content-Encoding', headers)
+        self.assertEqual(connection.RestClient.content_md5(data), headers['Content-MD5'])
+
+    def test_timeout(self):
+        client = self.setup_rest_client(timeout=(1, 0.05))
+
+        self.assertRaises(exceptions.RequestTimeout, client.get, "/block/latest")
+
+    def test_endpoint_timeout(self):
+        client = self.setup_rest_client(timeout=(1, 0.05), endpoint_timeouts={'/block/*': (1, 1)})
+
+        self.assertEqual(client.get("/block/latest").json(), {'height': 1000})
+        self.assertEqual(client.request_timeout("/block/latest"), (1, 1))
+        self.assertEqual(client.request_timeout("/price"), (1, 0.05))
+        self.assertEqual(client.request_timeout("/wallet/my-wallet/discovery?gap=200"), (10, 600))
+
+    @unittest.skipIf(transport.h2 is None, "h2 is not installed")
+    def test_http2_timeout(self):
+        self.server.stop()
+        self.server = LocalH2Server(routes=self.server.routes, delay=0.2).start()
+        client = self.setup_rest_client(timeout=(1, 0.05), transport=transport.HTTP2Transport())
+
+        self.assertRaises(exceptions.RequestTimeout, client.get, "/block/latest")
+
+        # the connection is still usable after a stream timed out
+        client.timeout = (1, 1)
+        self.assertEqual(client.get("/block/latest").json(), {'height': 1000})
+
+    def test_deadline(self):
+        client = self.setup_rest_client()
+
+        with client.deadline(0.5):
+            client.get("/block/latest")
+            client.get("/price")
+            # the third request doesn't fit in what's left of the deadline
+            self.assertRaises(exceptions.DeadlineExceeded, client.get, "/block/latest")
+            self.assertRaises(exceptions.DeadlineExceeded, client.get, "/price")
+
+        self.assertEqual(len(self.server.hits), 3)
+        # outside of the deadline the regular timeouts apply again
+        self.assertEqual(client.get("/price").json(), {'USD': 250.0})
+
+    def test_hedged_requests(self):
+        def delay():
+            # the 21st request is slow, its hedge isn't
+            with self.server.lock:
+                hit = len(self.server.hits)
+            return 2 if hit == 21 else 0.01
+
+        self.server.delay = delay
+        client = self.setup_rest_client(hedge=True)
+
+        for _ in range(20):
+            client.get("/block/latest")
+        self.assertEqual(client.hedged_requests, 0)
+
+        start = time.time()
+        self.assertEqual(client.get("/block/latest").json(), {'height': 1000})
+
+        self.assertTrue(time.time() - start < 1)
+        self.assertEqual(client.hedged_requests, 1)
+        self.assertEqual(len(self.server.hits), 22)
+
+    def test_hedged_requests_within_deadline(self):
+        self.server.delay = lambda: 2 if len(self.server.hits) > 20 else 0.01
+        client = self.setup_rest_client(hedge=True)
+
+        for _ in range(20):
+            client.get("/block/latest")
+
+        # both attempts are bound by the deadline of the calling thread
+        start = time.time()
+        with client.deadline(0.3):
+            self.assertRaises(exceptions.DeadlineExceeded, client.get, "/block/latest")
+        self.assertTrue(time.time() - start < 1)
+        self.assertEqual(client.hedged_requests, 1)
+
+    def test_coalesced_get_within_deadline(self):
+        self.server.delay = 1
+        client = self.setup_rest_client()
+
+        leader = threading.Thread(target=client.get, args=("/block/latest", ))
+        leader.start()
+        time.sleep(0.1)
+
+        # joins the in-flight request, but doesn't wait for it beyond its own deadline
+        start = time.time()
+        with client.deadline(0.2):
+            self.assertRaises(exceptions.DeadlineExceeded, client.get, "/block/latest")
+        self.assertTrue(time.time() - start < 0.5)
+        self.assertEqual(client.coalesced_requests, 1)
+
+        leader.join()
+
+    def test_endpoint_key(self):
+        self.assertEqual(connection.endpoint_key("/address/1dice8EMZmqKvrGE4Qc9bUFf9PX3xaYDp/transactions"), "/address/*/transactions")
+        self.assertEqual(connection.endpoint_key("/block/latest"), "/block/latest")
+        self.assertEqual(connection.endpoint_key("/block/300000?page=2"), "/block/*")
+
+
+class ConditionalGetTestCase(unittest.TestCase):
+    ADDRESS = {'address': "1dice8EMZmqKvrGE4Qc9bUFf9PX3xaYDp", 'balance': 1000, 'transactions': [{'hash': "00" * 32}] * 50}
+
+    def setUp(self):
+        self.version = 1
+        self.sent = 0
+
+        def address(headers, body):
+            etag = '"v%d"' % self.version
+            if headers.get('If-None-Match') == etag:
+                return 304, {'ETag': etag}, b""
+
+            content = json.dumps(dict(self.ADDRESS, balance=self.version))
+            self.sent += len(content)
+            return 200, {'Content-Type': 'application/json', 'ETag': etag}, content
+
+        self.server = LocalServer(routes={
+            '/v1/BTC/address/1dice': address,
+            '/v1/BTC/price': json_route({'USD': 250.0}),
+        }).start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_not_modified_is_served_from_cache(self):
+        client = connection.RestClient(self.server.url + "/v1/BTC", "MY_APIKEY", "MY_APISECRET", conditional_gets=True)
+
+        for _ in range(10):
+            self.assertEqual(client.get("/address/1dice").json()['balance'], 1)
+        self.assertEqual(client.validators.revalidated, 9)
+        # only the first response had a body
+        self.assertEqual(self.sent, len(json.dumps(dict(self.ADDRESS, balance=1))))
+        self.assertEqual(self.server.hits[1][2].get('If-None-Match'), '"v1"')
+
+        self.version = 2
+        self.assertEqual(client.get("/address/1dice").json()['balance'], 2)
+        self.assertEqual(client.get("/address/1dice").json()['balance'], 2)
+        self.assertEqual(client.validators.revalidated, 10)
+
+    def test_without_validators(self):
+        client = connection.RestClient(self.server.url + "/v1/BTC", "MY_APIKEY", "MY_APISECRET", conditional_gets=True)
+
+        client.get("/price")
+        client.get("/price")
+        self.assertEqual([hit[2].get('If-None-Match') for hit in self.server.hits], [None, None])
+        self.assertEqual(len(client.validators.entries), 0)
+
+    def test_disabled_by_default(self):
+        client = connection.RestClient(self.server.url + "/v1/BTC", "MY_APIKEY", "MY_APISECRET")
+
+        client.get("/address/1dice")
+        client.get("/address/1dice")
+        self.assertEqual(self.server.hits[1][2].get('If-None-Match'), None)
+        self.assertEqual(self.sent, 2 * len(json.dumps(dict(self.ADDRESS, balance=1))))
+
+
+class KeyPoolTestCase(unittest.TestCase):
+    KEYS = [("KEY1", "SECRET1"), ("KEY2", "SECRET2"), ("KEY3", "SECRET3")]
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.server = LocalServer(routes={
+            '/v1/BTC/block/latest': json_route({'height': 1000}),
+            '/v1/BTC/wallet/w1/balance': json_route({'confirmed': 0}),
+            '/v1/BTC/wallet/w2/balance': json_route({'confirmed': 0}),
+        }).start()
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.tmp_dir)
+
+    def setup_rest_client(self, keys, **kwargs):
+        return connection.RestClient(self.server.url + "/v1/BTC", keys[0][0], keys[0][1], coalesce_gets=False,
+                                     key_pool=connection.KeyPool(keys, **kwargs))
+
+    def api_keys(self):
+        return [parse_qs(urlparse(hit[1]).query)['api_key'][0] for hit in self.server.hits]
+
+    def rate_limited(self, count):
+        # every key allows 20 requests per second
+        return [key + (SharedTokenBucket(os.path.join(self.tmp_dir, key[0]), rate=20, burst=1), ) for key in self.KEYS[:count]]
+
+    def fetch(self, client, requests, threads=6):
+        def worker():
+            for _ in range(requests // threads):
+                client.get("/block/latest")
+
+        start = time.time()
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+        return time.time() - start
+
+    def test_throughput_grows_with_keys(self):
+        single = self.fetch(self.setup_rest_client(self.rate_limited(1)), 30)
+        pooled = self.fetch(self.setup_rest_client(self.rate_limited(3)), 30)
+
+        self.assertTrue(pooled < single / 1.8, (single, pooled))
+        used = self.api_keys()[30:]
+        self.assertEqual(sorted(set(used)), ["KEY1", "KEY2", "KEY3"])
+        self.assertTrue(min(used.count(key) for key in set(used)) >= 5, used)
+
+    def test_spreads_without_rate_limits(self):
+        client = self.setup_rest_client(self.KEYS)
+        self.fetch(client, 30)
+
+        self.assertEqual(sorted(set(self.api_keys())), ["KEY1", "KEY2", "KEY3"])
+        self.assertEqual([key.in_flight for key in client.key_pool.keys], [0, 0, 0])
+
+    def test_wallet_requests_are_pinned(self):
+        client = self.setup_rest_client(self.KEYS, wallet_owners={'w2': "KEY2"})
+
+        for _ in range(3):
+            client.get("/wallet/w1/balance", auth=True)
+            client.get("/wallet/w2/balance", auth=True)
+        self.assertEqual(self.api_keys(), ["KEY1", "KEY2"] * 3)
+
+        # signed with the secret of the owning key
+        hit = self.server.hits[1]
+        signer = sign.HeaderSigner(key_id="KEY2", secret="SECRET2", algorithm='hmac-sha256',
+                                   headers=['(request-target)', 'Date', 'Content-MD5'])
+        expected = signer.sign({'Date': hit[2]['Date'], 'Content-MD5': hit[2]['Content-MD5']}, method='GET', path=hit[1])
+        self.assertEqual(expected['authorization'], hit[2]['Authorization'])
+
+        with self.assertRaises(ValueError):
+            client.key_pool.pin('w3', "KEY4")
+
+    def test_only_wallet_requests_are_pinned(self):
+        pool = connection.KeyPool(self.KEYS, wallet_owners={'shared-id': "KEY3"})
+
+        # a webhook with the same identifier as a pinned wallet goes to the first key
+        self.assertEqual(pool.acquire("/webhook/shared-id", authenticated=True).api_key, "KEY1")
+        self.assertEqual(pool.acquire("/webhook/shared-id/events", authenticated=True).api_key, "KEY1")
+        self.assertEqual(pool.acquire("/wallet/shared-id/balance", authenticated=True).api_key, "KEY3")
+        self.assertEqual(pool.acquire("/wallet", authenticated=True).api_key, "KEY1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+from binascii import hexlify
+from pycoin.key.BIP32Node import BIP32Node
+from blocktrail import crypto
+
+
+@unittest.skipIf(crypto.coincurve is None, "coincurve isn't installed")
+class LibSecp256k1BackendTestCase(unittest.TestCase):
+    def setUp(self):
+        self.python = crypto.get_backend('python')
+        self.libsecp256k1 = crypto.get_backend('libsecp256k1')
+        self.key = BIP32Node.from_master_secret(b"crypto backend", netcode='XTN')
+
+    def test_default_is_fastest(self):
+        self.assertEqual(crypto.get_backend().name, 'libsecp256k1')
+        self.assertEqual(crypto.available_backends(), ['libsecp256k1', 'python'])
+
+    def test_private_derivation(self):
+        for path in ["0", "0'", "9999'/0/5", "1/2'/3"]:
+            expected = self.python.subkey_for_path(self.key, path)
+            derived = self.libsecp256k1.subkey_for_path(self.key, path)
+
+            self.assertEqual(derived.hwif(as_private=True), expected.hwif(as_private=True))
+            self.assertEqual(derived.sec(), expected.sec())
+
+    def test_public_derivation(self):
+        public_key = self.key.subkey_for_path("0'.pub")
+
+        for path in ["0", "0/5", "7/1000000"]:
+            self.assertEqual(self.libsecp256k1.subkey_for_path(public_key, path).hwif(),
+                             self.python.subkey_for_path(public_key, path).hwif())
+
+        self.assertRaises(ValueError, self.libsecp256k1.subkey, public_key, 1, True)
+
+    def test_sign(self):
+        sighash = b"\x01" * 32
+        signature = self.libsecp256k1.sign(self.key, sighash)
+
+        public_key = crypto.coincurve.PublicKey(self.key.sec())
+        self.assertTrue(public_key.verify(signature, sighash, hasher=None))
+        # DER encoded
+        self.assertEqual(signature[0:1], b"\x30")
+
+
+class BackendTestCase(unittest.TestCase):
+    def test_unknown_backend(self):
+        self.assertRaises(ValueError, crypto.get_backend, 'openssl')
+
+    def test_python_backend_is_always_available(self):
+        self.assertEqual(crypto.get_backend('python').name, 'python')
+        self.assertEqual(crypto.available_backends()[-1], 'python')
+
+
+class MnemonicToSeedTestCase(unittest.TestCase):
+    # from the BIP39 reference test vectors
+    VECTORS = [
+        ("abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon about", "TREZOR",
+         "c55257c360c07c72029aebc1b53c05ed0362ada38ead3e3e9efa3708e53495531f09a6987599d18264c1e1c92f2cf141630c7a3c4ab7c81b2f001698e7463b04"),
+        ("legal winner thank year wave sausage worth useful legal winner thank yellow", "TREZOR",
+         "2e8905819b8723fe2c1d161860e5ee1830318dbf49a83bd451cfb8440c28bd6fa457fe1296106559a3c80937a1c1069be3a3a5bd381ee6260e8d9739fce1f607"),
+    ]
+
+    def test_vectors(self):
+        for mnemonic, passphrase, seed in self.VECTORS:
+            self.assertEqual(hexlify(crypto.mnemonic_to_seed(mnemonic, passphrase)).decode(), seed)
+
+    def test_same_as_mnemonic(self):
+        from mnemonic.mnemonic import Mnemonic
+
+        for strength, passphrase in [(128, ""), (256, "password"), (512, u"p\u00e4ssw\u00f6rd \u30d1\u30b9")]:
+            mnemonic = Mnemonic(language='english').generate(strength=strength)
+            self.assertEqual(crypto.mnemonic_to_seed(mnemonic, passphrase), Mnemonic.to_seed(mnemonic, passphrase))
+            self.assertEqual(crypto.mnemonic_to_seed(mnemonic.encode("utf-8"), passphrase.encode("utf-8")),
+                             Mnemonic.to_seed(mnemonic, passphrase))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+from blocktrail import export
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+class FakeTransactionsClient(object):
+    def __init__(self, total):
+        self.total = total
+        self.lock = threading.Lock()
+        self.pages = []
+
+    def address_transactions(self, address, page=1, limit=20, sort_dir='asc'):
+        with self.lock:
+            self.pages.append(page)
+
+        return {
+            'total': self.total,
+            'data': [{
+                'hash': "tx%d" % i,
+                'block_height': 300000 + i,
+                'time': "2015-03-30T09:41:16+0000",
+                'inputs': [{'index': 0, 'address': address, 'value': 1000 + i, 'output_hash': "prev%d" % i, 'output_index': 1}],
+                'outputs': [{'index': 0, 'address': "out", 'value': 900 + i}, {'index': 1, 'address': address, 'value': 50}],
+            } for i in range((page - 1) * limit, min(page * limit, self.total))]
+        }
+
+
+@unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+class TransactionExporterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.client = FakeTransactionsClient(total=95)
+        self.exporter = export.TransactionExporter(self.client, batch_size=40, page_limit=10, concurrency=3, prefetch=3)
+
+    def tearDown(self):
+        self.exporter.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_record_batches(self):
+        batches = list(self.exporter.record_batches(self.exporter.pages('address_transactions', "1addr")))
+
+        self.assertEqual([40] * 7 + [5], [batch.num_rows for batch in batches])
+        self.assertEqual(list(range(1, 11)), sorted(self.client.pages))
+
+        table = pyarrow.Table.from_batches(batches)
+        self.assertEqual(export.schema(), table.schema)
+
+        rows = table.to_pydict()
+        self.assertEqual(["tx0", "tx0", "tx0", "tx1"], rows['txid'][:4])
+        self.assertEqual(['input', 'output', 'output'], rows['io'][:3])
+        self.assertEqual([1000, 900, 50], rows['value'][:3])
+        self.assertEqual(["prev0", None, None], rows['output_hash'][:3])
+        self.assertEqual(1427708476, table.column('time')[0].value)
+        self.assertEqual(sum(1000 + i + 900 + i + 50 for i in range(95)), sum(rows['value']))
+
+    def test_export(self):
+        parquet_file = os.path.join(self.tmpdir, "txs.parquet")
+        arrow_file = os.path.join(self.tmpdir, "txs.arrow")
+
+        self.assertEqual(285, self.exporter.export(parquet_file, 'address_transactions', "1addr"))
+        self.assertEqual(285, self.exporter.export(arrow_file, 'address_transactions', "1addr", format='arrow'))
+
+        # parquet has no second resolution timestamps, so compare the values
+        self.assertEqual(pyarrow.parquet.read_table(parquet_file).to_pydict(), pyarrow.ipc.open_file(arrow_file).read_all().to_pydict())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+from bitcoin.core import b2x, CTransaction
+from blocktrail import crypto, fees
+from blocktrail.wallet import sign_transaction
+from tests.payments_test import RECEIVER
+from tests.wallet_keys_test import setup_wallet
+
+
+class FeesTestCase(unittest.TestCase):
+    def test_sizes(self):
+        self.assertEqual(fees.redeem_script_size(), 105)
+        # OP_0 + 2 * (push + 73) + (OP_PUSHDATA1 + length + 105)
+        self.assertEqual(fees.script_sig_size(), 256)
+        self.assertEqual(fees.input_size(), 36 + 3 + 256 + 4)
+        self.assertEqual(fees.output_size('p2sh'), 32)
+        self.assertEqual(fees.output_size('p2pkh'), 34)
+        self.assertEqual(fees.output_size(80), 8 + 1 + 80)
+
+    def test_outputs_shapes(self):
+        self.assertEqual(fees.transaction_size(2, 3), fees.transaction_size(2, {'p2sh': 3}))
+        self.assertEqual(fees.transaction_size(2, ['p2sh', 'p2pkh']), fees.transaction_size(2, {'p2sh': 1, 'p2pkh': 1}))
+        self.assertEqual(fees.transaction_size(1, 2), 4 + 1 + 299 + 1 + 2 * 32 + 4)
+
+    def test_varint_boundaries(self):
+        self.assertEqual(fees.transaction_size(253, 1) - fees.transaction_size(252, 1), fees.input_size() + 2)
+        self.assertEqual(fees.varint_size(0xffff), 3)
+        self.assertEqual(fees.varint_size(0x10000), 5)
+
+    def test_estimate_fee(self):
+        size = fees.transaction_size(1, 2)
+        self.assertEqual(size, 373)
+        self.assertEqual(fees.estimate_fee(1, 2), 3730)
+        self.assertEqual(fees.estimate_fee(1, 2, fee_per_kb=1001), 374)
+
+    def test_script_type_for_address(self):
+        self.assertEqual(fees.script_type_for_address(RECEIVER), 'p2sh')
+        self.assertEqual(fees.script_type_for_address("mkgW6hNYBctmqDtTTsTJrsf2Gh2NPtoCU4"), 'p2pkh')
+
+    @unittest.skipIf(crypto.coincurve is None, "signing with the python backend needs python-bitcoinlib's OpenSSL bindings")
+    def test_matches_signed_transaction(self):
+        wallet = setup_wallet()
+        paths = ["M/0'/0/%d" % i for i in range(3)]
+        utxos = [{'hash': "%064x" % (i + 1), 'idx': i, 'path': path, 'redeem_script': b2x(wallet.get_redeem_script_by_path(path))}
+                 for i, path in enumerate(paths)]
+        send = {RECEIVER: 100000, "mkgW6hNYBctmqDtTTsTJrsf2Gh2NPtoCU4": 5000}
+
+        tx = wallet.build_transaction(send, utxos)
+        raw_tx = sign_transaction(wallet.crypto, tx.serialize(), wallet.get_signing_keys(utxos), [utxo['redeem_script'] for utxo in utxos])
+
+        # the signatures we made (BlockTrail adds the second one), their size depends on the DER encoding of r and s
+        signature_sizes = [len(list(txin.scriptSig)[1]) for txin in CTransaction.deserialize(raw_tx).vin]
+        expected = (4 + 1 + sum(fees.input_size(signatures=1, signature_size=size) for size in signature_sizes)
+                    + 1 + fees.output_size('p2sh') + fees.output_size('p2pkh') + 4)
+
+        self.assertEqual(len(raw_tx), expected)
+        self.assertTrue(len(raw_tx) <= fees.transaction_size(3, ['p2sh', 'p2pkh'], signatures=1))
+
+
+if __name__ == "__main__":
+    unittest.main()
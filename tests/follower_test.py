@@ -0,0 +1,90 @@
+import unittest
+import os
+import shutil
+import tempfile
+from blocktrail.follower import ChainFollower, ChainEvent
+
+
+class FakeChainClient(object):
+    """
+    serves block / block_transactions / block_latest from an in-memory chain of {height: hash}
+    """
+
+    def __init__(self, hashes, txs_per_block=5):
+        self.hashes = dict(hashes)
+        self.txs_per_block = txs_per_block
+
+    def block_latest(self):
+        return self.block(max(self.hashes))
+
+    def block(self, height):
+        return {
+            'height': height,
+            'hash': self.hashes[height],
+            'prev_block': self.hashes.get(height - 1),
+            'transactions': self.txs_per_block,
+        }
+
+    def block_transactions(self, block, page=1, limit=20):
+        height = [h for h, hash in self.hashes.items() if hash == block][0]
+        txs = ["%s-tx%d" % (block, i) for i in range(self.txs_per_block)]
+
+        return {'total': len(txs), 'data': [{'hash': tx, 'block_height': height} for tx in txs[(page - 1) * limit:page * limit]]}
+
+
+class ChainFollowerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.checkpoint_file = os.path.join(self.tmpdir, "follower.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def take(self, follower, count):
+        events = []
+        for event in follower.follow():
+            events.append(event)
+            if len(events) == count:
+                follower.stop()
+
+        follower.close()
+        return events
+
+    def test_follow_in_order(self):
+        client = FakeChainClient([(h, "a%d" % h) for h in range(10, 40)], txs_per_block=7)
+        follower = ChainFollower(client, start_height=10, prefetch=5, page_limit=3)
+
+        events = self.take(follower, 30)
+
+        self.assertEqual(list(range(10, 40)), [event.height for event in events])
+        self.assertTrue(all(event.type == ChainEvent.BLOCK for event in events))
+        self.assertEqual(["a10-tx%d" % i for i in range(7)], [tx['hash'] for tx in events[0].transactions])
+
+    def test_reorg_and_resume(self):
+        client = FakeChainClient([(h, "a%d" % h) for h in range(0, 10)])
+        events = self.take(ChainFollower(client, checkpoint_file=self.checkpoint_file, prefetch=3), 10)
+        self.assertEqual(("a9", 9), (events[-1].hash, events[-1].height))
+
+        # blocks 8 and 9 get replaced by a longer fork on top of 7
+        client.hashes.update([(h, "b%d" % h) for h in range(8, 12)])
+
+        follower = ChainFollower(client, checkpoint_file=self.checkpoint_file, prefetch=3)
+        events = self.take(follower, 6)
+
+        self.assertEqual([
+            (ChainEvent.ROLLBACK, 9, "a9"),
+            (ChainEvent.ROLLBACK, 8, "a8"),
+            (ChainEvent.BLOCK, 8, "b8"),
+            (ChainEvent.BLOCK, 9, "b9"),
+            (ChainEvent.BLOCK, 10, "b10"),
+            (ChainEvent.BLOCK, 11, "b11"),
+        ], [(event.type, event.height, event.hash) for event in events])
+
+        # everything was handled, so a new follower has nothing left until a new block arrives
+        client.hashes[12] = "b12"
+        events = self.take(ChainFollower(client, checkpoint_file=self.checkpoint_file), 1)
+        self.assertEqual([(ChainEvent.BLOCK, 12, "b12")], [(event.type, event.height, event.hash) for event in events])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,195 @@
+from future.standard_library import install_aliases
+install_aliases()
+
+import json
+import socket
+import threading
+import time
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+from requests.structures import CaseInsensitiveDict
+
+
+class LocalRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def handle_any(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b""
+
+        status, headers, content = self.server.dispatch(self.command, self.path, self.headers, body)
+
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = do_POST = do_PUT = do_DELETE = handle_any
+
+
+class LocalRoutes(object):
+    """
+    routes map a path to a callable(headers, body) returning (status, headers, content),
+     every request is recorded in :hits and answered after :delay seconds (a number or a callable returning one)
+    """
+
+    def setup_routes(self, routes, delay):
+        self.routes = routes or {}
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.hits = []
+        self.sockets = 0
+
+    def dispatch(self, method, path, headers, body):
+        with self.lock:
+            self.hits.append((method, path, headers, body))
+
+        delay = self.delay() if callable(self.delay) else self.delay
+        if delay:
+            time.sleep(delay)
+
+        route = self.routes.get(path.split("?")[0])
+        if route is None:
+            status, headers, content = 404, {}, json.dumps({'msg': "Object Not Found"})
+        else:
+            status, headers, content = route(headers, body)
+
+        if not isinstance(content, bytes):
+            content = content.encode("utf-8")
+
+        return status, headers, content
+
+
+class LocalServer(LocalRoutes, ThreadingMixIn, HTTPServer):
+    """
+    HTTP/1.1 stand-in for the API that runs on localhost in a background thread
+    """
+    daemon_threads = True
+
+    def __init__(self, routes=None, delay=0):
+        HTTPServer.__init__(self, ("127.0.0.1", 0), LocalRequestHandler)
+        self.setup_routes(routes, delay)
+        self.thread = threading.Thread(target=self.serve_forever)
+        self.thread.daemon = True
+
+    def get_request(self):
+        self.sockets += 1
+        return HTTPServer.get_request(self)
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:%d" % self.server_address[1]
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class LocalH2Server(LocalRoutes):
+    """
+    h2c (HTTP/2 with prior knowledge) stand-in for the API, every stream is answered from its own thread
+
+    requires `pip install h2`
+    """
+
+    def __init__(self, routes=None, delay=0):
+        self.setup_routes(routes, delay)
+        self.sock = socket.socket()
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen(128)
+        self.connections = []
+        self.thread = threading.Thread(target=self.serve_forever)
+        self.thread.daemon = True
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:%d" % self.sock.getsockname()[1]
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.sock.close()
+        for conn in self.connections:
+            conn.close()
+
+    def serve_forever(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except socket.error:
+                return
+
+            self.sockets += 1
+            self.connections.append(conn)
+            t = threading.Thread(target=self.handle, args=(conn, ))
+            t.daemon = True
+            t.start()
+
+    def handle(self, conn):
+        import h2.config
+        import h2.connection
+        import h2.events
+        import h2.exceptions
+        import h2.settings
+
+        h2conn = h2.connection.H2Connection(config=h2.config.H2Configuration(client_side=False, header_encoding="utf-8"))
+        lock = threading.Lock()
+        requests = {}
+
+        def respond(stream_id, headers, body):
+            status, response_headers, content = self.dispatch(headers[':method'], headers[':path'], headers, body)
+
+            with lock:
+                try:
+                    h2conn.send_headers(stream_id, [(':status', str(status)), ('content-length', str(len(content)))] +
+                                        [(name.lower(), value) for name, value in response_headers.items()])
+                    h2conn.send_data(stream_id, content, end_stream=True)
+                except h2.exceptions.ProtocolError:
+                    # the client reset the stream (eg it timed out) while the response was being made
+                    return
+                conn.sendall(h2conn.data_to_send())
+
+        with lock:
+            h2conn.local_settings = h2.settings.Settings(client=False, initial_values={
+                h2.settings.SettingCodes.MAX_CONCURRENT_STREAMS: 1000,
+            })
+            h2conn.initiate_connection()
+            conn.sendall(h2conn.data_to_send())
+
+        while True:
+            try:
+                data = conn.recv(65535)
+            except socket.error:
+                return
+            if not data:
+                return
+
+            with lock:
+                for event in h2conn.receive_data(data):
+                    if isinstance(event, h2.events.RequestReceived):
+                        requests[event.stream_id] = (CaseInsensitiveDict(event.headers), [])
+                    elif isinstance(event, h2.events.DataReceived):
+                        requests[event.stream_id][1].append(event.data)
+                        h2conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                    elif isinstance(event, h2.events.StreamEnded):
+                        headers, chunks = requests.pop(event.stream_id)
+                        t = threading.Thread(target=respond, args=(event.stream_id, headers, b"".join(chunks)))
+                        t.daemon = True
+                        t.start()
+                conn.sendall(h2conn.data_to_send())
+
+
+def json_route(data, status=200):
+    return lambda headers, body: (status, {'Content-Type': 'application/json'}, json.dumps(data))
@@ -0,0 +1,85 @@
+import unittest
+import threading
+from bitcoin import SelectParams
+from bitcoin.core import b2x
+from bitcoin.wallet import CBitcoinAddressError
+from blocktrail import network
+from blocktrail.client import APIClient
+from tests.wallet_keys_test import setup_wallet
+
+MAINNET_P2SH = "3P14159f73E4gFr7JterCCQh9QjiTjiZrG"
+TESTNET_P2SH = "2N9SGrV4NKRjdACYvHLPpy2oiPrxTPd44rg"
+TESTNET_P2PKH = "mkgW6hNYBctmqDtTTsTJrsf2Gh2NPtoCU4"
+
+
+class NetworkTestCase(unittest.TestCase):
+    def tearDown(self):
+        SelectParams('mainnet')
+
+    def test_addresses_round_trip(self):
+        for address, testnet in [(MAINNET_P2SH, False), (TESTNET_P2SH, True), (TESTNET_P2PKH, True)]:
+            params = network.get_params(testnet)
+            script_pub_key = network.script_pub_key_for_address(address, params)
+            self.assertEqual(network.address_from_script_pub_key(script_pub_key, params), address)
+
+        self.assertEqual(network.decode_address(TESTNET_P2PKH)[0], 'p2pkh')
+        with self.assertRaises(CBitcoinAddressError):
+            network.script_pub_key_for_address(TESTNET_P2SH, network.get_params(testnet=False))
+
+    def test_clients_keep_their_network(self):
+        testnet_client = APIClient("MY_APIKEY", "MY_APISECRET", testnet=True)
+        mainnet_client = APIClient("MY_APIKEY", "MY_APISECRET")
+
+        self.assertEqual(testnet_client.params.BASE58_PREFIXES['SCRIPT_ADDR'], 196)
+        self.assertEqual(mainnet_client.params.BASE58_PREFIXES['SCRIPT_ADDR'], 5)
+
+        wallet = setup_wallet(testnet=True)
+        self.assertTrue(APIClient.create_checksum(wallet.primary_private_key)[0] in "mn")
+        self.assertTrue(APIClient.create_checksum(setup_wallet(testnet=False).primary_private_key).startswith("1"))
+
+    def test_wallets_dont_cross_networks(self):
+        testnet_wallet = setup_wallet(testnet=True)
+        mainnet_wallet = setup_wallet(testnet=False)
+        paths = ["M/0'/%d/%d" % (chain, i) for chain in range(2) for i in range(25)]
+        addresses = {True: [], False: []}
+        errors = []
+        stop = threading.Event()
+
+        def flip_params():
+            # what another client / library in the same process could be doing
+            while not stop.is_set():
+                SelectParams('testnet')
+                SelectParams('mainnet')
+
+        def derive(wallet):
+            try:
+                for path in paths:
+                    address = wallet.get_address_by_path(path)
+                    tx = wallet.build_transaction({address: 1000}, [])
+                    self.assertEqual(b2x(tx.vout[0].scriptPubKey), b2x(network.script_pub_key_for_address(address, wallet.params)))
+                    addresses[wallet.testnet].append(address)
+            except Exception as e:
+                errors.append(e)
+
+        flipper = threading.Thread(target=flip_params)
+        flipper.start()
+        threads = [threading.Thread(target=derive, args=(wallet, )) for wallet in [testnet_wallet, mainnet_wallet] * 4]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stop.set()
+        flipper.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(addresses[True]), 4 * len(paths))
+        self.assertTrue(all(address.startswith("2") for address in addresses[True]))
+        self.assertTrue(all(address.startswith("3") for address in addresses[False]))
+
+        # paying to an address of the other network is refused
+        with self.assertRaises(CBitcoinAddressError):
+            testnet_wallet.build_transaction({MAINNET_P2SH: 1000}, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,159 @@
+import unittest
+import threading
+import time
+from bitcoin.core import b2x, b2lx, CMutableTransaction
+from blocktrail import crypto
+from blocktrail.payments import PaymentExecutor
+from tests.wallet_keys_test import setup_wallet
+
+RECEIVER = "2N9SGrV4NKRjdACYvHLPpy2oiPrxTPd44rg"
+
+
+class FakePaymentClient(object):
+    """
+    hands out one UTXO per coin selection and records the broadcasted transactions
+    """
+
+    def __init__(self, wallet, delay=0.05):
+        self.wallet = wallet
+        self.delay = delay
+        self.derivations = 0
+        self.lock = threading.Lock()
+        self.selections = 0
+        self.sent = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+        self.utxo_path = "M/0'/0/1"
+        self.utxo_redeem_script = b2x(wallet.get_redeem_script_by_path(self.utxo_path))
+        self.change_address = wallet.get_address_by_path("M/0'/1/0")
+
+    def request(self):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        time.sleep(self.delay)
+
+        with self.lock:
+            self.in_flight -= 1
+
+    def coin_selection(self, identifier, outputs, lockUTXO=False, allow_zero_conf=False, fee_strategy='optimal'):
+        self.request()
+
+        with self.lock:
+            self.selections += 1
+            n = self.selections
+
+        if sum(outputs.values()) < 0:
+            raise Exception("invalid amount")
+
+        return {
+            'utxos': [{'hash': "%064x" % n, 'idx': 0, 'path': self.utxo_path, 'redeem_script': self.utxo_redeem_script}],
+            'fee': 10000,
+            'change': 5000,
+        }
+
+    def get_new_derivation(self, identifier, path):
+        self.request()
+
+        with self.lock:
+            self.derivations += 1
+            path = "%s/%d" % (path, self.derivations)
+
+        return {'path': path, 'address': self.wallet.get_address_by_path(path)}
+
+    def send_transaction(self, identifier, raw_tx, paths, check_fee=False):
+        self.request()
+
+        with self.lock:
+            self.sent.append((identifier, raw_tx))
+
+        return {'txid': b2lx(CMutableTransaction.deserialize(bytes(bytearray.fromhex(raw_tx))).GetHash())}
+
+
+@unittest.skipIf(crypto.coincurve is None, "signing with the python backend needs python-bitcoinlib's OpenSSL bindings")
+class PaymentExecutorTestCase(unittest.TestCase):
+    def setup_wallets(self, count):
+        wallets = []
+        for i in range(count):
+            wallet = setup_wallet()
+            wallet.identifier = "wallet-%d" % i
+            wallet.client = FakePaymentClient(wallet)
+            wallets.append(wallet)
+
+        return wallets
+
+    def test_same_as_pay(self):
+        wallet, = self.setup_wallets(1)
+        txid = wallet.pay({RECEIVER: 100000}, change_address=wallet.client.change_address, randomize_change_idx=False)
+
+        wallet.client.selections = 0
+        executor = PaymentExecutor()
+        payment = executor.submit(wallet, {RECEIVER: 100000}, change_address=wallet.client.change_address, randomize_change_idx=False)
+
+        self.assertEqual(payment.get(timeout=10), txid)
+        self.assertEqual(wallet.client.sent[0], wallet.client.sent[1])
+        executor.close()
+
+    def test_outputs_arent_modified(self):
+        wallet, = self.setup_wallets(1)
+        pay = {RECEIVER: 100000}
+
+        send, _, change_address = wallet.select_coins(pay)
+        self.assertEqual(send, {RECEIVER: 100000, change_address: 5000})
+        wallet.pay(pay)
+        executor = PaymentExecutor()
+        executor.pay_many([(wallet, pay)])
+        executor.close()
+
+        self.assertEqual(pay, {RECEIVER: 100000})
+
+    def test_wallets_run_concurrently_and_in_order(self):
+        wallets = self.setup_wallets(8)
+        executor = PaymentExecutor(network_workers=16)
+
+        payments = [(wallet, {RECEIVER: 1000 + i}) for i in range(5) for wallet in wallets]
+        start = time.time()
+        results = executor.pay_many(payments)
+        elapsed = time.time() - start
+        executor.close()
+
+        self.assertTrue(all(len(txid) == 64 for txid in results))
+        # 40 payments of 3 requests of 0.05s each take 6s one after the other
+        self.assertTrue(elapsed < 3, elapsed)
+        for wallet in wallets:
+            # at most a selection and a broadcast of the same wallet at a time, broadcasted in order
+            self.assertTrue(wallet.client.max_in_flight <= 2)
+            self.assertEqual(len(wallet.client.sent), 5)
+            values = [CMutableTransaction.deserialize(bytes(bytearray.fromhex(raw_tx))).vout for _, raw_tx in wallet.client.sent]
+            self.assertEqual([sorted(txout.nValue for txout in vout)[0] for vout in values], [1000, 1001, 1002, 1003, 1004])
+
+    def test_failed_payment_doesnt_block_the_wallet(self):
+        wallet, = self.setup_wallets(1)
+        executor = PaymentExecutor()
+
+        payments = [executor.submit(wallet, {RECEIVER: value}) for value in (1000, -1, 2000)]
+        for payment in payments:
+            payment.done.wait(10)
+        executor.close()
+
+        self.assertEqual(len(payments[0].txid), 64)
+        self.assertRaises(Exception, payments[1].get)
+        self.assertEqual(len(payments[2].txid), 64)
+        self.assertEqual(len(wallet.client.sent), 2)
+
+    def test_signing_processes(self):
+        wallet, = self.setup_wallets(1)
+        txid = wallet.pay({RECEIVER: 100000}, change_address=wallet.client.change_address, randomize_change_idx=False)
+
+        wallet.client.selections = 0
+        executor = PaymentExecutor(signing_processes=2)
+        payment = executor.submit(wallet, {RECEIVER: 100000}, change_address=wallet.client.change_address, randomize_change_idx=False)
+
+        self.assertEqual(payment.get(timeout=30), txid)
+        executor.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+import json
+import time
+from blocktrail.client import APIClient
+from tests.local_server import LocalServer, json_route
+
+
+class RefresherTestCase(unittest.TestCase):
+    def setUp(self):
+        self.height = 1000
+        self.failing = False
+
+        def block_latest(headers, body):
+            if self.failing:
+                return 500, {}, json.dumps({'msg': "down"})
+            return 200, {'Content-Type': 'application/json'}, json.dumps({'height': self.height})
+
+        self.server = LocalServer(routes={
+            '/v1/BTC/block/latest': block_latest,
+            '/v1/BTC/price': json_route({'USD': 250.0}),
+        }, delay=0.05).start()
+        self.client = APIClient("MY_APIKEY", "MY_APISECRET", api_endpoint=self.server.url + "/v1/BTC")
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+    def wait_for(self, condition, timeout=5):
+        end = time.time() + timeout
+        while not condition() and time.time() < end:
+            time.sleep(0.01)
+
+        return condition()
+
+    def test_serves_last_value_from_memory(self):
+        refresher = self.client.start_refresher(interval=0.1)
+
+        self.assertEqual(refresher.get('block_latest').value, {'height': 1000})
+        self.assertEqual(refresher.get('price').value, {'USD': 250.0})
+
+        start = time.time()
+        for _ in range(10000):
+            value = refresher.get('block_latest')
+        # no round-trips, the server answers after 50ms
+        self.assertTrue(time.time() - start < 0.5)
+        self.assertTrue(value.age < 1)
+
+        self.height = 1001
+        self.assertTrue(self.wait_for(lambda: refresher.get('block_latest').value == {'height': 1001}))
+
+        with self.assertRaises(KeyError):
+            refresher.get('block')
+
+    def test_failures_keep_the_last_value(self):
+        refresher = self.client.start_refresher(interval=0.05)
+        self.assertEqual(refresher.get('block_latest').value, {'height': 1000})
+
+        self.failing = True
+        self.assertTrue(self.wait_for(lambda: refresher.get('block_latest').error is not None))
+        self.assertEqual(refresher.get('block_latest').value, {'height': 1000})
+
+        self.failing = False
+        self.assertTrue(self.wait_for(lambda: refresher.get('block_latest').error is None))
+
+    def test_stops_with_the_client(self):
+        refresher = self.client.start_refresher(interval=0.05)
+        refresher.get('price')
+
+        self.client.close()
+        self.assertFalse(refresher.thread.is_alive())
+        self.assertEqual(self.client.refresher, None)
+
+        hits = len(self.server.hits)
+        time.sleep(0.2)
+        self.assertEqual(len(self.server.hits), hits)
+
+
+if __name__ == "__main__":
+    unittest.main()
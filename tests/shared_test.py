@@ -0,0 +1,126 @@
+import unittest
+import multiprocessing
+import os
+import shutil
+import struct
+import tempfile
+import time
+from blocktrail import connection, exceptions
+from blocktrail.shared import SharedTokenBucket
+from tests.local_server import LocalServer, json_route
+
+
+def take_tokens(path, seconds, results):
+    bucket = SharedTokenBucket(path, rate=20, burst=5)
+    taken = 0
+    end = time.time() + seconds
+    while time.time() < end:
+        if bucket.try_acquire() == 0:
+            taken += 1
+        else:
+            time.sleep(0.001)
+
+    bucket.close()
+    results.put(taken)
+
+
+def take_inherited_tokens(bucket, seconds, writer):
+    taken = 0
+    end = time.time() + seconds
+    while time.time() < end:
+        if bucket.try_acquire() == 0:
+            taken += 1
+
+    os.write(writer, struct.pack("i", taken))
+
+
+class SharedTokenBucketTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "bucket")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_burst_then_rate(self):
+        bucket = SharedTokenBucket(self.path, rate=10, burst=3)
+
+        assert [bucket.try_acquire() for _ in range(3)] == [0, 0, 0]
+        assert 0.05 < bucket.try_acquire() <= 0.1
+        assert bucket.available() < 1
+
+        start = time.time()
+        assert bucket.acquire()
+        assert 0.05 < time.time() - start < 0.3
+
+        assert not bucket.acquire(tokens=3, timeout=0.05)
+
+        bucket.close()
+
+    def test_shared_between_processes(self):
+        # created once, the workers open the same file
+        SharedTokenBucket(self.path, rate=20, burst=5).close()
+
+        results = multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=take_tokens, args=(self.path, 1.0, results)) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        taken = [results.get(timeout=10) for _ in workers]
+        for worker in workers:
+            worker.join()
+
+        # burst + 1s worth of tokens between all of them, not per process
+        assert 20 <= sum(taken) <= 27, taken
+
+    def test_inherited_by_forked_processes(self):
+        # created before forking, like the workers of a pre-fork server
+        bucket = SharedTokenBucket(self.path, rate=200, burst=200)
+        reader, writer = os.pipe()
+
+        pids = []
+        for _ in range(4):
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    take_inherited_tokens(bucket, 1.0, writer)
+                finally:
+                    os._exit(0)
+            pids.append(pid)
+
+        for pid in pids:
+            os.waitpid(pid, 0)
+        taken = [struct.unpack("i", os.read(reader, 4))[0] for _ in pids]
+        os.close(reader)
+        os.close(writer)
+        bucket.close()
+
+        # burst + 1s worth of tokens between all of them
+        assert 390 <= sum(taken) <= 420, taken
+
+    def test_rest_client_rate_limited(self):
+        server = LocalServer(routes={
+            '/v1/BTC/price': json_route({'USD': 250.0}),
+        }).start()
+
+        try:
+            bucket = SharedTokenBucket(self.path, rate=20, burst=1)
+            client = connection.RestClient(server.url + "/v1/BTC", "MY_APIKEY", "MY_APISECRET", rate_limiter=bucket)
+
+            start = time.time()
+            for _ in range(6):
+                client.get("/price")
+            assert time.time() - start >= 0.2
+
+            # waiting for a token counts towards the deadline
+            bucket = SharedTokenBucket(os.path.join(self.tmp_dir, "slow"), rate=1, burst=1)
+            client = connection.RestClient(server.url + "/v1/BTC", "MY_APIKEY", "MY_APISECRET", rate_limiter=bucket)
+            client.get("/price")
+            with self.assertRaises(exceptions.DeadlineExceeded):
+                with client.deadline(0.2):
+                    client.get("/price")
+        finally:
+            server.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,164 @@
+import unittest
+import multiprocessing
+import os
+import shutil
+import tempfile
+from blocktrail.client import APIClient
+from blocktrail.store import SQLiteStore
+from tests.local_server import LocalServer, json_route
+
+BLOCK_HASH = "000000000000000001a2b3c4d5e6f708192a3b4c5d6e7f8091a2b3c4d5e6f708"
+
+
+def make_tx(txid, confirmations=10):
+    return {
+        'hash': txid,
+        'block_hash': BLOCK_HASH,
+        'block_height': 300000,
+        'confirmations': confirmations,
+        'inputs': [{'index': 0, 'address': "1Sender", 'value': 1000}],
+        'outputs': [{'index': 0, 'address': "1Receiver", 'value': 900}],
+    }
+
+
+def write_transactions(path, prefix):
+    store = SQLiteStore(path)
+    for i in range(50):
+        store.put_transaction(make_tx("%s%d" % (prefix, i)))
+
+
+class StoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "chain.db")
+
+        self.server = LocalServer(routes={
+            '/v1/BTC/block/latest': self.block_latest,
+            '/v1/BTC/block/300000': json_route({'hash': BLOCK_HASH, 'height': 300000, 'confirmations': 10}),
+            '/v1/BTC/block/300001': json_route({'hash': "f" * 64, 'height': 300001, 'confirmations': 2}),
+            '/v1/BTC/transaction/aa': json_route(make_tx("aa")),
+            '/v1/BTC/transaction/bb': json_route(make_tx("bb", confirmations=0)),
+            '/v1/BTC/block/%s/transactions' % BLOCK_HASH: json_route({
+                'current_page': 1, 'per_page': 2, 'total': 3, 'data': [make_tx("cc"), make_tx("dd")]
+            }),
+        }).start()
+        self.tip_height = 300009
+
+    def block_latest(self, headers, body):
+        return json_route({'hash': "e" * 64, 'height': self.tip_height})(headers, body)
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.tmp_dir)
+
+    def setup_api_client(self, store):
+        return APIClient("MY_APIKEY", "MY_APISECRET", api_endpoint=self.server.url + "/v1/BTC", store=store)
+
+    def test_read_through(self):
+        client = self.setup_api_client(SQLiteStore(self.path))
+
+        self.assertEqual(client.block(300000)['hash'], BLOCK_HASH)
+        self.assertEqual(client.block(300000)['hash'], BLOCK_HASH)
+        self.assertEqual(client.block(BLOCK_HASH)['height'], 300000)
+        self.assertEqual(client.transaction("aa")['hash'], "aa")
+        self.assertEqual(client.transaction("aa")['hash'], "aa")
+
+        page = client.block_transactions(BLOCK_HASH, page=1, limit=2)
+        self.assertEqual(client.block_transactions(BLOCK_HASH, page=1, limit=2), page)
+        self.assertEqual(client.block_transactions(300000, page=1, limit=2), page)
+        # a different page size is a different page
+        self.assertEqual(client.store.get_block_transactions(BLOCK_HASH, 1, 5, 'asc'), None)
+
+        self.assertEqual([hit[1].split("?")[0] for hit in self.server.hits], [
+            '/v1/BTC/block/300000', '/v1/BTC/transaction/aa', '/v1/BTC/block/%s/transactions' % BLOCK_HASH,
+        ])
+
+    def test_store_hits_dont_make_requests(self):
+        client = self.setup_api_client(SQLiteStore(self.path))
+        client.transaction("aa")
+        hits = len(self.server.hits)
+
+        for _ in range(5):
+            # without the refresher the stored confirmations are a lower bound
+            self.assertEqual(client.transaction("aa")['confirmations'], 10)
+        self.assertEqual(len(self.server.hits), hits)
+
+    def test_confirmations_are_current(self):
+        client = self.setup_api_client(SQLiteStore(self.path))
+        client.block(300000)
+        client.transaction("aa")
+        client.block_transactions(BLOCK_HASH, page=1, limit=2)
+
+        # the refresher's latest block is used when it's running
+        self.tip_height = 300019
+        client.start_refresher(interval=60, endpoints=['block_latest'])
+        client.refresher.get('block_latest')
+        hits = len(self.server.hits)
+
+        self.assertEqual(client.block(300000)['confirmations'], 20)
+        self.assertEqual(client.block(BLOCK_HASH)['confirmations'], 20)
+        self.assertEqual(client.transaction("aa")['confirmations'], 20)
+        self.assertEqual([tx['confirmations'] for tx in client.block_transactions(BLOCK_HASH, page=1, limit=2)['data']], [20, 20])
+        self.assertEqual(len(self.server.hits), hits)
+        client.close()
+
+    def test_orphaned_block_is_replaced(self):
+        store = SQLiteStore(self.path)
+        orphan = "a" * 64
+        store.put_block({'hash': orphan, 'height': 300000, 'confirmations': 6})
+        orphaned_txs = [dict(make_tx(txid), block_hash=orphan) for txid in ("o1", "o2")]
+        store.put_block_transactions(orphan, 1, 2, 'asc', {'total': 2, 'data': orphaned_txs})
+
+        store.put_block({'hash': BLOCK_HASH, 'height': 300000, 'confirmations': 7})
+        store.put_transaction(make_tx("aa"))
+
+        self.assertEqual(store.get_block(300000)['hash'], BLOCK_HASH)
+        self.assertEqual(store.get_block(orphan), None)
+        self.assertEqual(store.get_transaction("o1"), None)
+        self.assertEqual(store.get_block_transactions(orphan, 1, 2, 'asc'), None)
+        self.assertEqual([tx['hash'] for tx in store.transactions_by_block(300000)], ["aa"])
+        self.assertEqual([tx['hash'] for tx in store.transactions_by_address("1Receiver")], ["aa"])
+
+    def test_unconfirmed_isnt_stored(self):
+        client = self.setup_api_client(SQLiteStore(self.path))
+
+        client.block(300001)
+        client.block(300001)
+        client.transaction("bb")
+        client.transaction("bb")
+
+        self.assertEqual(len(self.server.hits), 4)
+
+    def test_persistent(self):
+        self.setup_api_client(SQLiteStore(self.path)).transaction("aa")
+
+        client = self.setup_api_client(SQLiteStore(self.path))
+        self.assertEqual(client.transaction("aa")['hash'], "aa")
+        self.assertEqual([hit[1].split("?")[0] for hit in self.server.hits], ['/v1/BTC/transaction/aa'])
+
+    def test_indexes(self):
+        store = SQLiteStore(self.path)
+        store.put_transactions([make_tx("aa"), make_tx("bb")])
+
+        self.assertEqual(sorted(tx['hash'] for tx in store.transactions_by_address("1Receiver")), ["aa", "bb"])
+        self.assertEqual(store.transactions_by_address("1Nobody"), [])
+        self.assertEqual(len(store.transactions_by_block(BLOCK_HASH)), 2)
+        self.assertEqual(len(store.transactions_by_block(300000)), 2)
+
+    def test_multiple_processes(self):
+        SQLiteStore(self.path)
+
+        processes = [multiprocessing.Process(target=write_transactions, args=(self.path, prefix)) for prefix in "xyz"]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+            self.assertEqual(process.exitcode, 0)
+
+        store = SQLiteStore(self.path)
+        self.assertEqual(len(store.transactions_by_address("1Sender")), 150)
+        self.assertEqual(store.get_transaction("y49")['hash'], "y49")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+import random
+import threading
+from pycoin.key.BIP32Node import BIP32Node
+from blocktrail import transport
+from blocktrail.client import APIClient
+from tests.local_server import LocalServer, json_route
+from tests.wallet_keys_test import setup_wallet
+
+ADDRESSES = ["address-%d" % i for i in range(20)]
+
+
+class UpgradeClient(object):
+    """
+    stand-in for APIClient.upgrade_key_index, BlockTrail has a key for every key index up to the upgraded one
+    """
+
+    def upgrade_key_index(self, identifier, key_index, primary_public_key):
+        blocktrail_key = BIP32Node.from_master_secret(b"blocktrail", netcode='XTN')
+
+        return {'blocktrail_public_keys': [(blocktrail_key.subkey_for_path("%d'.pub" % i).hwif(), "M/%d'" % i) for i in range(key_index + 1)]}
+
+
+def run_threads(fn, count):
+    errors = []
+
+    def run(i):
+        try:
+            fn(i)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(i, )) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return errors
+
+
+class ThreadSafetyTestCase(unittest.TestCase):
+    def test_derive_while_upgrading_key_index(self):
+        wallet = setup_wallet()
+        wallet.client = UpgradeClient()
+        derived = []
+
+        def derive(i):
+            rand = random.Random(i)
+            for _ in range(250):
+                # the key index can change under our feet, its BlockTrail key has to be there already
+                path = "M/%d'/%d/%d" % (wallet.key_index, rand.randint(0, 1), rand.randint(0, 49))
+                derived.append((path, wallet.get_address_by_path(path)))
+
+        def upgrade(i):
+            for key_index in [2, 3]:
+                wallet.upgrade_key_index(key_index)
+
+        errors = run_threads(lambda i: upgrade(i) if i == 0 else derive(i), 9)
+        self.assertEqual(errors, [])
+        self.assertEqual(len(derived), 2000)
+        self.assertEqual(wallet.key_index, 3)
+        self.assertEqual(sorted(wallet.blocktrail_public_keys), ["0", "1", "2", "3"])
+
+        reference = setup_wallet()
+        reference.client = UpgradeClient()
+        reference.upgrade_key_index(3)
+        for path, address in set(derived):
+            self.assertEqual(reference.get_address_by_path(path), address)
+
+    def test_shared_client(self):
+        routes = dict(("/v1/BTC/address/%s" % address, json_route({'address': address})) for address in ADDRESSES)
+        routes['/v1/BTC/block/latest'] = json_route({'height': 1000})
+        routes['/v1/BTC/webhook/hook/events/batch'] = lambda headers, body: (200, {}, body)
+        server = LocalServer(routes=routes).start()
+
+        try:
+            client = APIClient("MY_APIKEY", "MY_APISECRET", api_endpoint=server.url + "/v1/BTC",
+                               transport=transport.RequestsTransport(pool_maxsize=16))
+
+            def request(i):
+                rand = random.Random(i)
+                for _ in range(125):
+                    address = rand.choice(ADDRESSES)
+                    assert client.address(address) == {'address': address}
+                    assert client.block_latest() == {'height': 1000}
+
+                records = [{'address': address} for address in ADDRESSES]
+                sent = client.batch_subscribe_address_transactions("hook", records)
+                assert all(record['event_type'] == 'address-transactions' for record in sent)
+                # the caller's records are left alone
+                assert records == [{'address': address} for address in ADDRESSES]
+
+            self.assertEqual(run_threads(request, 16), [])
+
+            # coalesced requests never reached the server
+            self.assertEqual(len(server.hits) + client.client.coalesced_requests, 16 * 251)
+            self.assertEqual(len([hit for hit in server.hits if hit[0] == 'POST']), 16)
+        finally:
+            server.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
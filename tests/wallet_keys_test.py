@@ -0,0 +1,65 @@
+import unittest
+from pycoin.key.BIP32Node import BIP32Node
+from blocktrail import crypto
+from blocktrail.wallet import Wallet
+
+
+def setup_wallet(crypto_backend=None, testnet=True):
+    netcode = "XTN" if testnet else "BTC"
+    primary_private_key = BIP32Node.from_master_secret(b"primary", netcode=netcode)
+    backup_public_key = BIP32Node.from_master_secret(b"backup", netcode=netcode).public_copy()
+    blocktrail_public_keys = [
+        (BIP32Node.from_master_secret(b"blocktrail", netcode=netcode).subkey_for_path("%d'.pub" % key_index).hwif(), "M/%d'" % key_index)
+        for key_index in range(2)
+    ]
+
+    return Wallet(None, "unittest", None, primary_private_key, backup_public_key, blocktrail_public_keys, 0, testnet,
+                  crypto_backend=crypto_backend)
+
+
+def get_address_from_root(wallet, path):
+    # the derivation of every key from the root, as it was done before the chain nodes were kept
+    path = path.replace("M/", "")
+    key_index = path.split("/")[0].replace("'", "")
+
+    key = wallet.primary_private_key.subkey_for_path(path)
+    backup_public_key = wallet.backup_public_key.subkey_for_path(path.replace("'", ""))
+    blocktrail_public_key = wallet.blocktrail_public_keys[key_index].subkey_for_path("/".join(path.split("/")[1:]))
+
+    return key.wif(), backup_public_key.hwif(), blocktrail_public_key.hwif()
+
+
+class WalletKeysTestCase(unittest.TestCase):
+    def test_chain_nodes_match_root_derivation(self):
+        wallet = setup_wallet()
+
+        for path in ["M/0'/0/0", "M/0'/0/7", "M/0'/1/3", "M/1'/0/0", "M/1'/1/1000000"]:
+            key, backup_public_key, blocktrail_public_key = wallet.get_keys_by_path(path)
+            self.assertEqual((key.wif(), backup_public_key.hwif(), blocktrail_public_key.hwif()), get_address_from_root(wallet, path))
+
+        self.assertEqual(sorted(wallet.chain_nodes), [(0, 0), (0, 1), (1, 0), (1, 1)])
+
+    def test_other_paths_derive_from_root(self):
+        wallet = setup_wallet()
+
+        path = "M/0'/0/2/3"
+        key, backup_public_key, blocktrail_public_key = wallet.get_keys_by_path(path)
+        self.assertEqual((key.wif(), backup_public_key.hwif(), blocktrail_public_key.hwif()), get_address_from_root(wallet, path))
+        self.assertEqual(wallet.chain_nodes, {})
+
+    def test_address_is_stable(self):
+        wallet = setup_wallet()
+
+        address = wallet.get_address_by_path("M/0'/0/5")
+        self.assertEqual(wallet.get_address_by_path("M/0'/0/5"), address)
+        self.assertNotEqual(wallet.get_address_by_path("M/0'/0/6"), address)
+        self.assertTrue(address.startswith("2"))
+
+    def test_backends_agree(self):
+        addresses = [setup_wallet(backend).get_address_by_path("M/0'/1/3") for backend in crypto.available_backends()]
+
+        self.assertEqual(len(set(addresses)), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
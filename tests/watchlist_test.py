@@ -0,0 +1,104 @@
+import unittest
+import threading
+from blocktrail.watchlist import AddressWatchlist
+
+
+class FakeAddressClient(object):
+    def __init__(self, addresses):
+        self.addresses = addresses
+        self.lock = threading.Lock()
+        self.calls = []
+
+    def address(self, address):
+        with self.lock:
+            self.calls.append(('address', address))
+        return dict(self.addresses[address], address=address)
+
+    def address_transactions(self, address, page=1, limit=20, sort_dir='asc'):
+        with self.lock:
+            self.calls.append(('address_transactions', address))
+        return {'data': [{'hash': "%s-tx%d" % (address, self.addresses[address]['transactions'])}]}
+
+
+class AddressWatchlistTestCase(unittest.TestCase):
+    def setUp(self):
+        self.client = FakeAddressClient({
+            'hot': {'balance': 0, 'transactions': 0},
+            'dormant': {'balance': 100, 'transactions': 1},
+        })
+        self.changes = []
+        self.watchlist = AddressWatchlist(self.client, ['hot', 'dormant'], callback=self.changes.append,
+                                          min_interval=10, max_interval=80)
+
+    def tearDown(self):
+        self.watchlist.stop()
+
+    def polled(self):
+        polled = [address for call, address in self.client.calls if call == 'address']
+        self.client.calls = []
+        return sorted(polled)
+
+    def test_adaptive_polling(self):
+        # the initial poll only takes the digests
+        self.assertEqual([], self.watchlist.poll(now=0))
+        self.assertEqual(['dormant', 'hot'], self.polled())
+
+        now = 0
+        polls = {'hot': 0, 'dormant': 0}
+        while now < 300:
+            now += 10
+            self.client.addresses['hot']['balance'] += 1
+            self.client.addresses['hot']['transactions'] += 1
+            self.watchlist.poll(now=now)
+            for address in self.polled():
+                polls[address] += 1
+
+        self.assertEqual(30, polls['hot'])
+        # 10, 20, 40, 80, 80, 80 seconds apart
+        self.assertEqual(5, polls['dormant'])
+
+        self.assertEqual(30, len(self.changes))
+        self.assertTrue(all(change.address == 'hot' for change in self.changes))
+        self.assertEqual(30, self.changes[-1].data['balance'])
+        self.assertEqual([{'hash': "hot-tx30"}], self.changes[-1].transactions)
+
+    def test_remove_and_add_again(self):
+        self.watchlist.poll(now=0)
+        self.polled()
+
+        self.watchlist.remove('dormant')
+        self.watchlist.poll(now=10)
+        self.assertEqual(['hot'], self.polled())
+
+        # added again before its previous entry came up, it's watched from scratch and polled once
+        self.watchlist.poll(now=20)
+        self.watchlist.remove('hot')
+        self.watchlist.add('hot')
+        self.watchlist.poll(now=21)
+        self.assertEqual(['hot'], self.polled())
+
+        self.watchlist.poll(now=31)
+        self.assertEqual(['hot'], self.polled())
+        self.assertEqual(1, len([entry for entry in self.watchlist.schedule if entry[1] == 'hot']))
+
+    def test_transactions_only_fetched_on_change(self):
+        self.watchlist.poll(now=0)
+        self.watchlist.poll(now=100)
+        self.client.addresses['dormant']['balance'] = 50
+        self.watchlist.poll(now=200)
+
+        self.assertEqual([('address_transactions', 'dormant')], [c for c in self.client.calls if c[0] == 'address_transactions'])
+        self.assertEqual(['dormant'], [change.address for change in self.changes])
+
+    def test_events(self):
+        events = self.watchlist.events()
+        self.watchlist.poll(now=0)
+        self.client.addresses['hot']['balance'] = 1
+        self.watchlist.poll(now=100)
+        self.watchlist.stop()
+
+        self.assertEqual(['hot'], [change.address for change in events])
+
+
+if __name__ == "__main__":
+    unittest.main()